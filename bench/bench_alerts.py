@@ -0,0 +1,75 @@
+"""Время проверки подписок на снимке: один векторный проход по всем подпискам.
+
+Запуск из корня репозитория: python bench/bench_alerts.py [подписок] [бумаг]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.alerts import AlertStore  # noqa: E402
+
+
+def fill(store: AlertStore, alerts: int, secids: list, rng) -> None:
+    """Подписки пишутся в базу одной пачкой, как если бы их набрали пользователи"""
+    rows = zip(
+        rng.integers(1, alerts // 5 + 2, alerts).tolist(),
+        rng.choice(secids, alerts).tolist(),
+        rng.integers(0, 2, alerts).tolist(),
+        rng.choice([-1, 1], alerts).tolist(),
+        rng.uniform(5, 20, alerts).round(2).tolist()
+    )
+    with store.db.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO alerts (user_id, secid, field, sign, threshold) VALUES (?, ?, ?, ?, ?)", rows
+        )
+
+
+def market(secids: list, rng) -> pd.DataFrame:
+    size = len(secids)
+    return pd.DataFrame({
+        "SECID": secids,
+        "YIELD": rng.uniform(5, 20, size),
+        "YIELDCLOSE": rng.uniform(5, 20, size),
+        "LAST": rng.uniform(5, 20, size),
+    })
+
+
+def timed(action) -> float:
+    started = time.perf_counter()
+    action()
+    return time.perf_counter() - started
+
+
+def main(alerts: int, bonds: int) -> None:
+    rng = np.random.default_rng(0)
+    secids = [f"RU{i:06d}" for i in range(bonds)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = AlertStore(os.path.join(directory, "alerts.db"))
+        fill(store, alerts, secids, rng)
+
+        load = timed(store.load)
+        df = market(secids, rng)
+        # Первый проход взводит/срабатывает массово, дальше снимки меняются мало
+        first = timed(lambda: store.evaluate(df, now=1000))
+        steady = []
+        for step in range(5):
+            df = df.assign(YIELD=df['YIELD'] + rng.normal(0, 0.01, bonds))
+            steady.append(timed(lambda: store.evaluate(df, now=2000 + step)))
+
+        print(f"{alerts} подписок на {bonds} бумаг")
+        print(f"загрузка из базы:       {load:7.2f} с")
+        print(f"первый проход:          {first:7.2f} с (сработало {store.fired})")
+        print(f"установившийся проход:  {np.median(steady):7.3f} с (медиана 5 снимков)")
+        store.db.close()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*(args + [1_000_000, 3000][len(args):]))
@@ -0,0 +1,108 @@
+"""Задержка и пропускная способность запросов к ISS: сессия на запрос против общего пула.
+
+Запуск из корня репозитория: python bench/bench_http_client.py [запросов] [параллельно]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+from services.http_client import http_client  # noqa: E402
+from services.moex_service import MoexService  # noqa: E402
+
+
+# Полная страница ISS (100 строк) с полями справочника
+PAGE_SIZE = 100
+COLUMNS = ["SECID", "SHORTNAME", "SECNAME", "ISSUESIZE", "COUPONPERCENT",
+           "COUPONPERIOD", "MATDATE", "LISTLEVEL", "FACEVALUE", "CURRENCY"]
+PAGE = {
+    "securities": {
+        "columns": COLUMNS,
+        "data": [
+            [f"SU{i:05d}RMFS", f"ОФЗ {i}", f"Облигация {i}", 10 ** 9, 7.5,
+             182, "2030-01-01", 1, 1000, "SUR"]
+            for i in range(PAGE_SIZE)
+        ]
+    }
+}
+
+# Задержка ответа ISS, с
+SERVER_DELAY = 0.002
+
+
+async def start_server() -> TestServer:
+    async def handler(request):
+        await asyncio.sleep(SERVER_DELAY)
+        return web.json_response(PAGE)
+
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handler)
+    server = TestServer(app)
+    await server.start_server()
+    return server
+
+
+async def fetch_per_request(url: str) -> dict:
+    """Прежняя схема: новая сессия и соединение на каждый запрос"""
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url, timeout=Config.REQUEST_TIMEOUT) as response:
+            return await response.json()
+
+
+async def measure(fetch, requests: int, concurrency: int) -> dict:
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        await fetch()
+        latencies.append(time.perf_counter() - started)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded():
+        async with semaphore:
+            await fetch()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(bounded() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies) * 1000,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "rps": requests / elapsed
+    }
+
+
+async def main(requests: int, concurrency: int) -> None:
+    server = await start_server()
+    base_url = str(server.make_url("")).rstrip("/")
+    service = MoexService()
+    service.base_url = base_url
+    endpoint = "/engines/stock/markets/bonds/boards/TQOB/securities.json"
+
+    try:
+        before = await measure(lambda: fetch_per_request(base_url + endpoint), requests, concurrency)
+        await http_client.start()
+        after = await measure(lambda: service._fetch_json(endpoint), requests, concurrency)
+    finally:
+        await http_client.close()
+        await server.close()
+
+    print(f"{requests} запросов, параллельно {concurrency}, задержка сервера {SERVER_DELAY * 1000:.0f} мс")
+    print(f"{'':<18}{'p50, мс':>10}{'p95, мс':>10}{'запр/с':>10}")
+    for name, result in (("сессия на запрос", before), ("общий пул", after)):
+        print(f"{name:<18}{result['p50']:>10.2f}{result['p95']:>10.2f}{result['rps']:>10.0f}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    asyncio.run(main(*(args + [1000, 50][len(args):])))
@@ -0,0 +1,89 @@
+"""Параллельные регистрации: общий курсор sqlite3 с коммитом на запись против группового коммита.
+
+Запуск из корня репозитория: python bench/bench_registrations.py [регистраций]
+"""
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.async_db import AsyncDatabase  # noqa: E402
+from services.users_repo import SCHEMA, UserRepository  # noqa: E402
+
+
+async def heartbeat(gaps: list) -> None:
+    """Соседний обработчик: самая долгая пауза цикла событий"""
+    last = time.perf_counter()
+    while True:
+        await asyncio.sleep(0.001)
+        now = time.perf_counter()
+        gaps.append(now - last)
+        last = now
+
+
+async def run(register, count: int) -> dict:
+    gaps = []
+    ticker = asyncio.create_task(heartbeat(gaps))
+    await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(register(100_000 + i, f"user{i}") for i in range(count)))
+    elapsed = time.perf_counter() - started
+
+    ticker.cancel()
+    return {"elapsed": elapsed, "rps": count / elapsed, "stall": max(gaps, default=elapsed) * 1000}
+
+
+async def legacy(path: str, count: int) -> dict:
+    """Прежний new_bot.py: SELECT и INSERT на общем курсоре, коммит на каждую регистрацию"""
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.execute(SCHEMA)
+    conn.commit()
+
+    async def register(telegram_id: int, name: str) -> bool:
+        cursor.execute('SELECT * FROM users WHERE telegram_id = ?', (telegram_id,))
+        if cursor.fetchone():
+            return False
+        cursor.execute('INSERT INTO users (telegram_id, name) VALUES (?, ?)', (telegram_id, name))
+        conn.commit()
+        return True
+
+    try:
+        result = await run(register, count)
+        result["commits"] = count
+        return result
+    finally:
+        conn.close()
+
+
+async def grouped(path: str, count: int) -> dict:
+    db = AsyncDatabase(path)
+    repo = UserRepository(db)
+    await db.start()
+    try:
+        result = await run(repo.register, count)
+        result["commits"] = db.commits
+        return result
+    finally:
+        await db.close()
+
+
+async def main(count: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        before = await legacy(os.path.join(directory, "legacy.db"), count)
+        after = await grouped(os.path.join(directory, "grouped.db"), count)
+
+    print(f"{count} параллельных регистраций")
+    print(f"{'':<24}{'время, с':>10}{'рег/с':>10}{'коммитов':>10}{'пауза цикла, мс':>18}")
+    for name, result in (("курсор, коммит/запись", before), ("групповой коммит", after)):
+        print(f"{name:<24}{result['elapsed']:>10.2f}{result['rps']:>10.0f}"
+              f"{result['commits']:>10}{result['stall']:>18.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
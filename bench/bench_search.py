@@ -0,0 +1,66 @@
+"""Поиск облигаций: индекс на снимок против перебора таблицы на каждый запрос.
+
+Запуск из корня репозитория: python bench/bench_search.py [бумаг]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.search import SearchIndex, fold  # noqa: E402
+
+ISSUERS = ["Сбербанк", "Газпром нефть", "РЖД", "Ростелеком", "МТС", "Сегежа", "ОФЗ", "Самолёт", "ВТБ", "Магнит"]
+QUERIES = ["SU26238RMFS4", "газпром", "рж", "самолет бо", "втб 2", "несуществующее"]
+REPEATS = 200
+
+
+def make_universe(size: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    issuers = rng.choice(ISSUERS, size)
+    return pd.DataFrame({
+        "SECID": ["SU26238RMFS4"] + [f"RU000A{i:06d}" for i in range(1, size)],
+        "ISIN": [f"RU000A{i:06d}" for i in range(size)],
+        "SHORTNAME": [f"{issuer} {i % 40}Р" for i, issuer in enumerate(issuers)],
+        "SECNAME": [f"{issuer} БО-{i:03d}" for i, issuer in enumerate(issuers)],
+        "ISSUESIZE": rng.choice([1e8, 1e9, 3e10], size),
+    })
+
+
+def scan(df: pd.DataFrame, query: str, limit: int = 10) -> list:
+    """Перебор: каждое слово запроса ищется подстрокой во всех колонках"""
+    haystack = (df["SECID"] + " " + df["ISIN"] + " " + df["SHORTNAME"] + " " + df["SECNAME"]).map(fold)
+    mask = np.ones(len(df), dtype=bool)
+    for term in fold(query).split():
+        mask &= haystack.str.contains(term, regex=False).to_numpy()
+    found = df[mask].sort_values("ISSUESIZE", ascending=False, kind="stable")
+    return found.index[:limit].tolist()
+
+
+def timed(func, query: str, repeats: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeats):
+        func(query)
+    return (time.perf_counter() - started) / repeats
+
+
+def main(size: int) -> None:
+    df = make_universe(size)
+
+    started = time.perf_counter()
+    index = SearchIndex(1, df)
+    build = time.perf_counter() - started
+
+    print(f"{size} бумаг, построение индекса: {build * 1000:.1f} мс ({len(index.keys)} ключей)")
+    print(f"{'запрос':<16}{'перебор, мкс':>14}{'индекс, мкс':>14}{'найдено':>10}")
+    for query in QUERIES:
+        legacy = timed(lambda q: scan(df, q), query, REPEATS // 10)
+        indexed = timed(index.search, query, REPEATS)
+        print(f"{query:<16}{legacy * 1e6:>14.0f}{indexed * 1e6:>14.1f}{len(index.search(query)):>10}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3500)
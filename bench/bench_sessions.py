@@ -0,0 +1,77 @@
+"""Память на сессии пользователей: компактные сессии против DataFrame на пользователя.
+
+Запуск из корня репозитория: python bench/bench_sessions.py [пользователей]
+"""
+import os
+import sys
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.moex_service import MoexService  # noqa: E402
+from services.sessions import SessionStore  # noqa: E402
+
+# Прежнее хранилище на полном числе пользователей заняло бы гигабайты — меряем выборку
+LEGACY_SAMPLE = 10_000
+
+
+def make_universe(size: int = 3000) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    today = pd.Timestamp(datetime.now().date())
+    return pd.DataFrame({
+        "SECID": [f"RU{i:06d}" for i in range(size)],
+        "SHORTNAME": [f"Бумага {i}" for i in range(size)],
+        "SECNAME": [f"Эмитент {i} БО-01" for i in range(size)],
+        "LISTLEVEL": rng.choice([1, 2, 3], size),
+        "CURRENCY": "RUB",
+        "COUPONPERCENT": rng.uniform(5, 20, size).round(2),
+        "COUPONPERIOD": 182.0,
+        "MATDATE": today + pd.to_timedelta(rng.integers(60, 5000, size), unit="D"),
+        "ISSUESIZE": rng.choice([1e8, 1e9, 3e10], size),
+        "FACEVALUE": 1000.0,
+    })
+
+
+def measure(fill) -> int:
+    """Прирост памяти (tracemalloc) после заполнения хранилища"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    storage = fill()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del storage
+    return after - before
+
+
+def main(users: int) -> None:
+    moex = MoexService()
+    df_filtered = moex.filter_reliable_bonds(make_universe(), limit=10)
+    secids = tuple(df_filtered['SECID'])
+    sample = min(users, LEGACY_SAMPLE)
+
+    def fill_legacy():
+        # Так хранил main_handlers: собственная отфильтрованная таблица на каждый /bonds
+        return {user_id: df_filtered.copy() for user_id in range(sample)}
+
+    def fill_sessions():
+        store = SessionStore(max_size=users)
+        for user_id in range(users):
+            store.set(user_id, 1, secids)
+        return store
+
+    legacy = measure(fill_legacy) * users / sample
+    compact = measure(fill_sessions)
+
+    print(f"{users} пользователей, список из {len(secids)} бумаг")
+    print(f"DataFrame на пользователя: {legacy / 2 ** 20:8.1f} МБ"
+          f"{' (пересчёт с ' + str(sample) + ')' if sample < users else ''}")
+    print(f"компактные сессии:         {compact / 2 ** 20:8.1f} МБ")
+    print(f"на пользователя: {legacy / users:.0f} Б против {compact / users:.0f} Б")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,92 @@
+"""Локальная нагрузка на вебхук: синтетические обновления POST-запросами, задержка ответа и обработки.
+
+Запуск из корня репозитория: python bench/bench_webhook.py [обновлений] [параллельно] [обработка, мс]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Message
+from aiohttp import ClientSession
+from aiohttp.test_utils import TestServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.webhook import SECRET_HEADER, WebhookServer  # noqa: E402
+
+SECRET = "bench-secret"
+
+
+def make_update(update_id: int) -> dict:
+    user = {"id": 1000 + update_id % 500, "is_bot": False, "first_name": "Bench"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": 0, "text": "/bonds",
+            "chat": {"id": user["id"], "type": "private"}, "from": user,
+        },
+    }
+
+
+def percentile(values: list, share: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)] * 1000
+
+
+async def main(updates: int, concurrency: int, work_ms: float) -> None:
+    sent_at = {}
+    handled_at = {}
+    done = asyncio.Event()
+
+    dp = Dispatcher()
+
+    @dp.message()
+    async def handler(message: Message):
+        # Обработчик без обращений к Bot API: только время «работы»
+        await asyncio.sleep(work_ms / 1000)
+        handled_at[message.message_id] = time.perf_counter()
+        if len(handled_at) == updates:
+            done.set()
+
+    bot = Bot("123456:BENCH")
+    server = WebhookServer(dp, bot, path="/webhook", secret=SECRET)
+    test_server = TestServer(server.app())
+    await test_server.start_server()
+    url = str(test_server.make_url("/webhook"))
+
+    ack = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def post(session: ClientSession, update_id: int) -> None:
+        async with semaphore:
+            started = sent_at[update_id] = time.perf_counter()
+            async with session.post(url, json=make_update(update_id), headers={SECRET_HEADER: SECRET}) as response:
+                assert response.status == 200
+            ack.append(time.perf_counter() - started)
+
+    try:
+        async with ClientSession() as session:
+            started = time.perf_counter()
+            await asyncio.gather(*(post(session, i) for i in range(1, updates + 1)))
+            await asyncio.wait_for(done.wait(), timeout=60)
+            elapsed = time.perf_counter() - started
+    finally:
+        await test_server.close()
+        await bot.session.close()
+
+    end_to_end = [handled_at[i] - sent_at[i] for i in handled_at]
+    print(f"{updates} обновлений, параллельно {concurrency}, обработка {work_ms:.0f} мс")
+    print(f"ответ 200:  p50 {percentile(ack, 0.5):6.2f} мс  p95 {percentile(ack, 0.95):6.2f} мс"
+          f"  p99 {percentile(ack, 0.99):6.2f} мс")
+    print(f"обработка:  p50 {percentile(end_to_end, 0.5):6.2f} мс  p95 {percentile(end_to_end, 0.95):6.2f} мс"
+          f"  среднее {statistics.mean(end_to_end) * 1000:6.2f} мс")
+    print(f"пропускная способность: {updates / elapsed:.0f} обновлений/с; {server.stats()}")
+
+
+if __name__ == "__main__":
+    args = [float(a) for a in sys.argv[1:4]]
+    updates, concurrency, work_ms = args + [2000, 50, 5][len(args):]
+    asyncio.run(main(int(updates), int(concurrency), work_ms))
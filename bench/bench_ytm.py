@@ -0,0 +1,101 @@
+"""Доходность к погашению, дюрация и выпуклость: векторный проход по снимку против цикла по бумагам.
+
+Запуск из корня репозитория: python bench/bench_ytm.py [бумаг]
+"""
+import os
+import sys
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.analytics import BondAnalytics, risk_measures, solve_ytm  # noqa: E402
+
+TODAY = date(2026, 1, 15)
+REPEATS = 5
+
+
+class Schedules:
+    """Вместо CouponStore: заранее заданные графики купонов"""
+
+    def __init__(self, schedules: dict):
+        self.schedules = schedules
+
+    def loaded(self) -> dict:
+        return self.schedules
+
+
+def make_universe(size: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    today = pd.Timestamp(TODAY)
+    return pd.DataFrame({
+        "SECID": [f"RU{i:06d}" for i in range(size)],
+        "FACEVALUE": 1000.0,
+        "COUPONPERCENT": rng.uniform(5, 20, size).round(2),
+        "COUPONPERIOD": rng.choice([30.0, 91.0, 182.0], size),
+        "MATDATE": today + pd.to_timedelta(rng.integers(30, 30 * 365, size), unit="D"),
+        "LAST": rng.uniform(80, 110, size).round(2),
+        "ACCRUEDINT": rng.uniform(0, 40, size).round(2),
+    })
+
+
+def make_schedules(df: pd.DataFrame, count: int) -> dict:
+    """Загруженные графики для части бумаг: ежеквартальные купоны на три года"""
+    dates = pd.Timestamp(TODAY) + pd.to_timedelta(np.arange(1, 13) * 91, unit="D")
+    return {
+        secid: pd.DataFrame({"coupondate": dates, "value": 25.0, "facevalue": 1000.0})
+        for secid in df['SECID'].head(count)
+    }
+
+
+def per_bond(analytics: BondAnalytics, df: pd.DataFrame) -> None:
+    """Прежний подход: расчёт по одной бумаге (тот же метод Ньютона, но строка за строкой)"""
+    for start in range(len(df)):
+        analytics.enrich(df.iloc[start:start + 1], today=TODAY)
+
+
+def timed(func, repeats: int = REPEATS) -> float:
+    runs = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - started)
+    return float(np.median(runs))
+
+
+def main(size: int) -> None:
+    df = make_universe(size)
+    synthetic = BondAnalytics(Schedules({}))
+    scheduled = BondAnalytics(Schedules(make_schedules(df, size // 3)))
+
+    enriched = synthetic.enrich(df, today=TODAY)
+    solved = enriched['YTM'].notna().sum()
+
+    vector = timed(lambda: synthetic.enrich(df, today=TODAY))
+    with_schedules = timed(lambda: scheduled.enrich(df, today=TODAY))
+    loop = timed(lambda: per_bond(synthetic, df), repeats=1)
+
+    # Отдельно ядро: решатель и риск-метрики на готовых матрицах потоков
+    times = np.tile(np.arange(1, 61) / 4, (size, 1))
+    amounts = np.full((size, 60), 25.0)
+    amounts[:, -1] += 1000.0
+    price = np.full(size, 980.0)
+    kernel = timed(lambda: risk_measures(times, amounts, price,
+                                         solve_ytm(times, amounts, price, np.full(size, 0.1))))
+
+    print(f"{size} бумаг, решено {solved}")
+    for label, value in [
+        ("векторный проход (синтетические потоки)", vector),
+        ("векторный проход (графики у трети бумаг)", with_schedules),
+        ("решатель и риск-метрики, 60 платежей", kernel),
+        ("цикл по бумагам", loop),
+    ]:
+        print(f"{label:<42}{value * 1000:9.1f} мс")
+    print(f"цикл медленнее векторного прохода в {loop / vector:.0f} раз")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3000)
@@ -1,9 +1,24 @@
 import asyncio
 import logging
+import signal
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
 from config import Config
 from handlers.main_handlers import router
+from services.alerts import alert_store
+from services.fsm_storage import build_storage, kv_store
+from services.history import history_store
+from services.http_client import http_client
+from services.metrics import startup_metrics
+from services.scheduler import refresh_scheduler
+from services.search import search_service
+from services.send_queue import NOTIFY, SendQueueMiddleware, send_queue
+from services.sessions import session_store
+from services.snapshot import snapshot_cache
+from services.snapshot_store import snapshot_store
+from services.supervisor import Supervisor, serve_worker
+from services.view_cache import view_cache
+from services.webhook import run_webhook
+from utils.formatters import format_alert_notification
 
 # Настройка логирования
 logging.basicConfig(
@@ -12,20 +27,163 @@ logging.basicConfig(
 )
 
 
+# Супервизор воркеров (только в режиме WORKERS > 1)
+supervisor = None
+
+
+async def persist_snapshot(_snapshot):
+    await snapshot_store.persist(snapshot_cache)
+
+    # Воркеры перечитывают сохранённый снимок через mmap
+    if supervisor is not None:
+        supervisor.broadcast_snapshot()
+
+
+async def on_startup(bot: Bot):
+    # Общая HTTP-сессия для запросов к бирже
+    await http_client.start()
+
+    # Исходящие сообщения идут через очередь с лимитами Telegram
+    send_queue.start(bot)
+
+    # Подписки на уровни проверяются там же, где обновляется снимок
+    async def notify_alerts(user_id: int, items: list):
+        send_queue.send_message(user_id, format_alert_notification(items), priority=NOTIFY, parse_mode="HTML")
+
+    alert_store.set_notifier(notify_alerts)
+
+    # Сессии пользователей дублируются в общее хранилище, если оно настроено
+    if kv_store is not None:
+        session_store.attach(kv_store)
+
+    # Тёплый старт из последнего сохранённого снимка; актуализирует его планировщик
+    startup_metrics.warm_start = await snapshot_store.restore(snapshot_cache) > 0
+
+    # Купоны топа и поисковый индекс готовятся при каждом обновлении снимка (в режиме
+    # воркеров — в них), снимок сохраняется на диск вместе с точкой истории котировок
+    if supervisor is None:
+        snapshot_cache.add_listener(view_cache.prefetch_coupons)
+        snapshot_cache.add_listener(search_service.rebuild)
+    snapshot_cache.add_listener(persist_snapshot)
+    snapshot_cache.add_listener(history_store.record)
+    snapshot_cache.add_listener(alert_store.check)
+
+    # Снимок обновляется в фоне по расписанию торгов
+    refresh_scheduler.start()
+
+
+async def on_shutdown():
+    await refresh_scheduler.stop()
+    await send_queue.stop()
+    await http_client.close()
+
+    # Несохранённые состояния FSM и сессии дописываются, соединение с хранилищем закрывается
+    if kv_store is not None:
+        await kv_store.close()
+
+
+async def on_worker_startup(bot: Bot):
+    await http_client.start()
+    send_queue.start(bot)
+
+    if kv_store is not None:
+        session_store.attach(kv_store)
+
+    # Снимок ведёт супервизор; воркер только читает его с диска и не ходит на биржу сам
+    snapshot_cache.offline = True
+    await snapshot_store.restore(snapshot_cache)
+    snapshot_cache.add_listener(view_cache.prefetch_coupons)
+    snapshot_cache.add_listener(search_service.rebuild)
+
+
+async def on_worker_shutdown():
+    await send_queue.stop()
+    await http_client.close()
+
+    if kv_store is not None:
+        await kv_store.close()
+
+
+async def reload_snapshot():
+    await snapshot_store.restore(snapshot_cache)
+
+
+def create_bot() -> Bot:
+    bot = Bot(token=Config.BOT_TOKEN)
+
+    # Ответы в чаты проходят через очередь отправки вперёд уведомлений и рассылок
+    bot.session.middleware(SendQueueMiddleware(send_queue))
+    return bot
+
+
+def create_dispatcher(startup, shutdown) -> Dispatcher:
+    dp = Dispatcher(storage=build_storage())
+
+    # Подключаем роутеры
+    dp.include_router(router)
+
+    # Жизненный цикл общих ресурсов
+    dp.startup.register(startup)
+    dp.shutdown.register(shutdown)
+    return dp
+
+
+def worker_main(index: int, inbox, outbox):
+    """Точка входа процесса-воркера"""
+    # Ctrl+C получает вся группа процессов; воркеров останавливает супервизор
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    bot = create_bot()
+    dp = create_dispatcher(on_worker_startup, on_worker_shutdown)
+    asyncio.run(serve_worker(index, inbox, outbox, dp, bot, on_snapshot=reload_snapshot))
+
+
+async def run_supervisor(dp: Dispatcher, bot: Bot):
+    """Приём обновлений и обновление снимка здесь, обработка — в воркерах по user_id"""
+    global supervisor
+
+    supervisor = Supervisor(worker_main)
+    workflow_data = {"dispatcher": dp, "bots": [bot], **dp.workflow_data}
+    await dp.emit_startup(bot=bot, **workflow_data)
+
+    # Холодный старт без сохранённого снимка: первый снимок загружает и кладёт на диск
+    # супервизор, воркеры стартуют уже с ним
+    if not snapshot_cache.boards():
+        await snapshot_cache.get_universe()
+        await snapshot_store.persist(snapshot_cache)
+    supervisor.start()
+
+    await bot.delete_webhook(drop_pending_updates=True)
+    logging.info(f"🤖 Бот запущен в режиме супервизора ({Config.WORKERS} воркеров)!")
+
+    try:
+        await supervisor.poll(bot, dp)
+    finally:
+        await supervisor.stop()
+        await dp.emit_shutdown(bot=bot, **workflow_data)
+        await bot.session.close()
+
+
 async def main():
     # Проверка токена
     if Config.BOT_TOKEN == "YOUR_BOT_TOKEN_HERE":
         raise ValueError("❌ Укажите реальный токен в .env файле!")
 
     # Инициализация
-    bot = Bot(token=Config.BOT_TOKEN)
-    storage = MemoryStorage()
-    dp = Dispatcher(storage=storage)
-
-    # Подключаем роутеры
-    dp.include_router(router)
+    bot = create_bot()
+    dp = create_dispatcher(on_startup, on_shutdown)
 
     # Запуск
+    if Config.WORKERS > 1:
+        if Config.BOT_MODE == "webhook":
+            logging.warning("Режим воркеров работает через polling — BOT_MODE=webhook игнорируется")
+        await run_supervisor(dp, bot)
+        return
+
+    if Config.BOT_MODE == "webhook":
+        await run_webhook(dp, bot)
+        return
+
     await bot.delete_webhook(drop_pending_updates=True)
     logging.info("🤖 Бот запущен!")
     await dp.start_polling(bot)
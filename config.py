@@ -7,4 +7,134 @@ class Config:
     BOT_TOKEN = os.getenv("BOT_TOKEN", "YOUR_BOT_TOKEN_HERE")
     MOEX_API_URL = "https://iss.moex.com/iss"
     REQUEST_TIMEOUT = 10
-    BONDS_LIMIT = 10
\ No newline at end of file
+    BONDS_LIMIT = 10
+
+    # Размер страницы списка облигаций
+    BONDS_PAGE_SIZE = 10
+
+    # Режим получения обновлений: polling или webhook
+    BOT_MODE = os.getenv("BOT_MODE", "polling")
+    WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+    WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+    WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+    WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+    WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+    WEBHOOK_MAX_CONCURRENCY = int(os.getenv("WEBHOOK_MAX_CONCURRENCY", "100"))
+    WEBHOOK_SHUTDOWN_TIMEOUT = 30
+
+    # Супервизор: число процессов-воркеров (1 — без супервизора) и их очереди
+    WORKERS = int(os.getenv("WORKERS", "1"))
+    WORKER_QUEUE_SIZE = 10_000
+    SUPERVISOR_STATS_INTERVAL = 60
+
+    # Курсы валют: источник, время жизни кэша и первая пауза после сбоя источника (секунды)
+    EXCHANGE_RATES_URL = os.getenv(
+        "EXCHANGE_RATES_URL",
+        "https://v6.exchangerate-api.com/v6/09edf8b2bb246e1f801cbfba/latest/USD"
+    )
+    EXCHANGE_RATES_TTL = 10 * 60
+    EXCHANGE_RATES_RETRY = 30
+    EXCHANGE_RATES_CURRENCIES = ("USD", "EUR", "CNY")
+
+    # База финансового бота: читатели и максимальный размер пачки записи
+    FINANCE_DB_PATH = "user.db"
+    FINANCE_DB_READERS = 4
+    FINANCE_DB_BATCH = 256
+
+    # Снимок рынка: режимы торгов и время жизни (секунды)
+    BONDS_BOARD = "TQOB"
+    BONDS_BOARDS = ("TQOB", "TQCB", "TQIR", "TQOD")
+    SNAPSHOT_TTL = 60
+    # Справочные поля (MATDATE, ISSUESIZE, ...) перезагружаются раз в сутки
+    REFERENCE_TTL = 24 * 60 * 60
+
+    # Сколько предыдущих сводных снимков держать для сравнения версий
+    SNAPSHOT_HISTORY = 10
+
+    # Отпечатки последнего содержимого сообщений (пропуск правок без изменений)
+    RENDERED_CACHE_SIZE = 10_000
+
+    # Каталог для снимков на диске (тёплый старт)
+    SNAPSHOT_DIR = "data/snapshot"
+
+    # База бота (история котировок и пр.)
+    DB_PATH = "data/bonds.db"
+
+    # История котировок: шаг записи (секунды), хранение точек и дневных баров (дни)
+    HISTORY_MIN_INTERVAL = 300
+    HISTORY_RAW_DAYS = 7
+    HISTORY_DAILY_DAYS = 5 * 365
+    HISTORY_POINTS = 30
+
+    # Исходящие сообщения: общий лимит и лимит на чат (в секунду), параллельность, размер очереди
+    SEND_GLOBAL_RATE = 25
+    SEND_CHAT_RATE = 1.0
+    SEND_CHAT_BURST = 3
+    SEND_CONCURRENCY = 8
+    SEND_QUEUE_SIZE = 50_000
+    SEND_MAX_RETRIES = 3
+
+    # Поиск: размер выдачи, кэш ответов и время кэширования inline-ответов в Telegram
+    SEARCH_LIMIT = 10
+    SEARCH_INLINE_LIMIT = 20
+    SEARCH_CACHE_SIZE = 5000
+    SEARCH_INLINE_CACHE_TIME = 60
+
+    # Подписки на уровни: отдельная база, пауза между повторами (секунды), лимиты
+    ALERTS_DB_PATH = "data/alerts.db"
+    ALERT_COOLDOWN = 60 * 60
+    ALERT_MAX_PER_USER = 50
+    ALERT_NOTIFY_LIMIT = 10
+
+    # Фоновое обновление снимка: торговые сессии (МСК) и интервалы (секунды)
+    MAIN_SESSION = ("09:50", "18:50")
+    EVENING_SESSION = ("19:00", "23:50")
+    REFRESH_INTERVAL_MAIN = 60
+    REFRESH_INTERVAL_EVENING = 300
+    REFRESH_JITTER = 0.1
+    HOLIDAYS_FILE = "data/moex_holidays.txt"
+
+    # Хранилище FSM и сессий: memory, sqlite или redis
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "memory")
+    STORAGE_SQLITE_PATH = "data/storage.db"
+    STORAGE_REDIS_URL = os.getenv("STORAGE_REDIS_URL", "redis://localhost:6379/0")
+    STORAGE_TTL = 7 * 24 * 60 * 60
+    STORAGE_CACHE_SIZE = 10_000
+    # Сколько секунд кэш доверяет значению: хранилище общее для воркеров и реплик
+    STORAGE_READ_TTL = 5.0
+    STORAGE_FLUSH_INTERVAL = 0.5
+    STORAGE_FLUSH_BATCH = 500
+
+    # Сессии пользователей: лимит записей и время жизни (секунды)
+    SESSION_MAX_USERS = 100_000
+    SESSION_TTL = 24 * 60 * 60
+
+    # Аналитика: потолок числа платежей, итерации Ньютона, правдоподобный диапазон доходности (доли)
+    ANALYTICS_MAX_FLOWS = 400
+    ANALYTICS_ITERATIONS = 50
+    ANALYTICS_MIN_YTM = -0.5
+    ANALYTICS_MAX_YTM = 0.5
+
+    # Отбор по умолчанию: дней до погашения, минимальный объём выпуска; кэш результатов на снимок
+    SCREEN_MIN_DAYS = 30
+    SCREEN_MIN_ISSUE = 100_000_000
+    SCREEN_CACHE_SIZE = 256
+
+    # Портфель: лимит позиций, горизонт календаря выплат (месяцы), ближайших выплат в ответе
+    PORTFOLIO_MAX_POSITIONS = 50
+    PORTFOLIO_HORIZON_MONTHS = 12
+    PORTFOLIO_UPCOMING_COUNT = 5
+    PORTFOLIO_CACHE_SIZE = 10_000
+
+    # Купоны: параллельность предзагрузки и сколько ближайших выплат показывать
+    COUPONS_PREFETCH_CONCURRENCY = 5
+    COUPONS_NEXT_COUNT = 3
+
+    # Размер страницы ISS по умолчанию
+    ISS_PAGE_SIZE = 100
+
+    # Пул HTTP-соединений к ISS
+    HTTP_POOL_LIMIT = 100
+    HTTP_POOL_LIMIT_PER_HOST = 20
+    HTTP_DNS_CACHE_TTL = 300
+    HTTP_KEEPALIVE_TIMEOUT = 30
@@ -1,15 +1,54 @@
+import asyncio
+import math
+import re
+
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery
-from aiogram.filters import Command
-from services.moex_service import MoexService
-from keyboards.inline_kb import bonds_list_keyboard, bond_details_keyboard
-from utils.formatters import format_bonds_table, format_bond_details
-import pandas as pd
+from aiogram.types import (
+    CallbackQuery, InlineQuery, InlineQueryResultArticle, InputTextMessageContent, Message
+)
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command, CommandObject
+from config import Config
+from services.alerts import alert_store
+from services.coupons import coupon_store
+from services.history import history_store
+from services.metrics import startup_metrics
+from services.portfolio import portfolio_store
+from services.screening import parse_profile, profile_store, screener
+from services.search import search_service
+from services.sessions import session_store
+from services.snapshot import snapshot_cache
+from services.snapshot_diff import content_hash, rendered_messages, snapshot_differ
+from services.view_cache import SORT_MODES, BondsView, view_cache
+from keyboards.inline_kb import bond_details_keyboard, search_results_keyboard
+from utils.formatters import (
+    format_alerts, format_bond_brief, format_history, format_portfolio, format_screen_profile,
+    format_search_results, format_whats_new
+)
 
 router = Router()
 
-# Хранилище данных пользователей (в реальном проекте использовать Redis)
-user_data_storage = {}
+# /alert SECID yield > 12.5 (или доходность/цена)
+ALERT_PATTERN = re.compile(r"^(\S+)\s+(yield|price|доходность|цена)\s*([<>])\s*(\d+(?:[.,]\d+)?)$", re.IGNORECASE)
+ALERT_FIELDS = {"yield": "yield", "доходность": "yield", "price": "price", "цена": "price"}
+
+
+async def _edit(callback: CallbackQuery, text: str, reply_markup=None, digest: str = None) -> bool:
+    """Правка сообщения, только если его содержимое действительно изменилось"""
+    message = callback.message
+    digest = digest or content_hash(text, reply_markup)
+
+    if not rendered_messages.changed(message.chat.id, message.message_id, digest):
+        return False
+
+    try:
+        await message.edit_text(text, parse_mode="HTML", reply_markup=reply_markup)
+    except TelegramBadRequest as e:
+        # Отпечаток мог потеряться (рестарт) — такое сообщение уже актуально
+        if "message is not modified" not in str(e):
+            rendered_messages.forget(message.chat.id, message.message_id)
+            raise
+    return True
 
 
 @router.message(Command("start"))
@@ -19,7 +58,13 @@ async def cmd_start(message: Message):
         "Показывает топ-10 облигаций Мосбиржи:\n"
         "✅ Без оферты и амортизации\n"
         "✅ Высокая ликвидность\n\n"
-        "👉 Команда: /bonds",
+        "👉 Команда: /bonds\n"
+        "📈 История доходности: /history SECID\n"
+        "🔍 Поиск: /find запрос или @бот запрос\n"
+        "🔔 Уведомления: /alert SECID yield > 14\n"
+        "💼 Портфель и выплаты: /portfolio\n"
+        "🎛 Свой отбор: /screen\n"
+        "🆕 Что нового с прошлого просмотра: /new",
         parse_mode="HTML"
     )
 
@@ -28,88 +73,342 @@ async def cmd_start(message: Message):
 async def cmd_bonds(message: Message):
     await message.answer("⏳ Загружаю данные с Мосбиржи...")
 
-    moex = MoexService()
-    df = await moex.get_all_bonds()
+    snapshot = await snapshot_cache.get_universe()
 
-    if df.empty:
+    if snapshot.empty:
         await message.answer("❌ Ошибка загрузки данных")
         return
 
-    df_filtered = moex.filter_reliable_bonds(df, limit=10)
+    view = view_cache.page(snapshot)
 
-    if df_filtered.empty:
+    if view.empty:
         await message.answer("❌ Не найдено подходящих облигаций")
         return
 
-    # Сохраняем данные пользователя
-    user_data_storage[message.from_user.id] = df_filtered
+    # Сохраняем только версию снимка и показанные SECID
+    session_store.set(message.from_user.id, view.version, view.secids)
 
-    table = format_bonds_table(df_filtered)
-    keyboard = bonds_list_keyboard(df_filtered)
+    sent = await message.answer(view.table, parse_mode="HTML", reply_markup=view.keyboard)
+    rendered_messages.remember(sent.chat.id, sent.message_id, view.digest)
+    startup_metrics.mark_first_answer()
 
-    await message.answer(table, parse_mode="HTML", reply_markup=keyboard)
 
+@router.message(Command("history"))
+async def cmd_history(message: Message, command: CommandObject):
+    args = (command.args or "").split()
 
-@router.callback_query(F.data == "refresh")
-async def refresh_bonds(callback: CallbackQuery):
-    await callback.answer("🔄 Обновляю...")
-    await callback.message.edit_text("⏳ Обновляю данные...")
+    if not args:
+        await message.answer("ℹ️ Использование: /history SECID [дней]")
+        return
+
+    secid = args[0].upper()
+    days = int(args[1]) if len(args) > 1 and args[1].isdigit() else 90
+
+    series = await history_store.get_series(secid, days)
+    await message.answer(format_history(secid, series, days), parse_mode="HTML")
 
-    moex = MoexService()
-    df = await moex.get_all_bonds()
+
+@router.message(Command("find"))
+async def cmd_find(message: Message, command: CommandObject):
+    query = (command.args or "").strip()
+
+    if not query:
+        await message.answer("ℹ️ Использование: /find SECID, ISIN или название")
+        return
+
+    snapshot = await snapshot_cache.get_universe()
+
+    if snapshot.empty:
+        await message.answer("❌ Ошибка загрузки данных")
+        return
+
+    index = search_service.index(snapshot)
+    df = index.rows_frame(index.search(query))
 
     if df.empty:
-        await callback.message.edit_text("❌ Ошибка обновления")
+        await message.answer(format_search_results(query, df))
+        return
+
+    # Карточки из результатов открываются так же, как из списка /bonds
+    session_store.set(message.from_user.id, snapshot.version, tuple(df['SECID']))
+
+    await message.answer(
+        format_search_results(query, df), parse_mode="HTML", reply_markup=search_results_keyboard(df)
+    )
+
+
+@router.inline_query()
+async def inline_search(inline_query: InlineQuery):
+    snapshot = await snapshot_cache.get_universe()
+
+    if snapshot.empty:
+        await inline_query.answer([], cache_time=5)
         return
 
-    df_filtered = moex.filter_reliable_bonds(df, limit=10)
+    # Ответ на одну и ту же строку собирается один раз на версию снимка и набор
+    # загруженных купонов: карточки, собранные до загрузки графиков, не залеживаются
+    generation = coupon_store.generation
+    results = search_service.cached(snapshot, inline_query.query, generation)
+
+    if results is None:
+        index = search_service.index(snapshot)
+        df = index.rows_frame(index.search(inline_query.query, limit=Config.SEARCH_INLINE_LIMIT))
+        results = [
+            InlineQueryResultArticle(
+                id=secid,
+                title=secid,
+                description=format_bond_brief(shortname, coupon, matdate),
+                input_message_content=InputTextMessageContent(
+                    message_text=view_cache.details(snapshot, secid), parse_mode="HTML"
+                )
+            )
+            for secid, shortname, coupon, matdate in zip(
+                df['SECID'], df['SHORTNAME'], df['COUPONPERCENT'], df['MATDATE']
+            )
+        ]
+        search_service.remember(inline_query.query, results, generation)
+
+    await inline_query.answer(results, cache_time=Config.SEARCH_INLINE_CACHE_TIME)
+
+
+@router.message(Command("alert"))
+async def cmd_alert(message: Message, command: CommandObject):
+    match = ALERT_PATTERN.match((command.args or "").strip())
+
+    if not match:
+        await message.answer("ℹ️ Использование: /alert SECID yield > 14 или /alert SECID price < 95")
+        return
 
-    if df_filtered.empty:
-        await callback.message.edit_text("❌ Нет подходящих облигаций")
+    secid, field, op, level = match.groups()
+    secid = secid.upper()
+
+    universe = snapshot_cache.peek_universe()
+    if universe is not None and not universe.empty and secid not in set(universe.df['SECID']):
+        await message.answer(f"❌ Облигация {secid} не найдена")
         return
 
-    user_data_storage[callback.from_user.id] = df_filtered
+    user_id = message.from_user.id
+    if await asyncio.to_thread(alert_store.count, user_id) >= Config.ALERT_MAX_PER_USER:
+        await message.answer(f"❌ Не больше {Config.ALERT_MAX_PER_USER} подписок")
+        return
 
-    table = format_bonds_table(df_filtered)
-    keyboard = bonds_list_keyboard(df_filtered)
+    alert_id = await asyncio.to_thread(
+        alert_store.add, user_id, secid, ALERT_FIELDS[field.lower()],
+        1 if op == ">" else -1, float(level.replace(",", "."))
+    )
+    await message.answer(f"✅ Подписка #{alert_id} создана. Список: /alerts")
+
+
+@router.message(Command("alerts"))
+async def cmd_alerts(message: Message):
+    alerts = await asyncio.to_thread(alert_store.user_alerts, message.from_user.id)
+    await message.answer(format_alerts(alerts), parse_mode="HTML")
+
+
+@router.message(Command("unalert"))
+async def cmd_unalert(message: Message, command: CommandObject):
+    args = (command.args or "").strip().lstrip("#")
 
-    await callback.message.edit_text(table, parse_mode="HTML", reply_markup=keyboard)
+    if not args.isdigit():
+        await message.answer("ℹ️ Использование: /unalert номер")
+        return
+
+    if await asyncio.to_thread(alert_store.remove, message.from_user.id, int(args)):
+        await message.answer(f"🗑 Подписка #{args} удалена")
+    else:
+        await message.answer("❌ Подписка не найдена")
+
+
+@router.message(Command("portfolio"))
+async def cmd_portfolio(message: Message, command: CommandObject):
+    args = (command.args or "").split()
+    user_id = message.from_user.id
+
+    if args:
+        # /portfolio SECID количество (0 — убрать позицию)
+        quantity = args[1].replace(",", ".") if len(args) == 2 else ""
+        try:
+            quantity = float(quantity)
+        except ValueError:
+            await message.answer("ℹ️ Использование: /portfolio SECID количество (0 — убрать)")
+            return
+
+        # float() принимает и nan/inf — такие количества в портфель не пускаем
+        if not (math.isfinite(quantity) and quantity >= 0):
+            await message.answer("❌ Количество должно быть неотрицательным числом")
+            return
+
+        secid = args[0].upper()
+        universe = snapshot_cache.peek_universe()
+        if quantity > 0 and universe is not None and not universe.empty and secid not in set(universe.df['SECID']):
+            await message.answer(f"❌ Облигация {secid} не найдена")
+            return
+
+        holdings = await asyncio.to_thread(portfolio_store.holdings, user_id)
+        if quantity > 0 and secid not in holdings and len(holdings) >= Config.PORTFOLIO_MAX_POSITIONS:
+            await message.answer(f"❌ Не больше {Config.PORTFOLIO_MAX_POSITIONS} позиций")
+            return
+
+        await asyncio.to_thread(portfolio_store.set, user_id, secid, quantity)
+
+    projection = await portfolio_store.calendar(user_id)
+    await message.answer(format_portfolio(projection), parse_mode="HTML")
+
+
+@router.message(Command("screen"))
+async def cmd_screen(message: Message, command: CommandObject):
+    args = (command.args or "").strip()
+    user_id = message.from_user.id
+
+    if args.lower() == "reset":
+        await asyncio.to_thread(profile_store.reset, user_id)
+    elif args:
+        try:
+            profile = parse_profile(args, await asyncio.to_thread(profile_store.get, user_id))
+        except ValueError as e:
+            await message.answer(f"❌ Не удалось разобрать профиль: {e}")
+            return
+        await asyncio.to_thread(profile_store.set, user_id, profile)
+
+    profile = await asyncio.to_thread(profile_store.get, user_id)
+    snapshot = await snapshot_cache.get_universe()
+
+    if snapshot.empty:
+        await message.answer("❌ Ошибка загрузки данных")
+        return
+
+    df = screener.screen(snapshot, profile)
+    await message.answer(format_screen_profile(profile), parse_mode="HTML")
+
+    if df.empty:
+        await message.answer("❌ Не найдено подходящих облигаций")
+        return
+
+    view = BondsView(snapshot.version, df, title="Отбор по вашему профилю")
+    session_store.set(user_id, view.version, view.secids)
+    sent = await message.answer(view.table, parse_mode="HTML", reply_markup=view.keyboard)
+    rendered_messages.remember(sent.chat.id, sent.message_id, view.digest)
+
+
+@router.message(Command("new"))
+async def cmd_new(message: Message):
+    user_id = message.from_user.id
+    session = await session_store.fetch(user_id)
+    snapshot = await snapshot_cache.get_universe()
+
+    if snapshot.empty:
+        await message.answer("❌ Ошибка загрузки данных")
+        return
+
+    # Сравниваем с версией, которую пользователь видел последней, иначе — с самой старой в памяти
+    previous = snapshot_cache.universe_at(session.version) if session is not None else None
+    since_text = "с прошлого просмотра"
+    if previous is None:
+        previous = snapshot_cache.oldest_universe()
+        since_text = f"за {int(previous.age // 60)} мин." if previous is not None else ""
+
+    if previous is None or previous.version == snapshot.version:
+        await message.answer(f"🆕 <b>Что нового</b> {since_text}\n\nБез изменений", parse_mode="HTML")
+    else:
+        diff = snapshot_differ.diff(previous, snapshot)
+        await message.answer(format_whats_new(diff, since_text), parse_mode="HTML")
+
+    session_store.set(user_id, snapshot.version, session.secids if session is not None else ())
+
+
+@router.callback_query((F.data == "refresh") | F.data.startswith("refresh:"))
+async def refresh_bonds(callback: CallbackQuery):
+    # refresh[:режим:страница] — обновляем ту страницу, что на экране
+    parts = callback.data.split(":")
+    mode, page = (parts[1], parts[2]) if len(parts) == 3 else ("rating", "0")
+    session = await session_store.fetch(callback.from_user.id)
+    snapshot = await snapshot_cache.get_universe()
+
+    if snapshot.empty:
+        await callback.answer()
+        await _edit(callback, "❌ Ошибка обновления")
+        return
+
+    view = view_cache.page(snapshot, mode if mode in SORT_MODES else "rating", int(page) if page.isdigit() else 0)
+
+    if view.empty:
+        await callback.answer()
+        await _edit(callback, "❌ Нет подходящих облигаций")
+        return
+
+    # Что изменилось с версии, которую пользователь видел
+    previous = snapshot_cache.universe_at(session.version) if session is not None else None
+    if previous is not None and previous.version != snapshot.version:
+        diff = snapshot_differ.diff(previous, snapshot)
+        notice = f"✅ +{len(diff.added)} −{len(diff.removed)} ~{len(diff.changed)}"
+    else:
+        notice = "✅ Обновлено"
+
+    session_store.set(callback.from_user.id, view.version, view.secids)
+
+    if not await _edit(callback, view.table, view.keyboard, view.digest):
+        notice = "✅ Без изменений"
+    await callback.answer(notice)
 
 
 @router.callback_query(F.data.startswith("bond:"))
 async def show_bond_details(callback: CallbackQuery):
-    ticker = callback.data.split(":")[1]
+    # bond:SECID[:режим:страница] — со страницы списка возвращаемся на неё же
+    ticker, *origin = callback.data.split(":")[1:]
     await callback.answer(f"ℹ️ {ticker}")
 
-    df_filtered = user_data_storage.get(callback.from_user.id)
-
-    if df_filtered is None or df_filtered.empty:
-        await callback.message.edit_text("❌ Данные устарели. Используйте /bonds")
+    if await session_store.fetch(callback.from_user.id) is None:
+        await _edit(callback, "❌ Данные устарели. Используйте /bonds")
         return
 
-    bond_row = df_filtered[df_filtered['SECID'] == ticker]
+    snapshot = await snapshot_cache.get_universe()
+
+    # Обычно график уже предзагружен вместе со снимком — тогда без запроса к бирже
+    await coupon_store.get(ticker)
+    details = view_cache.details(snapshot, ticker, limit=10) if not snapshot.empty else None
 
-    if bond_row.empty:
-        await callback.message.edit_text("❌ Облигация не найдена")
+    if details is None:
+        await _edit(callback, "❌ Облигация не найдена")
         return
 
-    details = format_bond_details(bond_row.iloc[0])
-    keyboard = bond_details_keyboard(ticker)
+    keyboard = bond_details_keyboard(ticker, f"page:{origin[0]}:{origin[1]}" if len(origin) == 2 else "back_to_list")
 
-    await callback.message.edit_text(details, parse_mode="HTML", reply_markup=keyboard)
+    await _edit(callback, details, keyboard)
 
 
 @router.callback_query(F.data == "back_to_list")
 async def back_to_list(callback: CallbackQuery):
     await callback.answer()
 
-    df_filtered = user_data_storage.get(callback.from_user.id)
+    snapshot = await snapshot_cache.get_universe()
+
+    if await session_store.fetch(callback.from_user.id) is None or snapshot.empty:
+        await _edit(callback, "❌ Данные устарели. Используйте /bonds")
+        return
+
+    view = view_cache.page(snapshot)
+    session_store.set(callback.from_user.id, view.version, view.secids)
+
+    await _edit(callback, view.table, view.keyboard, view.digest)
+
+
+@router.callback_query(F.data.startswith("page:"))
+async def show_page(callback: CallbackQuery):
+    _, mode, page = callback.data.split(":")
+    await callback.answer()
+
+    snapshot = await snapshot_cache.get_universe()
 
-    if df_filtered is None or df_filtered.empty:
-        await callback.message.edit_text("❌ Данные устарели. Используйте /bonds")
+    if snapshot.empty or mode not in SORT_MODES or not page.isdigit():
+        await _edit(callback, "❌ Данные устарели. Используйте /bonds")
         return
 
-    table = format_bonds_table(df_filtered)
-    keyboard = bonds_list_keyboard(df_filtered)
+    view = view_cache.page(snapshot, mode, int(page))
+    session_store.set(callback.from_user.id, view.version, view.secids)
+
+    await _edit(callback, view.table, view.keyboard, view.digest)
 
-    await callback.message.edit_text(table, parse_mode="HTML", reply_markup=keyboard)
\ No newline at end of file
+
+@router.callback_query(F.data == "noop")
+async def noop(callback: CallbackQuery):
+    await callback.answer()
@@ -11,13 +11,11 @@ class InlineKeyboards:
         """Клавиатура со списком облигаций"""
         buttons = []
 
-        for idx, row in df.iterrows():
-            ticker = row['SECID']
-            coupon = row['COUPONPERCENT']
-            years = row['YEARS_TO_MATURITY']
+        rows = zip(df.index, df['SECID'], df['COUPONPERCENT'], df['YEARS_TO_MATURITY'], df['RATING'])
 
+        for idx, ticker, coupon, years, rating in rows:
             # Эмодзи для визуального выделения рейтинга
-            rating_emoji = "⭐" if "ААА" in str(row['RATING']) else "💎" if "АА" in str(row['RATING']) else "🔷"
+            rating_emoji = "⭐" if "ААА" in str(rating) else "💎" if "АА" in str(rating) else "🔷"
 
             btn_text = f"{rating_emoji} {idx + 1}. {ticker} | {coupon:.1f}% | {years}г"
             buttons.append([InlineKeyboardButton(
@@ -6,9 +6,7 @@ def bonds_list_keyboard(df: pd.DataFrame) -> InlineKeyboardMarkup:
     """Клавиатура со списком облигаций"""
     buttons = []
 
-    for idx, row in df.iterrows():
-        ticker = row['SECID']
-        coupon = row['COUPONPERCENT']
+    for idx, ticker, coupon in zip(df.index, df['SECID'], df['COUPONPERCENT']):
         btn_text = f"{idx + 1}. {ticker} ({coupon:.1f}%)"
         buttons.append([InlineKeyboardButton(text=btn_text, callback_data=f"bond:{ticker}")])
 
@@ -16,9 +14,43 @@ def bonds_list_keyboard(df: pd.DataFrame) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
-def bond_details_keyboard(ticker: str) -> InlineKeyboardMarkup:
+def paged_bonds_keyboard(df: pd.DataFrame, mode: str, page: int, pages: int,
+                         modes: dict) -> InlineKeyboardMarkup:
+    """Клавиатура страницы списка: облигации, листание и режимы сортировки"""
+    buttons = []
+
+    # Карточка помнит страницу, на которую вернуться
+    for idx, ticker, coupon in zip(df.index, df['SECID'], df['COUPONPERCENT']):
+        btn_text = f"{idx + 1}. {ticker} ({coupon:.1f}%)"
+        buttons.append([InlineKeyboardButton(text=btn_text, callback_data=f"bond:{ticker}:{mode}:{page}")])
+
+    navigation = []
+    if page > 0:
+        navigation.append(InlineKeyboardButton(text="◀️", callback_data=f"page:{mode}:{page - 1}"))
+    navigation.append(InlineKeyboardButton(text=f"{page + 1}/{pages}", callback_data="noop"))
+    if page + 1 < pages:
+        navigation.append(InlineKeyboardButton(text="▶️", callback_data=f"page:{mode}:{page + 1}"))
+    buttons.append(navigation)
+
+    buttons.append([
+        InlineKeyboardButton(text=("• " if name == mode else "") + label, callback_data=f"page:{name}:0")
+        for name, label in modes.items()
+    ])
+    buttons.append([InlineKeyboardButton(text="🔄 Обновить", callback_data=f"refresh:{mode}:{page}")])
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+def bond_details_keyboard(ticker: str, back: str = "back_to_list") -> InlineKeyboardMarkup:
     """Клавиатура для деталей облигации"""
     return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_list")],
+        [InlineKeyboardButton(text="🔙 Назад", callback_data=back)],
         [InlineKeyboardButton(text="🔄 Обновить", callback_data="refresh")]
-    ])
\ No newline at end of file
+    ])
+
+def search_results_keyboard(df: pd.DataFrame) -> InlineKeyboardMarkup:
+    """Клавиатура с результатами поиска"""
+    buttons = [
+        [InlineKeyboardButton(text=f"{pos}. {ticker}", callback_data=f"bond:{ticker}")]
+        for pos, ticker in enumerate(df['SECID'], start=1)
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
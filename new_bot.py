@@ -9,15 +9,18 @@ from aiogram.filters import CommandStart, Command
 from aiogram.types import Message, FSInputFile
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.fsm.storage.memory import MemoryStorage
 
 from config import Config
-import sqlite3
-import aiohttp
+from services.exchange_rates import exchange_rates
+from services.http_client import http_client
+from services.expenses_repo import expenses_repo, month_key
+from services.fsm_storage import build_storage, kv_store
+from services.users_repo import finance_db, users_repo
+from services.webhook import run_webhook
+import time
 import logging
-import requests
 
-dp = Dispatcher()
+dp = Dispatcher(storage=build_storage())
 bot = Bot(token=Config.BOT_TOKEN)
 
 logging.basicConfig(level=logging.INFO)
@@ -26,31 +29,14 @@ button_registr = KeyboardButton(text="Регистрация в телеграм
 button_exchange_rates = KeyboardButton(text="Курс валют")
 button_tips = KeyboardButton(text="Советы по экономии")
 button_finances = KeyboardButton(text="Личные финансы")
+button_report = KeyboardButton(text="Мои расходы")
 
 keyboards = ReplyKeyboardMarkup(keyboard=[
     [button_registr, button_exchange_rates],
-    [button_tips, button_finances]
+    [button_tips, button_finances],
+    [button_report]
     ], resize_keyboard=True)
 
-conn = sqlite3.connect('user.db')
-cursor = conn.cursor()
-
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS users (
-    id INTEGER PRIMARY KEY,
-    telegram_id INTEGER UNIQUE,
-    name TEXT,
-    category1 TEXT,
-    category2 TEXT,
-    category3 TEXT,
-    expenses1 REAL,
-    expenses2 REAL,
-    expenses3 REAL
-    )
-''')
-
-conn.commit()
-
 class FinancesForm(StatesGroup):
     category1 = State()
     expenses1 = State()
@@ -68,35 +54,25 @@ async def send_start(message: Message):
 async def registration(message: Message):
     telegram_id = message.from_user.id
     name = message.from_user.full_name
-    cursor.execute('''SELECT * FROM users WHERE telegram_id = ?''', (telegram_id,))
-    user = cursor.fetchone()
-    if user:
-        await message.answer("Вы уже зарегистрированы!")
-    else:
-        cursor.execute('''INSERT INTO users (telegram_id, name) VALUES (?, ?)''', (telegram_id, name))
-        conn.commit()
+    if await users_repo.register(telegram_id, name):
         await message.answer("Вы успешно зарегистрированы!")
+    else:
+        await message.answer("Вы уже зарегистрированы!")
 
 @dp.message(F.text == "Курс валют")
-async def exchange_rates(message: Message):
-    url = "https://v6.exchangerate-api.com/v6/09edf8b2bb246e1f801cbfba/latest/USD"
-    try:
-        response = requests.get(url)
-        data = response.json()
-        if response.status_code != 200:
-            await message.answer("Не удалось получить данные о курсе валют!")
-            return
-        usd_to_rub = data['conversion_rates']['RUB']
-        eur_to_usd = data['conversion_rates']['EUR']
+async def exchange_rates_handler(message: Message):
+    rates = await exchange_rates.rates_to("RUB", Config.EXCHANGE_RATES_CURRENCIES)
+    if not rates:
+        await message.answer("Не удалось получить данные о курсе валют!")
+        return
 
-        euro_to_rub = eur_to_usd * usd_to_rub
+    lines = [f"1 {currency} - {rate:.2f}  RUB" for currency, rate in rates.items()]
 
-        await message.answer(f"1 USD - {usd_to_rub:.2f}  RUB\n"
-                             f"1 EUR - {euro_to_rub:.2f}  RUB")
+    # Источник недоступен — показываем последние известные курсы с пометкой
+    if exchange_rates.failing:
+        lines.append(f"⚠️ Данные {int(exchange_rates.age // 60)} мин. назад")
 
-
-    except:
-        await message.answer("Произошла ошибка")
+    await message.answer("\n".join(lines))
 
 @dp.message(F.text == "Советы по экономии")
 async def send_tips(message: Message):
@@ -147,16 +123,65 @@ async def finances(message: Message, state: FSMContext):
 async def finances(message: Message, state: FSMContext):
     data = await state.get_data()
     telegram_id = message.from_user.id
-    cursor.execute('''UPDATE users SET category1 = ?, expenses1 = ?, category2 = ?, expenses2 = ?, category3 = ?, expenses3 = ? WHERE telegram_id = ?''',
-                   (data['category1'], data['expenses1'], data['category2'], data['expenses2'], data['category3'], float(message.text), telegram_id))
-    conn.commit()
+    await expenses_repo.add(telegram_id, [
+        (data['category1'], data['expenses1']),
+        (data['category2'], data['expenses2']),
+        (data['category3'], float(message.text)),
+    ])
     await state.clear()
 
     await message.answer("Категории и расходы сохранены!")
 
+@dp.message(F.text == "Мои расходы")
+async def expenses_report(message: Message):
+    telegram_id = message.from_user.id
+    month = month_key(time.time())
+    categories = await expenses_repo.month_by_category(telegram_id, month)
+    months = await expenses_repo.monthly_totals(telegram_id, months=6)
+
+    if not months:
+        await message.answer("Расходов пока нет. Добавьте их через «Личные финансы».")
+        return
+
+    lines = [f"Расходы за {month % 100:02d}.{month // 100}:"]
+    for category, total, count in categories:
+        lines.append(f"• {category}: {total:.2f} ({count})")
+    if not categories:
+        lines.append("• в этом месяце расходов нет")
+
+    lines.append("")
+    lines.append("По месяцам:")
+    for key, total in months:
+        lines.append(f"{key % 100:02d}.{key // 100}: {total:.2f}")
+
+    await message.answer("\n".join(lines))
+
+
+async def on_startup():
+    await http_client.start()
+    await finance_db.start()
+
+
+async def on_shutdown():
+    await finance_db.close()
+    await http_client.close()
+
+    # Несохранённые состояния FSM дописываются, соединение с хранилищем закрывается
+    if kv_store is not None:
+        await kv_store.close()
+
 
 async def main():
-    await dp.start_polling(bot)
+    # Общая HTTP-сессия для курсов и база с потоком записи
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+
+    if Config.BOT_MODE == "webhook":
+        await run_webhook(dp, bot)
+    else:
+        # Polling не работает при установленном вебхуке — снимаем его, как в bot.py
+        await bot.delete_webhook(drop_pending_updates=True)
+        await dp.start_polling(bot)
 
 if __name__ == '__main__':
     asyncio.run(main())
\ No newline at end of file
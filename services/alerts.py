@@ -0,0 +1,282 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+from services.local_db import local_database
+from services.moex_service import MoexService
+from services.snapshot import BondSnapshot
+
+
+logger = logging.getLogger(__name__)
+
+# Отслеживаемые величины и их колонки в снимке (первая непустая)
+FIELDS = ("yield", "price")
+FIELD_COLUMNS = {
+    "yield": MoexService.YIELD_COLUMNS,
+    "price": ("LAST",),
+}
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS alerts (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        secid TEXT NOT NULL,
+        field INTEGER NOT NULL,
+        sign INTEGER NOT NULL,
+        threshold REAL NOT NULL,
+        armed INTEGER NOT NULL DEFAULT 1,
+        last_fired REAL NOT NULL DEFAULT 0
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_alerts_secid ON alerts (secid);
+    CREATE INDEX IF NOT EXISTS idx_alerts_user ON alerts (user_id);
+'''
+
+
+class AlertStore:
+    """Подписки на пересечение уровня доходности/цены; проверяются пачкой на каждом снимке"""
+
+    def __init__(self, path: str = Config.ALERTS_DB_PATH):
+        self.db = local_database(path)
+        self.db.add_schema(SCHEMA)
+        # Массивы меняют обработчики (через to_thread) и проверка снимка в другом потоке:
+        # любое изменение состояния в памяти — под этим замком, запись в базу — внутри него
+        self._lock = threading.RLock()
+        self._data_version: Optional[int] = None
+        self._notifier: Optional[Callable[[int, List[dict]], Awaitable]] = None
+
+        # Подписки в колонках numpy; SECID закодированы индексом в словаре
+        self._secids: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self._pending: List[tuple] = []
+        self.ids = np.empty(0, dtype=np.int64)
+        self.user_ids = np.empty(0, dtype=np.int64)
+        self.secid_codes = np.empty(0, dtype=np.int32)
+        self.fields = np.empty(0, dtype=np.int8)
+        self.signs = np.empty(0, dtype=np.int8)
+        self.thresholds = np.empty(0, dtype=np.float64)
+        self.armed = np.empty(0, dtype=bool)
+        self.last_fired = np.empty(0, dtype=np.float64)
+        self.active = np.empty(0, dtype=bool)
+
+        self.evaluations = 0
+        self.fired = 0
+        self.suppressed = 0
+
+    def set_notifier(self, notifier: Callable[[int, List[dict]], Awaitable]) -> None:
+        """Доставка сработавших подписок: notifier(user_id, список срабатываний)"""
+        self._notifier = notifier
+
+    def _code(self, secid: str) -> int:
+        """Код SECID в словаре (вызывается под замком)"""
+        code = self._codes.get(secid)
+        if code is None:
+            code = self._codes[secid] = len(self._secids)
+            self._secids.append(secid)
+        return code
+
+    def load(self) -> int:
+        """Загрузка всех подписок из базы в массивы"""
+        # Чтение и замена массивов — под одним замком: добавленная между ними подписка
+        # иначе попала бы и в базу, и в очередь на дописывание
+        with self._lock:
+            with self.db.read() as conn:
+                rows = conn.execute(
+                    "SELECT id, user_id, secid, field, sign, threshold, armed, last_fired FROM alerts ORDER BY id"
+                ).fetchall()
+                self._data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+
+            df = pd.DataFrame(rows, columns=["id", "user_id", "secid", "field", "sign", "threshold",
+                                             "armed", "last_fired"])
+            codes, secids = pd.factorize(df['secid'])
+
+            self._secids = list(secids)
+            self._codes = {secid: code for code, secid in enumerate(self._secids)}
+            self._pending = []
+            self.ids = df['id'].to_numpy(dtype=np.int64)
+            self.user_ids = df['user_id'].to_numpy(dtype=np.int64)
+            self.secid_codes = codes.astype(np.int32)
+            self.fields = df['field'].to_numpy(dtype=np.int8)
+            self.signs = df['sign'].to_numpy(dtype=np.int8)
+            self.thresholds = df['threshold'].to_numpy(dtype=np.float64)
+            self.armed = df['armed'].to_numpy(dtype=bool)
+            self.last_fired = df['last_fired'].to_numpy(dtype=np.float64)
+            self.active = np.ones(len(df), dtype=bool)
+            return len(df)
+
+    def _changed_elsewhere(self) -> bool:
+        """Подписки меняли другие процессы (воркеры) — массивы надо перечитать"""
+        with self.db.read() as conn:
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+        return version != self._data_version
+
+    def add(self, user_id: int, secid: str, field: str, sign: int, threshold: float) -> int:
+        """Новая подписка; возвращает её номер"""
+        with self._lock:
+            with self.db.transaction() as conn:
+                alert_id = conn.execute(
+                    "INSERT INTO alerts (user_id, secid, field, sign, threshold) VALUES (?, ?, ?, ?, ?)",
+                    (user_id, secid, FIELDS.index(field), sign, threshold)
+                ).lastrowid
+
+            self._pending.append((alert_id, user_id, self._code(secid), FIELDS.index(field), sign, threshold))
+            return alert_id
+
+    def remove(self, user_id: int, alert_id: int) -> bool:
+        with self._lock:
+            with self.db.transaction() as conn:
+                deleted = conn.execute(
+                    "DELETE FROM alerts WHERE id = ? AND user_id = ?", (alert_id, user_id)
+                ).rowcount
+
+            if deleted:
+                self._merge_pending()
+                # SQLite повторно выдаёт номер последней удалённой записи — снимаем только живую
+                self.active[(self.ids == alert_id) & self.active] = False
+            return deleted > 0
+
+    def user_alerts(self, user_id: int) -> List[Tuple[int, str, str, int, float]]:
+        """Подписки пользователя: (номер, SECID, величина, знак, уровень)"""
+        with self.db.read() as conn:
+            rows = conn.execute(
+                "SELECT id, secid, field, sign, threshold FROM alerts WHERE user_id = ? ORDER BY id",
+                (user_id,)
+            ).fetchall()
+        return [(i, secid, FIELDS[field], sign, threshold) for i, secid, field, sign, threshold in rows]
+
+    def count(self, user_id: int) -> int:
+        with self.db.read() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM alerts WHERE user_id = ?", (user_id,)
+            ).fetchone()[0]
+
+    def _merge_pending(self) -> None:
+        """Добавленные подписки дописываются в массивы одной операцией (под замком)"""
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, []
+        ids, users, codes, fields, signs, thresholds = map(np.array, zip(*pending))
+        count = len(ids)
+
+        self.ids = np.concatenate([self.ids, ids.astype(np.int64)])
+        self.user_ids = np.concatenate([self.user_ids, users.astype(np.int64)])
+        self.secid_codes = np.concatenate([self.secid_codes, codes.astype(np.int32)])
+        self.fields = np.concatenate([self.fields, fields.astype(np.int8)])
+        self.signs = np.concatenate([self.signs, signs.astype(np.int8)])
+        self.thresholds = np.concatenate([self.thresholds, thresholds.astype(np.float64)])
+        self.armed = np.concatenate([self.armed, np.ones(count, dtype=bool)])
+        self.last_fired = np.concatenate([self.last_fired, np.zeros(count)])
+        self.active = np.concatenate([self.active, np.ones(count, dtype=bool)])
+
+    def _values(self, df: pd.DataFrame) -> np.ndarray:
+        """Текущие значения величин по словарю SECID: матрица (величина, код SECID)"""
+        values = np.full((len(FIELDS), len(self._secids)), np.nan)
+        positions = pd.Index(self._secids).get_indexer(df['SECID'])
+        found = positions >= 0
+
+        for field_index, field in enumerate(FIELDS):
+            column = MoexService.coalesce(df, FIELD_COLUMNS[field])
+            values[field_index, positions[found]] = column[found]
+
+        return values
+
+    def evaluate(self, df: pd.DataFrame, now: Optional[float] = None) -> Dict[int, List[dict]]:
+        """Проверка всех подписок за один проход; возвращает срабатывания по пользователям"""
+        now = now or time.time()
+
+        with self._lock:
+            self._merge_pending()
+            self.evaluations += 1
+
+            if not len(self.ids) or df.empty:
+                return {}
+
+            current = self._values(df)[self.fields, self.secid_codes]
+            with np.errstate(invalid='ignore'):
+                crossed = self.active & (self.signs * (current - self.thresholds) > 0)
+
+            # Срабатывает только переход через уровень; повтор — не раньше паузы
+            ready = crossed & self.armed
+            cooling = ready & (self.last_fired > 0) & (now - self.last_fired < Config.ALERT_COOLDOWN)
+            fire = ready & ~cooling
+            self.suppressed += int(cooling.sum())
+
+            # Повторно взводятся подписки, чьё условие снова не выполняется
+            rearm = ~crossed & ~self.armed & ~np.isnan(current)
+            self.armed[fire] = False
+            self.armed[rearm] = True
+            self.last_fired[fire] = now
+            self._persist_state(np.flatnonzero(fire | rearm))
+
+            fired = np.flatnonzero(fire)
+            self.fired += len(fired)
+
+            # Срабатывания группируются по пользователю: одно сообщение на пользователя
+            fired = fired[np.argsort(self.user_ids[fired], kind="stable")]
+            notifications: Dict[int, List[dict]] = {}
+            for index in fired.tolist():
+                notifications.setdefault(int(self.user_ids[index]), []).append({
+                    "id": int(self.ids[index]),
+                    "secid": self._secids[self.secid_codes[index]],
+                    "field": FIELDS[self.fields[index]],
+                    "sign": int(self.signs[index]),
+                    "threshold": float(self.thresholds[index]),
+                    "value": float(current[index]),
+                })
+            return notifications
+
+    def _persist_state(self, indexes: np.ndarray) -> None:
+        if not len(indexes):
+            return
+
+        rows = list(zip(
+            self.armed[indexes].astype(int).tolist(),
+            self.last_fired[indexes].tolist(),
+            self.ids[indexes].tolist()
+        ))
+        with self.db.transaction() as conn:
+            conn.executemany("UPDATE alerts SET armed = ?, last_fired = ? WHERE id = ?", rows)
+        # Свои записи не должны вызывать перечитывания
+        with self.db.read() as conn:
+            self._data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _check(self, df: pd.DataFrame) -> Dict[int, List[dict]]:
+        with self._lock:
+            if self._data_version is None or self._changed_elsewhere():
+                self.load()
+            return self.evaluate(df)
+
+    async def check(self, snapshot: BondSnapshot) -> None:
+        """Проверка подписок на новом снимке (подписчик обновления снимка)"""
+        if snapshot.empty:
+            return
+
+        notifications = await asyncio.to_thread(self._check, snapshot.df)
+        if not notifications or self._notifier is None:
+            return
+
+        for user_id, items in notifications.items():
+            # Не больше ALERT_NOTIFY_LIMIT строк одному пользователю за снимок
+            try:
+                await self._notifier(user_id, items[:Config.ALERT_NOTIFY_LIMIT])
+            except Exception as e:
+                logger.error(f"Ошибка уведомления {user_id}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "alerts": int(self.active.sum()) + len(self._pending),
+            "evaluations": self.evaluations,
+            "fired": self.fired,
+            "suppressed": self.suppressed,
+        }
+
+
+# Единое хранилище подписок на процесс
+alert_store = AlertStore()
@@ -0,0 +1,184 @@
+import logging
+from datetime import date
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+from services.coupons import CouponStore, coupon_store
+
+
+logger = logging.getLogger(__name__)
+
+# Расчётные колонки снимка
+ANALYTICS_COLUMNS = ["YTM", "DURATION", "MOD_DURATION", "CONVEXITY"]
+
+
+def synthetic_cashflows(days_to_maturity: np.ndarray, period: np.ndarray, coupon: np.ndarray,
+                        face: np.ndarray, max_flows: int = Config.ANALYTICS_MAX_FLOWS
+                        ) -> Tuple[np.ndarray, np.ndarray]:
+    """Поток платежей по купону и периоду: от погашения назад с шагом периода.
+
+    Возвращает матрицы (срок в днях, сумма) размером (бумаги × платежи), хвост — нули.
+    """
+    period = np.where(period > 0, period, 0)
+    counts = np.where(period > 0, np.ceil(days_to_maturity / np.maximum(period, 1)), 1)
+    width = int(min(max(counts.max(initial=1), 1), max_flows))
+
+    steps = np.arange(width)
+    days = days_to_maturity[:, None] - period[:, None] * steps[None, :]
+    valid = (days > 0) & (steps[None, :] < counts[:, None])
+
+    amounts = np.where(valid, coupon[:, None], 0.0)
+    amounts[:, 0] += np.where(days_to_maturity > 0, face, 0.0)
+    return np.where(valid, days, 0.0), amounts
+
+
+def solve_ytm(times: np.ndarray, amounts: np.ndarray, price: np.ndarray, guess: np.ndarray,
+              iterations: int = Config.ANALYTICS_ITERATIONS, tolerance: float = 1e-10) -> np.ndarray:
+    """Эффективная годовая доходность: метод Ньютона сразу для всех бумаг"""
+    # Доходность не опускается ниже -99%, иначе дисконт теряет смысл
+    y = np.maximum(np.where(np.isfinite(guess), guess, 0.1), -0.99)
+    active = np.isfinite(price) & (price > 0) & (amounts.sum(axis=1) > 0)
+    weighted = times * amounts
+
+    # На каждой итерации считаем только ещё не сошедшиеся бумаги
+    pending = np.flatnonzero(active)
+    for _ in range(iterations):
+        if not len(pending):
+            break
+
+        rate = np.log1p(y[pending])
+        discount = np.exp(-times[pending] * rate[:, None])
+        value = np.einsum('ij,ij->i', amounts[pending], discount)
+        slope = -np.einsum('ij,ij->i', weighted[pending], discount) / (1 + y[pending])
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = np.nan_to_num((value - price[pending]) / slope)
+
+        y[pending] = np.maximum(y[pending] - step, -0.99)
+        pending = pending[np.abs(step) >= tolerance]
+
+    return np.where(active, y, np.nan)
+
+
+def risk_measures(times: np.ndarray, amounts: np.ndarray, price: np.ndarray,
+                  y: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Дюрация Маколея, модифицированная дюрация и выпуклость при доходности y"""
+    present = amounts * np.exp(-times * np.log1p(y)[:, None])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        duration = (times * present).sum(axis=1) / price
+        modified = duration / (1 + y)
+        convexity = (times * (times + 1) * present).sum(axis=1) / (price * (1 + y) ** 2)
+
+    return duration, modified, convexity
+
+
+class BondAnalytics:
+    """Доходность к погашению, дюрация и выпуклость для всего снимка одним проходом"""
+
+    def __init__(self, coupons: CouponStore = coupon_store):
+        self.coupons = coupons
+
+    def enrich(self, df: pd.DataFrame, today: Optional[date] = None) -> pd.DataFrame:
+        """Копия таблицы с расчётными колонками (NaN, где посчитать нельзя)"""
+        if df.empty:
+            return df
+
+        today = pd.Timestamp(today or date.today())
+        n = len(df)
+
+        face = self._numeric(df, 'FACEVALUE', 1000.0)
+        coupon_rate = self._numeric(df, 'COUPONPERCENT', np.nan)
+        period = self._numeric(df, 'COUPONPERIOD', 0.0)
+        accrued = np.nan_to_num(self._numeric(df, 'ACCRUEDINT', 0.0))
+
+        # Цена в процентах от номинала: последняя сделка, иначе цена предыдущего дня
+        price = self._numeric(df, 'LAST', np.nan)
+        price = np.where(np.isfinite(price), price, self._numeric(df, 'PREVPRICE', np.nan))
+        dirty = price / 100 * face + accrued
+
+        if 'MATDATE' in df.columns:
+            days_to_maturity = (pd.to_datetime(df['MATDATE']) - today).dt.days.to_numpy(dtype=float)
+        else:
+            days_to_maturity = np.full(n, np.nan)
+        days_to_maturity = np.nan_to_num(days_to_maturity, nan=-1.0)
+
+        coupon_amount = np.nan_to_num(face * coupon_rate / 100 * period / 365)
+        days, amounts = synthetic_cashflows(days_to_maturity, period, coupon_amount, face)
+        days, amounts = self._apply_schedules(df, today, days, amounts, face, coupon_amount, days_to_maturity)
+
+        times = days / 365
+        # Начальное приближение — приближённая доходность к погашению, сокращает число итераций
+        years = np.maximum(days_to_maturity, 1) / 365
+        with np.errstate(divide='ignore', invalid='ignore'):
+            guess = (np.nan_to_num(face * coupon_rate / 100) + (face - dirty) / years) / ((face + dirty) / 2)
+        ytm = solve_ytm(times, amounts, dirty, guess)
+        duration, modified, convexity = risk_measures(times, amounts, dirty, ytm)
+
+        # Нерасходящиеся и неправдоподобные решения не показываем
+        bad = ~np.isfinite(ytm) | (ytm < Config.ANALYTICS_MIN_YTM) | (ytm > Config.ANALYTICS_MAX_YTM)
+
+        result = df.copy()
+        result['YTM'] = np.where(bad, np.nan, ytm * 100)
+        result['DURATION'] = np.where(bad, np.nan, duration)
+        result['MOD_DURATION'] = np.where(bad, np.nan, modified)
+        result['CONVEXITY'] = np.where(bad, np.nan, convexity)
+        return result
+
+    def _apply_schedules(self, df: pd.DataFrame, today: pd.Timestamp, days: np.ndarray,
+                         amounts: np.ndarray, face: np.ndarray, coupon_amount: np.ndarray,
+                         days_to_maturity: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Замена синтетических потоков на загруженные графики купонов, где они есть"""
+        schedules = self.coupons.loaded()
+        if not schedules:
+            return days, amounts
+
+        # Все графики одной таблицей и привязка платежей к строкам снимка (SECID может
+        # повторяться в разных режимах торгов)
+        flows = pd.concat(schedules, names=['SECID', None]).reset_index(level=0)
+        flows = flows.loc[flows['coupondate'] > today, ['SECID', 'coupondate', 'value']]
+        rows_frame = pd.DataFrame({'SECID': df['SECID'].to_numpy(), 'row': np.arange(len(df))})
+        flows = rows_frame.merge(flows, on='SECID').sort_values(['row', 'coupondate'], kind='stable')
+        if flows.empty:
+            return days, amounts
+
+        rows = flows['row'].to_numpy()
+        columns = flows.groupby('row').cumcount().to_numpy()
+        counts = np.bincount(rows, minlength=len(df))
+
+        # Необъявленные купоны — по последнему известному размеру или по ставке
+        values = pd.to_numeric(flows['value'], errors='coerce').groupby(rows).ffill().to_numpy(dtype=float)
+        values = np.where(np.isnan(values), coupon_amount[rows], values)
+        coupon_days = (flows['coupondate'] - today).dt.days.to_numpy(dtype=float)
+
+        # Лишний столбец — под отдельный платёж номинала
+        width = max(days.shape[1], int(counts.max()) + 1)
+        if width > days.shape[1]:
+            pad = width - days.shape[1]
+            days = np.pad(days, ((0, 0), (0, pad)))
+            amounts = np.pad(amounts, ((0, 0), (0, pad)))
+
+        replaced = np.flatnonzero(counts)
+        days[replaced] = 0.0
+        amounts[replaced] = 0.0
+        days[rows, columns] = coupon_days
+        amounts[rows, columns] = values
+
+        # Номинал — всегда в дату погашения, отдельным платежом после купонов
+        repaid = replaced[days_to_maturity[replaced] > 0]
+        days[repaid, counts[repaid]] = days_to_maturity[repaid]
+        amounts[repaid, counts[repaid]] = face[repaid]
+        return days, amounts
+
+    @staticmethod
+    def _numeric(df: pd.DataFrame, column: str, default: float) -> np.ndarray:
+        if column not in df.columns:
+            return np.full(len(df), default, dtype=float)
+        return pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=float)
+
+
+# Единый расчётный модуль на процесс
+bond_analytics = BondAnalytics()
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from config import Config
+
+
+logger = logging.getLogger(__name__)
+
+# Маркер остановки потока записи
+_STOP = object()
+
+
+class AsyncDatabase:
+    """Асинхронный доступ к SQLite: один поток записи с групповым коммитом и пул читателей"""
+
+    def __init__(self, path: str, readers: int = Config.FINANCE_DB_READERS,
+                 batch_size: int = Config.FINANCE_DB_BATCH):
+        self.path = path
+        self.readers = readers
+        self.batch_size = batch_size
+        self._schema: List[str] = []
+        self._migrations: Dict[int, str] = {}
+        self._writes: "queue.Queue" = queue.Queue()
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+
+        self.commits = 0
+        self.statements = 0
+
+    def add_schema(self, script: str) -> None:
+        """Скрипт схемы, выполняется при старте (до первых запросов)"""
+        self._schema.append(script)
+
+    def add_migration(self, version: int, script: str) -> None:
+        """Миграция схемы; применяется один раз, номер хранится в PRAGMA user_version"""
+        self._migrations[version] = script
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        current = conn.execute("PRAGMA user_version").fetchone()[0]
+
+        for version in sorted(v for v in self._migrations if v > current):
+            logger.info(f"Миграция базы {self.path} до версии {version}")
+            try:
+                conn.executescript(
+                    f"BEGIN;\n{self._migrations[version]}\nPRAGMA user_version = {version};\nCOMMIT;"
+                )
+            except sqlite3.Error:
+                # executescript останавливается на ошибке, не закрыв транзакцию — откатываем её сами
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+
+    def _open(self) -> sqlite3.Connection:
+        # Автокоммит выключен вручную: транзакциями управляет поток записи.
+        # Кэш подготовленных выражений sqlite3 работает для постоянных строк SQL.
+        conn = sqlite3.connect(self.path, check_same_thread=False,
+                               isolation_level=None, cached_statements=256)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    async def start(self) -> None:
+        if self._writer is not None:
+            return
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        writer_conn = await asyncio.to_thread(self._open)
+        try:
+            for script in self._schema:
+                await asyncio.to_thread(writer_conn.executescript, script)
+            await asyncio.to_thread(self._migrate, writer_conn)
+        except sqlite3.Error:
+            writer_conn.close()
+            raise
+
+        for _ in range(self.readers):
+            self._pool.put(await asyncio.to_thread(self._open))
+
+        self._writer = threading.Thread(
+            target=self._write_loop, args=(writer_conn,), name="sqlite-writer", daemon=True
+        )
+        self._writer.start()
+
+    async def close(self) -> None:
+        if self._writer is None:
+            return
+
+        self._writes.put(_STOP)
+        await asyncio.to_thread(self._writer.join)
+        self._writer = None
+
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+    async def execute(self, sql: str, params: Sequence[Any] = ()) -> int:
+        """Запись через очередь; возвращает rowcount после коммита пачки"""
+        if self._writer is None:
+            raise RuntimeError("База не запущена")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._writes.put((sql, params, False, future, loop))
+        return await future
+
+    async def execute_many(self, sql: str, rows: Sequence[Sequence[Any]]) -> int:
+        """Пакет строк одним выражением: строки попадают в одну транзакцию"""
+        if self._writer is None:
+            raise RuntimeError("База не запущена")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._writes.put((sql, rows, True, future, loop))
+        return await future
+
+    async def fetchone(self, sql: str, params: Sequence[Any] = ()) -> Optional[Tuple]:
+        return await asyncio.to_thread(self._read, sql, params, False)
+
+    async def fetchall(self, sql: str, params: Sequence[Any] = ()) -> List[Tuple]:
+        return await asyncio.to_thread(self._read, sql, params, True)
+
+    def _read(self, sql: str, params: Sequence[Any], many: bool):
+        conn = self._pool.get()
+        try:
+            cursor = conn.execute(sql, params)
+            return cursor.fetchall() if many else cursor.fetchone()
+        finally:
+            self._pool.put(conn)
+
+    def _write_loop(self, conn: sqlite3.Connection) -> None:
+        stop = False
+
+        while not stop:
+            batch = [self._writes.get()]
+
+            # Всё, что накопилось за время предыдущего коммита, идёт одной транзакцией
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+
+            if _STOP in batch:
+                stop = True
+                batch = [item for item in batch if item is not _STOP]
+            if batch:
+                self._commit_batch(conn, batch)
+
+        conn.close()
+
+    def _commit_batch(self, conn: sqlite3.Connection, batch: list) -> None:
+        results = []
+
+        try:
+            conn.execute("BEGIN")
+            for sql, params, many, _future, _loop in batch:
+                # Ошибка выражения откатывает только его, остальные пишутся
+                try:
+                    if many:
+                        conn.execute("SAVEPOINT many")
+                        try:
+                            results.append(conn.executemany(sql, params).rowcount)
+                        except sqlite3.Error:
+                            conn.execute("ROLLBACK TO many")
+                            raise
+                        finally:
+                            conn.execute("RELEASE many")
+                    else:
+                        results.append(conn.execute(sql, params).rowcount)
+                except sqlite3.Error as e:
+                    results.append(e)
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка коммита пачки записи: {e}")
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            results = [e] * len(batch)
+
+        self.commits += 1
+        self.statements += len(batch)
+
+        for (_sql, _params, _many, future, loop), result in zip(batch, results):
+            loop.call_soon_threadsafe(self._resolve, future, result)
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, result) -> None:
+        if future.done():
+            return
+        if isinstance(result, Exception):
+            future.set_exception(result)
+        else:
+            future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "commits": self.commits,
+            "statements": self.statements,
+            "pending": self._writes.qsize(),
+        }
@@ -1,27 +1,49 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from typing import List, Dict
 
+from services.filter_engine import compile_keywords, keyword_mask, lower_text, matures_after, top_n
+
 
 class BondAnalyzer:
     """Анализатор и фильтр облигаций"""
 
+    OFFER_KEYWORDS = [
+        'оферта', 'оферты', 'оферте', 'call', 'put',
+        'досрочн', 'досроч', 'погашен', 'погашени'
+    ]
+    AMORT_KEYWORDS = ['аморт', 'амортизац', 'погашен', 'погашени']
+    STATE_CORPS = ['вэб', 'ржд', 'росатом', 'роснефт', 'газпром', 'транснефт']
+    SYSTEM_BANKS = ['сбербанк', 'втб']
+    LARGE_COMPANIES = ['газпром', 'лукойл', 'сургутнефтегаз']
+
+    # Рейтинги в порядке надёжности: код рейтинга = позиция + 1
+    RATING_LABELS = np.array([
+        "🇷🇺 ААА (ОФЗ)",
+        "🏛️ АА (Госкорп.)",
+        "🏦 А+ (Системный банк)",
+        "🏭 А (Крупная компания)",
+        "📊 BBB (Иные эмитенты)"
+    ], dtype=object)
+
+    OFFER_PATTERN = compile_keywords(OFFER_KEYWORDS)
+    AMORT_PATTERN = compile_keywords(AMORT_KEYWORDS)
+    STATE_CORPS_PATTERN = compile_keywords(STATE_CORPS)
+    SYSTEM_BANKS_PATTERN = compile_keywords(SYSTEM_BANKS)
+    LARGE_COMPANIES_PATTERN = compile_keywords(LARGE_COMPANIES)
+
     @staticmethod
     def has_offer(name: str) -> bool:
         """Проверка наличия оферты в названии"""
-        offer_keywords = [
-            'оферта', 'оферты', 'оферте', 'call', 'put',
-            'досрочн', 'досроч', 'погашен', 'погашени'
-        ]
         name_lower = str(name).lower()
-        return any(keyword in name_lower for keyword in offer_keywords)
+        return any(keyword in name_lower for keyword in BondAnalyzer.OFFER_KEYWORDS)
 
     @staticmethod
     def has_amortization(name: str) -> bool:
         """Проверка наличия амортизации"""
-        amort_keywords = ['аморт', 'амортизац', 'погашен', 'погашени']
         name_lower = str(name).lower()
-        return any(keyword in name_lower for keyword in amort_keywords)
+        return any(keyword in name_lower for keyword in BondAnalyzer.AMORT_KEYWORDS)
 
     @staticmethod
     def calculate_rating(row: pd.Series) -> str:
@@ -31,23 +53,35 @@ class BondAnalyzer:
 
         # ОФЗ - наивысший рейтинг
         if 'офз' in shortname or 'федеральн' in secname:
-            return "🇷🇺 ААА (ОФЗ)"
+            return BondAnalyzer.RATING_LABELS[0]
 
         # Госкорпорации
-        state_corps = ['вэб', 'ржд', 'росатом', 'роснефт', 'газпром', 'транснефт']
-        if any(corp in secname for corp in state_corps):
-            return "🏛️ АА (Госкорп.)"
+        if any(corp in secname for corp in BondAnalyzer.STATE_CORPS):
+            return BondAnalyzer.RATING_LABELS[1]
 
         # Системообразующие банки
-        if 'сбербанк' in secname or 'втб' in secname:
-            return "🏦 А+ (Системный банк)"
+        if any(bank in secname for bank in BondAnalyzer.SYSTEM_BANKS):
+            return BondAnalyzer.RATING_LABELS[2]
 
         # Крупные компании
-        if 'газпром' in secname or 'лукойл' in secname or 'сургутнефтегаз' in secname:
-            return "🏭 А (Крупная компания)"
+        if any(company in secname for company in BondAnalyzer.LARGE_COMPANIES):
+            return BondAnalyzer.RATING_LABELS[3]
 
         # Остальные
-        return "📊 BBB (Иные эмитенты)"
+        return BondAnalyzer.RATING_LABELS[4]
+
+    def rating_codes(self, df: pd.DataFrame) -> np.ndarray:
+        """Код рейтинга (1 — ОФЗ, 5 — иные эмитенты) для каждой строки таблицы"""
+        secname = lower_text(df['SECNAME'])
+        shortname = lower_text(df['SHORTNAME'])
+
+        return np.select([
+            shortname.str.contains('офз', regex=False).to_numpy(dtype=bool) |
+            secname.str.contains('федеральн', regex=False).to_numpy(dtype=bool),
+            keyword_mask(secname, self.STATE_CORPS_PATTERN),
+            keyword_mask(secname, self.SYSTEM_BANKS_PATTERN),
+            keyword_mask(secname, self.LARGE_COMPANIES_PATTERN),
+        ], [1, 2, 3, 4], default=5)
 
     @staticmethod
     def calculate_coupon_frequency(coupon_period: float) -> int:
@@ -68,70 +102,61 @@ class BondAnalyzer:
         else:
             return int(round(freq))
 
+    @staticmethod
+    def coupon_frequencies(coupon_period: pd.Series) -> np.ndarray:
+        """Векторный аналог calculate_coupon_frequency"""
+        period = coupon_period.to_numpy(dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            freq = 365 / period
+
+        return np.select(
+            [np.isnan(period) | (period <= 0), freq < 1.5, freq < 2.5, freq < 4],
+            [0, 1, 2, 4],
+            default=np.round(np.nan_to_num(freq))
+        ).astype(int)
+
     def filter_reliable_bonds(self, df: pd.DataFrame, limit: int = 10) -> pd.DataFrame:
         """Фильтрация надёжных облигаций без оферты и амортизации"""
         if df.empty:
             return df
 
-        # Копируем для безопасности
-        filtered = df.copy()
-
         # Фильтр 1: Только 1-й уровень листинга (ликвидные)
-        filtered = filtered[filtered['LISTLEVEL'] == 1]
+        mask = (df['LISTLEVEL'] == 1).to_numpy()
 
         # Фильтр 2: Только рублёвые облигации
-        filtered = filtered[filtered['CURRENCY'] == 'RUB']
+        mask &= (df['CURRENCY'] == 'RUB').to_numpy()
 
         # Фильтр 3: Только с купонной доходностью
-        filtered = filtered[filtered['COUPONPERCENT'].notna() & (filtered['COUPONPERCENT'] > 0)]
+        mask &= (df['COUPONPERCENT'].notna() & (df['COUPONPERCENT'] > 0)).to_numpy()
 
         # Фильтр 4: Срок погашения в будущем (минимум 30 дней)
-        today = datetime.now().date()
-        filtered = filtered[filtered['MATDATE'].dt.date > today + timedelta(days=30)]
+        mask &= matures_after(df['MATDATE'], datetime.now().date() + timedelta(days=30))
 
-        # Фильтр 5: Без оферты
-        filtered = filtered[~filtered['SECNAME'].apply(self.has_offer)]
+        # Фильтр 5: Минимальный объём выпуска (1 млрд руб)
+        mask &= (df['ISSUESIZE'] >= 1_000_000_000).to_numpy()
 
-        # Фильтр 6: Без амортизации
-        filtered = filtered[~filtered['SECNAME'].apply(self.has_amortization)]
+        filtered = df[mask]
 
-        # Фильтр 7: Минимальный объём выпуска (1 млрд руб)
-        filtered = filtered[filtered['ISSUESIZE'] >= 1_000_000_000]
+        # Фильтр 6-7: Без оферты и без амортизации
+        secname = lower_text(filtered['SECNAME'])
+        filtered = filtered[
+            ~keyword_mask(secname, self.OFFER_PATTERN) &
+            ~keyword_mask(secname, self.AMORT_PATTERN)
+            ]
 
-        # Добавляем расчётные поля
-        filtered['RATING'] = filtered.apply(self.calculate_rating, axis=1)
-        filtered['COUPON_FREQ'] = filtered['COUPONPERIOD'].apply(self.calculate_coupon_frequency)
-        filtered['YEARS_TO_MATURITY'] = (
-                (filtered['MATDATE'] - pd.Timestamp.now()).dt.days / 365.25
+        # Сортировка: сначала по надёжности (ОФЗ > госкорпы > банки > компании), затем по доходности
+        codes = self.rating_codes(filtered)
+        top = top_n(codes, -filtered['COUPONPERCENT'].to_numpy(dtype=float), limit)
+
+        # Расчётные поля нужны только для отобранных строк
+        result = filtered.iloc[top].copy()
+        result['RATING'] = self.RATING_LABELS[codes[top] - 1]
+        result['COUPON_FREQ'] = self.coupon_frequencies(result['COUPONPERIOD'])
+        result['YEARS_TO_MATURITY'] = (
+                (result['MATDATE'] - pd.Timestamp.now()).dt.days / 365.25
         ).round(1)
 
-        # Сортировка: сначала по надёжности (ОФЗ > госкорпы > банки > компании), затем по доходности
-        def sort_key(row):
-            rating_order = {
-                '🇷🇺 ААА (ОФЗ)': 1,
-                '🏛️ АА (Госкорп.)': 2,
-                '🏦 А+ (Системный банк)': 3,
-                '🏭 А (Крупная компания)': 4,
-                '📊 BBB (Иные эмитенты)': 5
-            }
-            return (
-                rating_order.get(row['RATING'], 6),
-                -row['COUPONPERCENT']  # Чем выше доходность - тем выше в списке
-            )
-
-        filtered = filtered.sort_values(
-            by=['RATING', 'COUPONPERCENT'],
-            key=lambda x: x.map(lambda r: {
-                '🇷🇺 ААА (ОФЗ)': 1,
-                '🏛️ АА (Госкорп.)': 2,
-                '🏦 А+ (Системный банк)': 3,
-                '🏭 А (Крупная компания)': 4,
-                '📊 BBB (Иные эмитенты)': 5
-            }.get(r, 6) if x.name == 'RATING' else -x),
-            ascending=[True, False]
-        )
-
-        return filtered.head(limit).reset_index(drop=True)
+        return result.reset_index(drop=True)
 
     def get_bond_details(self, row: pd.Series, coupons: list) -> Dict:
         """Формирование детальной информации об облигации"""
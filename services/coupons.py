@@ -0,0 +1,101 @@
+import asyncio
+import logging
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from config import Config
+from services.moex_service import MoexService
+
+
+logger = logging.getLogger(__name__)
+
+
+class CouponStore:
+    """Графики купонов по SECID с ежедневной инвалидацией и предзагрузкой"""
+
+    def __init__(self, fetcher: Optional[Callable] = None,
+                 concurrency: int = Config.COUPONS_PREFETCH_CONCURRENCY):
+        self._fetcher = fetcher or MoexService().get_bond_coupons
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._schedules: Dict[str, pd.DataFrame] = {}
+        self._fetched_on: Dict[str, date] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+        # Растёт при каждой загрузке графика — по нему сбрасываются производные кэши
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def peek(self, secid: str) -> Optional[pd.DataFrame]:
+        """График из кэша, если он загружен сегодня"""
+        if self._fetched_on.get(secid) != date.today():
+            return None
+        return self._schedules.get(secid)
+
+    async def get(self, secid: str) -> pd.DataFrame:
+        """График купонов; при промахе — одна загрузка на всех ожидающих"""
+        schedule = self.peek(secid)
+
+        if schedule is not None:
+            self.hits += 1
+            return schedule
+
+        self.misses += 1
+        task = self._inflight.get(secid)
+
+        if task is None:
+            task = asyncio.create_task(self._load(secid))
+            self._inflight[secid] = task
+            task.add_done_callback(lambda _: self._inflight.pop(secid, None))
+
+        return await asyncio.shield(task)
+
+    async def _load(self, secid: str) -> pd.DataFrame:
+        """Загрузка графика с ограничением числа параллельных запросов"""
+        async with self._semaphore:
+            try:
+                schedule = await self._fetcher(secid)
+            except Exception as e:
+                logger.error(f"Ошибка загрузки купонов {secid}: {e}")
+                return self._schedules.get(secid, pd.DataFrame())
+
+        # Пустой ответ не кэшируем — попробуем снова при следующем запросе
+        if not schedule.empty:
+            self._schedules[secid] = schedule
+            self._fetched_on[secid] = date.today()
+            self.generation += 1
+
+        return schedule
+
+    async def prefetch(self, secids: Iterable[str]) -> None:
+        """Фоновая загрузка графиков для списка бумаг"""
+        missing = [secid for secid in secids if self.peek(secid) is None]
+
+        if missing:
+            await asyncio.gather(*(self.get(secid) for secid in missing))
+            logger.info(f"Предзагружены купоны: {len(missing)} бумаг")
+
+    def loaded(self) -> Dict[str, pd.DataFrame]:
+        """Все графики, загруженные сегодня"""
+        today = date.today()
+        return {secid: s for secid, s in self._schedules.items() if self._fetched_on.get(secid) == today}
+
+    def next_coupons(self, secid: str, count: int = Config.COUPONS_NEXT_COUNT) -> Optional[List[dict]]:
+        """Ближайшие будущие купоны из кэша (None, если график не загружен)"""
+        schedule = self.peek(secid)
+
+        if schedule is None:
+            return None
+
+        future = schedule[schedule['coupondate'] > pd.Timestamp(date.today())]
+        return future.head(count).to_dict('records')
+
+    def stats(self) -> dict:
+        return {"secids": len(self._schedules), "hits": self.hits, "misses": self.misses}
+
+
+# Единое хранилище купонов на процесс
+coupon_store = CouponStore()
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+from config import Config
+from services.http_client import http_client
+
+
+logger = logging.getLogger(__name__)
+
+
+class ExchangeRateService:
+    """Курсы валют: TTL-кэш, фоновое обновление одним запросом и пауза после сбоя источника"""
+
+    def __init__(self, url: str = Config.EXCHANGE_RATES_URL, ttl: float = Config.EXCHANGE_RATES_TTL,
+                 retry: float = Config.EXCHANGE_RATES_RETRY):
+        self.url = url
+        self.ttl = ttl
+        self.retry = retry
+        self._rates: Optional[Dict[str, float]] = None
+        self._fetched_at = 0.0
+        self._inflight: Optional[asyncio.Task] = None
+
+        # После сбоя источник не опрашивается до _retry_at; пауза растёт вдвое, но не дольше TTL
+        self._backoff = 0.0
+        self._retry_at = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @property
+    def age(self) -> float:
+        """Возраст закэшированных курсов в секундах"""
+        return time.monotonic() - self._fetched_at
+
+    @property
+    def is_stale(self) -> bool:
+        return self._rates is None or self.age >= self.ttl
+
+    @property
+    def failing(self) -> bool:
+        """Последнее обращение к источнику завершилось ошибкой"""
+        return self._backoff > 0
+
+    async def get_rates(self) -> Optional[Dict[str, float]]:
+        """Курсы к базовой валюте источника; устаревшие отдаются сразу, обновление идёт в фоне"""
+        if not self.is_stale:
+            self.hits += 1
+            return self._rates
+
+        self.misses += 1
+        task = self._refresh()
+
+        # Ждём источник, только когда показать нечего и запрос уже идёт
+        if self._rates is not None or task is None:
+            return self._rates
+
+        return await asyncio.shield(task)
+
+    def _refresh(self) -> Optional[asyncio.Task]:
+        """Одно обновление на всех; после сбоя — не раньше окончания паузы"""
+        if self._inflight is None and time.monotonic() >= self._retry_at:
+            self._inflight = asyncio.create_task(self._load())
+            self._inflight.add_done_callback(self._clear_inflight)
+        return self._inflight
+
+    def _clear_inflight(self, _task: asyncio.Task) -> None:
+        self._inflight = None
+
+    async def _load(self) -> Optional[Dict[str, float]]:
+        try:
+            session = await http_client.get_session()
+            async with session.get(self.url) as response:
+                if response.status != 200:
+                    raise RuntimeError(f"HTTP {response.status}")
+                data = await response.json()
+            self._rates = data['conversion_rates']
+            self._fetched_at = time.monotonic()
+            self._backoff = 0.0
+        except Exception as e:
+            self.errors += 1
+            self._backoff = min(self._backoff * 2 or self.retry, self.ttl)
+            self._retry_at = time.monotonic() + self._backoff
+            logger.error(f"Ошибка получения курсов валют (повтор через {self._backoff:.0f} с): {e}")
+
+        return self._rates
+
+    async def cross_rate(self, base: str, quote: str) -> Optional[float]:
+        """Сколько единиц quote стоит одна единица base (через базовую валюту источника)"""
+        rates = await self.get_rates()
+
+        if not rates or base not in rates or quote not in rates:
+            return None
+
+        return rates[quote] / rates[base]
+
+    async def rates_to(self, quote: str, bases: tuple) -> Dict[str, float]:
+        """Кросс-курсы нескольких валют к одной (один запрос к кэшу)"""
+        rates = await self.get_rates()
+
+        if not rates or quote not in rates:
+            return {}
+
+        return {base: rates[quote] / rates[base] for base in bases if base in rates}
+
+
+# Единый сервис курсов на процесс
+exchange_rates = ExchangeRateService()
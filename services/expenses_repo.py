@@ -0,0 +1,109 @@
+import time
+from typing import List, Tuple
+
+from services.async_db import AsyncDatabase
+from services.users_repo import finance_db
+
+
+# Миграция 1: журнал расходов вместо полей category1..3/expenses1..3
+# и помесячные итоги, которые поддерживают триггеры
+MIGRATION_LEDGER = '''
+CREATE TABLE IF NOT EXISTS expenses (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    amount REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_expenses_user_ts ON expenses (user_id, ts);
+
+CREATE TABLE IF NOT EXISTS expenses_monthly (
+    user_id INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    total REAL NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (user_id, month, category)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS expenses_monthly_insert AFTER INSERT ON expenses
+BEGIN
+    INSERT INTO expenses_monthly (user_id, month, category, total, count)
+    VALUES (NEW.user_id, CAST(strftime('%Y%m', NEW.ts, 'unixepoch') AS INTEGER),
+            NEW.category, NEW.amount, 1)
+    ON CONFLICT (user_id, month, category)
+    DO UPDATE SET total = total + excluded.total, count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS expenses_monthly_delete AFTER DELETE ON expenses
+BEGIN
+    UPDATE expenses_monthly
+    SET total = total - OLD.amount, count = count - 1
+    WHERE user_id = OLD.user_id
+      AND month = CAST(strftime('%Y%m', OLD.ts, 'unixepoch') AS INTEGER)
+      AND category = OLD.category;
+    DELETE FROM expenses_monthly
+    WHERE user_id = OLD.user_id AND count <= 0;
+END;
+
+INSERT INTO expenses (user_id, ts, category, amount)
+SELECT telegram_id, CAST(strftime('%s', 'now') AS INTEGER), category, amount FROM (
+    SELECT telegram_id, category1 AS category, expenses1 AS amount FROM users
+    UNION ALL
+    SELECT telegram_id, category2, expenses2 FROM users
+    UNION ALL
+    SELECT telegram_id, category3, expenses3 FROM users
+)
+WHERE category IS NOT NULL AND amount IS NOT NULL;
+'''
+
+
+def month_key(ts: float) -> int:
+    """Ключ месяца в формате ГГГГММ (UTC, как в триггерах)"""
+    t = time.gmtime(ts)
+    return t.tm_year * 100 + t.tm_mon
+
+
+class ExpenseRepository:
+    """Журнал расходов и помесячные сводки"""
+
+    def __init__(self, db: AsyncDatabase):
+        self.db = db
+        self.db.add_migration(1, MIGRATION_LEDGER)
+
+    async def add(self, user_id: int, items: List[Tuple[str, float]], ts: float = None) -> int:
+        """Добавление расходов одной транзакцией"""
+        ts = int(ts if ts is not None else time.time())
+        return await self.db.execute_many(
+            'INSERT INTO expenses (user_id, ts, category, amount) VALUES (?, ?, ?, ?)',
+            [(user_id, ts, category, amount) for category, amount in items]
+        )
+
+    async def month_by_category(self, user_id: int, month: int) -> List[Tuple[str, float, int]]:
+        """Итоги месяца по категориям (из помесячной таблицы)"""
+        return await self.db.fetchall(
+            'SELECT category, total, count FROM expenses_monthly '
+            'WHERE user_id = ? AND month = ? ORDER BY total DESC',
+            (user_id, month)
+        )
+
+    async def monthly_totals(self, user_id: int, months: int = 6) -> List[Tuple[int, float]]:
+        """Суммы за последние месяцы, от новых к старым"""
+        return await self.db.fetchall(
+            'SELECT month, SUM(total) FROM expenses_monthly WHERE user_id = ? '
+            'GROUP BY month ORDER BY month DESC LIMIT ?',
+            (user_id, months)
+        )
+
+    async def period_total(self, user_id: int, since: float, until: float) -> float:
+        """Сумма за произвольный период (по индексу user_id, ts)"""
+        row = await self.db.fetchone(
+            'SELECT COALESCE(SUM(amount), 0) FROM expenses WHERE user_id = ? AND ts >= ? AND ts < ?',
+            (user_id, int(since), int(until))
+        )
+        return row[0]
+
+
+# Журнал расходов в общей базе финансового бота
+expenses_repo = ExpenseRepository(finance_db)
@@ -0,0 +1,31 @@
+import re
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+
+def compile_keywords(keywords: Iterable[str]) -> re.Pattern:
+    """Одно регулярное выражение на набор ключевых слов"""
+    return re.compile("|".join(re.escape(kw) for kw in keywords))
+
+
+def lower_text(series: pd.Series) -> pd.Series:
+    """Текст колонки в нижнем регистре (как str(x).lower() поэлементно)"""
+    return series.astype(str).str.lower()
+
+
+def keyword_mask(text: pd.Series, pattern: re.Pattern) -> np.ndarray:
+    """Маска строк, содержащих любое из ключевых слов"""
+    return text.str.contains(pattern, regex=True).to_numpy(dtype=bool)
+
+
+def top_n(primary: np.ndarray, secondary: np.ndarray, limit: int) -> np.ndarray:
+    """Позиции первых limit строк при стабильной сортировке по (primary, secondary)"""
+    return np.lexsort((secondary, primary))[:limit]
+
+
+def matures_after(matdate: pd.Series, min_date) -> np.ndarray:
+    """Маска бумаг, погашаемых строго позже даты (NaT отбрасываются)"""
+    threshold = pd.Timestamp(min_date) + pd.Timedelta(days=1)
+    return (pd.to_datetime(matdate, errors='coerce') >= threshold).to_numpy(dtype=bool)
@@ -0,0 +1,75 @@
+import json
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from config import Config
+from services.kv_store import CachedKV, KeyValueBackend, RedisBackend, SQLiteBackend
+
+
+class KVStorage(BaseStorage):
+    """FSM aiogram поверх хранилища ключ-значение: состояние и данные одной записью"""
+
+    def __init__(self, kv: CachedKV, ttl: float = Config.STORAGE_TTL):
+        self.kv = kv
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(key: StorageKey) -> str:
+        return (
+            f"fsm:{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or ''}:"
+            f"{key.business_connection_id or ''}:{key.destiny}"
+        )
+
+    async def _read(self, key: StorageKey) -> Dict[str, Any]:
+        raw = await self.kv.get(self._key(key))
+        return json.loads(raw) if raw else {"state": None, "data": {}}
+
+    def _write(self, key: StorageKey, record: Dict[str, Any]) -> None:
+        if record["state"] is None and not record["data"]:
+            self.kv.delete(self._key(key))
+        else:
+            self.kv.set(self._key(key), json.dumps(record, ensure_ascii=False), ttl=self.ttl)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._read(key)
+        record["state"] = state.state if isinstance(state, State) else state
+        self._write(key, record)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._read(key))["state"]
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        record = await self._read(key)
+        record["data"] = dict(data)
+        self._write(key, record)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._read(key))["data"]
+
+    async def close(self) -> None:
+        # Хранилище общее с сессиями и закрывается хуком остановки бота после последней записи
+        pass
+
+
+def create_backend(kind: str = Config.STORAGE_BACKEND) -> Optional[KeyValueBackend]:
+    """Хранилище по настройке STORAGE_BACKEND; None — только память процесса"""
+    if kind == "sqlite":
+        return SQLiteBackend()
+    if kind == "redis":
+        return RedisBackend()
+    if kind == "memory":
+        return None
+    raise ValueError(f"Неизвестное хранилище: {kind}")
+
+
+def build_storage() -> BaseStorage:
+    """Хранилище FSM для Dispatcher"""
+    return KVStorage(kv_store) if kv_store is not None else MemoryStorage()
+
+
+# Единое хранилище ключ-значение на процесс (None — всё в памяти)
+_backend = create_backend()
+kv_store = CachedKV(_backend) if _backend is not None else None
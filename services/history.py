@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+from services.local_db import local_database
+from services.moex_service import MoexService
+from services.snapshot import BondSnapshot
+
+
+logger = logging.getLogger(__name__)
+
+DAY = 24 * 60 * 60
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS quotes (
+        secid TEXT NOT NULL,
+        ts INTEGER NOT NULL,
+        yield REAL,
+        price REAL,
+        coupon REAL,
+        PRIMARY KEY (secid, ts)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS quotes_daily (
+        secid TEXT NOT NULL,
+        day INTEGER NOT NULL,
+        yield_close REAL,
+        yield_min REAL,
+        yield_max REAL,
+        price_close REAL,
+        coupon REAL,
+        PRIMARY KEY (secid, day)
+    ) WITHOUT ROWID;
+'''
+
+
+class HistoryStore:
+    """История доходности и цены облигаций (SQLite, только добавление)"""
+
+    def __init__(self, path: str = Config.DB_PATH):
+        self.db = local_database(path)
+        self.db.add_schema(SCHEMA)
+        self._last_record = 0.0
+        self._last_compact = 0.0
+
+    async def record(self, snapshot: BondSnapshot) -> None:
+        """Запись точек снимка (подписчик обновления снимка)"""
+        now = time.time()
+        if now - self._last_record < Config.HISTORY_MIN_INTERVAL or snapshot.empty:
+            return
+        self._last_record = now
+
+        await asyncio.to_thread(self.append, snapshot.df, int(now))
+
+        if now - self._last_compact >= DAY:
+            self._last_compact = now
+            await asyncio.to_thread(self.compact)
+
+    def append(self, df: pd.DataFrame, ts: int) -> int:
+        """Пакетная вставка одной точки на SECID"""
+        df = df.drop_duplicates(subset=['SECID'])
+        rows = list(zip(
+            df['SECID'],
+            [ts] * len(df),
+            self._column(df, *MoexService.YIELD_COLUMNS),
+            self._column(df, 'LAST'),
+            self._column(df, 'COUPONPERCENT')
+        ))
+
+        with self.db.transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO quotes (secid, ts, yield, price, coupon) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def compact(self, now: Optional[float] = None) -> None:
+        """Сжатие старых внутридневных точек в дневные бары и удаление устаревших баров"""
+        now = now or time.time()
+        raw_cutoff = int(now - Config.HISTORY_RAW_DAYS * DAY) // DAY * DAY
+        daily_cutoff = int(now - Config.HISTORY_DAILY_DAYS * DAY)
+
+        with self.db.transaction() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO quotes_daily
+                    (secid, day, yield_close, yield_min, yield_max, price_close, coupon)
+                SELECT secid, day, yield, yield_min, yield_max, price, coupon FROM (
+                    SELECT secid, ts / 86400 * 86400 AS day, yield, price, coupon,
+                           MIN(yield) OVER w AS yield_min,
+                           MAX(yield) OVER w AS yield_max,
+                           ROW_NUMBER() OVER (PARTITION BY secid, ts / 86400 ORDER BY ts DESC) AS rn
+                    FROM quotes
+                    WHERE ts < ?
+                    WINDOW w AS (PARTITION BY secid, ts / 86400)
+                )
+                WHERE rn = 1
+            ''', (raw_cutoff,))
+            conn.execute("DELETE FROM quotes WHERE ts < ?", (raw_cutoff,))
+            conn.execute("DELETE FROM quotes_daily WHERE day < ?", (daily_cutoff,))
+
+        logger.info("История котировок сжата")
+
+    def series(self, secid: str, days: int = 90, points: int = Config.HISTORY_POINTS,
+               now: Optional[float] = None) -> List[Tuple[int, float, float]]:
+        """Прореженный ряд (ts, доходность, цена) за период — не больше points точек"""
+        end = int(now or time.time())
+        start = end - days * DAY
+        bucket = max((end - start) // points, 1)
+
+        with self.db.read() as conn:
+            return conn.execute('''
+                SELECT MAX(ts), AVG(yield), AVG(price) FROM (
+                    SELECT day AS ts, yield_close AS yield, price_close AS price
+                    FROM quotes_daily WHERE secid = ? AND day BETWEEN ? AND ?
+                    UNION ALL
+                    SELECT ts, yield, price
+                    FROM quotes WHERE secid = ? AND ts BETWEEN ? AND ?
+                )
+                GROUP BY (ts - ?) / ?
+                ORDER BY 1
+            ''', (secid, start, end, secid, start, end, start, bucket)).fetchall()
+
+    @staticmethod
+    def _column(df: pd.DataFrame, *names: str) -> list:
+        """Первое непустое значение из колонок по каждой строке (NaN → None для SQLite)"""
+        return [None if np.isnan(v) else float(v) for v in MoexService.coalesce(df, names)]
+
+    async def get_series(self, secid: str, days: int = 90) -> List[Tuple[int, float, float]]:
+        return await asyncio.to_thread(self.series, secid, days)
+
+
+# Единое хранилище истории на процесс
+history_store = HistoryStore()
@@ -0,0 +1,53 @@
+import logging
+from typing import Optional
+
+import aiohttp
+
+from config import Config
+
+
+logger = logging.getLogger(__name__)
+
+
+class HttpClient:
+    """Долгоживущая HTTP-сессия с пулом соединений для всех запросов к ISS"""
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self) -> None:
+        """Создание сессии (вызывается при старте диспетчера)"""
+        if self._session is not None and not self._session.closed:
+            return
+
+        connector = aiohttp.TCPConnector(
+            limit=Config.HTTP_POOL_LIMIT,
+            limit_per_host=Config.HTTP_POOL_LIMIT_PER_HOST,
+            use_dns_cache=True,
+            ttl_dns_cache=Config.HTTP_DNS_CACHE_TTL,
+            keepalive_timeout=Config.HTTP_KEEPALIVE_TIMEOUT
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=Config.REQUEST_TIMEOUT),
+            headers={"Accept-Encoding": "gzip, deflate"},
+            auto_decompress=True
+        )
+        logger.info("HTTP-сессия создана")
+
+    async def close(self) -> None:
+        """Закрытие сессии (вызывается при остановке диспетчера)"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("HTTP-сессия закрыта")
+        self._session = None
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Общая сессия; без явного запуска создаётся лениво"""
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
+
+
+# Единый клиент на процесс
+http_client = HttpClient()
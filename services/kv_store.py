@@ -0,0 +1,348 @@
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+from config import Config
+from services.async_db import AsyncDatabase
+
+
+logger = logging.getLogger(__name__)
+
+# Значение и момент истечения (time.time(); None — бессрочно)
+Entry = Tuple[Optional[str], Optional[float]]
+
+
+class KeyValueBackend(ABC):
+    """Общий интерфейс постоянного хранилища ключ-значение"""
+
+    @abstractmethod
+    async def get_many(self, keys: Sequence[str]) -> Dict[str, str]:
+        """Значения найденных и не истёкших ключей"""
+
+    @abstractmethod
+    async def set_many(self, items: Dict[str, Entry]) -> None:
+        """Запись пачки значений с моментами истечения"""
+
+    @abstractmethod
+    async def delete_many(self, keys: Sequence[str]) -> None:
+        """Удаление пачки ключей"""
+
+    async def close(self) -> None:
+        pass
+
+
+class SQLiteBackend(KeyValueBackend):
+    """Ключ-значение в SQLite (WAL, групповой коммит через поток записи)"""
+
+    SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS kv (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL,
+        expires_at REAL
+    ) WITHOUT ROWID;
+
+    CREATE INDEX IF NOT EXISTS idx_kv_expires ON kv (expires_at) WHERE expires_at IS NOT NULL;
+    '''
+
+    # Истёкшие ключи чистятся не чаще раза в указанный интервал
+    PURGE_INTERVAL = 60 * 60
+
+    def __init__(self, path: str = Config.STORAGE_SQLITE_PATH):
+        self.db = AsyncDatabase(path)
+        self.db.add_schema(self.SCHEMA)
+        self._started = False
+        self._last_purge = 0.0
+
+    async def _ensure(self) -> None:
+        if not self._started:
+            await self.db.start()
+            self._started = True
+
+    async def get_many(self, keys: Sequence[str]) -> Dict[str, str]:
+        await self._ensure()
+        placeholders = ",".join("?" * len(keys))
+        rows = await self.db.fetchall(
+            f'SELECT key, value FROM kv WHERE key IN ({placeholders}) '
+            f'AND (expires_at IS NULL OR expires_at > ?)',
+            (*keys, time.time())
+        )
+        return dict(rows)
+
+    async def set_many(self, items: Dict[str, Entry]) -> None:
+        await self._ensure()
+        await self.db.execute_many(
+            'INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at',
+            [(key, value, expires_at) for key, (value, expires_at) in items.items()]
+        )
+
+        now = time.time()
+        if now - self._last_purge >= self.PURGE_INTERVAL:
+            self._last_purge = now
+            await self.db.execute('DELETE FROM kv WHERE expires_at <= ?', (now,))
+
+    async def delete_many(self, keys: Sequence[str]) -> None:
+        await self._ensure()
+        await self.db.execute_many('DELETE FROM kv WHERE key = ?', [(key,) for key in keys])
+
+    async def close(self) -> None:
+        if self._started:
+            await self.db.close()
+            self._started = False
+
+
+class RedisError(Exception):
+    """Ошибка, которую вернул сервер по протоколу RESP"""
+
+
+class RedisBackend(KeyValueBackend):
+    """Минимальный клиент протокола Redis (RESP2): MGET, SET PX, DEL с конвейером команд"""
+
+    def __init__(self, url: str = Config.STORAGE_REDIS_URL):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.password = parsed.password
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _encode(*args) -> bytes:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    async def _read_reply(self):
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Соединение с Redis закрыто")
+
+        kind, payload = line[:1], line[1:-2]
+
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RedisError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            size = int(payload)
+            if size < 0:
+                return None
+            data = await self._reader.readexactly(size + 2)
+            return data[:-2].decode()
+        if kind == b"*":
+            size = int(payload)
+            if size < 0:
+                return None
+            return [await self._read_reply() for _ in range(size)]
+
+        raise RedisError(f"Неизвестный ответ: {line!r}")
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            await self._send(setup)
+
+    async def _send(self, commands: List[tuple]) -> list:
+        self._writer.write(b"".join(self._encode(*command) for command in commands))
+        await self._writer.drain()
+
+        # Ответы читаются все, чтобы соединение осталось согласованным
+        replies, error = [], None
+        for _ in commands:
+            try:
+                replies.append(await self._read_reply())
+            except RedisError as e:
+                error = error or e
+                replies.append(None)
+        if error:
+            raise error
+        return replies
+
+    async def pipeline(self, commands: List[tuple]) -> list:
+        """Отправка пачки команд одним сетевым обменом"""
+        async with self._lock:
+            if self._writer is None:
+                await self._connect()
+            try:
+                return await self._send(commands)
+            except (ConnectionError, OSError, asyncio.IncompleteReadError):
+                # Один повтор на новом соединении
+                await self._disconnect()
+                await self._connect()
+                return await self._send(commands)
+
+    async def get_many(self, keys: Sequence[str]) -> Dict[str, str]:
+        values = (await self.pipeline([("MGET", *keys)]))[0]
+        return {key: value for key, value in zip(keys, values) if value is not None}
+
+    async def set_many(self, items: Dict[str, Entry]) -> None:
+        now = time.time()
+        commands = []
+
+        for key, (value, expires_at) in items.items():
+            if expires_at is None:
+                commands.append(("SET", key, value))
+            elif expires_at > now:
+                commands.append(("SET", key, value, "PX", int((expires_at - now) * 1000)))
+            else:
+                commands.append(("DEL", key))
+
+        await self.pipeline(commands)
+
+    async def delete_many(self, keys: Sequence[str]) -> None:
+        await self.pipeline([("DEL", *keys)])
+
+    async def _disconnect(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+        self._reader = self._writer = None
+
+    async def close(self) -> None:
+        async with self._lock:
+            await self._disconnect()
+
+
+class CachedKV:
+    """LRU горячих ключей поверх хранилища: запись сразу в кэш, в хранилище — пачками.
+
+    Хранилище могут менять другие воркеры и реплики, поэтому значение из кэша
+    отдаётся не дольше read_ttl секунд, потом перечитывается.
+    """
+
+    def __init__(self, backend: KeyValueBackend,
+                 max_size: int = Config.STORAGE_CACHE_SIZE,
+                 flush_interval: float = Config.STORAGE_FLUSH_INTERVAL,
+                 flush_batch: int = Config.STORAGE_FLUSH_BATCH,
+                 read_ttl: float = Config.STORAGE_READ_TTL):
+        self.backend = backend
+        self.max_size = max_size
+        self.read_ttl = read_ttl
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self._cache: "OrderedDict[str, Entry]" = OrderedDict()
+        self._dirty: Dict[str, Entry] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.flushes = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._dirty.get(key) or self._cache.get(key)
+
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at is None or expires_at > time.time():
+                self.hits += 1
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                return value
+
+        self.misses += 1
+        value = (await self.backend.get_many([key])).get(key)
+
+        # Пока шёл запрос, ключ мог быть записан локально — локальная запись новее
+        if key in self._dirty:
+            return self._dirty[key][0]
+
+        # Срок жизни уже проверен хранилищем; в кэше значение живёт read_ttl
+        self._remember(key, (value, None))
+        return value
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        entry = (value, time.time() + ttl if ttl else None)
+        self._remember(key, entry)
+        self._mark_dirty(key, entry)
+
+    def delete(self, key: str) -> None:
+        self._remember(key, (None, None))
+        self._mark_dirty(key, (None, None))
+
+    def _remember(self, key: str, entry: Entry) -> None:
+        value, expires_at = entry
+        fresh_until = time.time() + self.read_ttl
+        self._cache[key] = (value, fresh_until if expires_at is None else min(expires_at, fresh_until))
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def _mark_dirty(self, key: str, entry: Entry) -> None:
+        self._dirty[key] = entry
+
+        if self._flusher is None:
+            self._wakeup = asyncio.Event()
+            self._flusher = asyncio.create_task(self._flush_loop())
+        if len(self._dirty) >= self.flush_batch:
+            self._wakeup.set()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Запись накопленных изменений в хранилище"""
+        if not self._dirty:
+            return
+
+        dirty, self._dirty = self._dirty, {}
+        updates = {key: entry for key, entry in dirty.items() if entry[0] is not None}
+        deletes = [key for key, entry in dirty.items() if entry[0] is None]
+
+        try:
+            if updates:
+                await self.backend.set_many(updates)
+            if deletes:
+                await self.backend.delete_many(deletes)
+            self.flushes += 1
+        except Exception as e:
+            logger.error(f"Ошибка записи в хранилище: {e}")
+            # Возвращаем изменения в очередь, не затирая более свежие
+            for key, entry in dirty.items():
+                self._dirty.setdefault(key, entry)
+
+    async def close(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+
+        await self.flush()
+        await self.backend.close()
+
+    def stats(self) -> dict:
+        return {
+            "cached": len(self._cache),
+            "dirty": len(self._dirty),
+            "hits": self.hits,
+            "misses": self.misses,
+            "flushes": self.flushes,
+        }
@@ -0,0 +1,70 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+
+class LocalDatabase:
+    """Одно соединение SQLite (WAL) на файл для синхронных хранилищ; доступ — под общим замком"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._schema: List[str] = []
+
+    def add_schema(self, script: str) -> None:
+        """Скрипт схемы хранилища; выполняется один раз — при открытии или сразу, если база открыта"""
+        with self.lock:
+            if script in self._schema:
+                return
+            self._schema.append(script)
+            if self._conn is not None:
+                self._conn.executescript(script)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for script in self._schema:
+                conn.executescript(script)
+            self._conn = conn
+        return self._conn
+
+    @contextmanager
+    def read(self) -> Iterator[sqlite3.Connection]:
+        """Соединение для чтения"""
+        with self.lock:
+            yield self._connect()
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Соединение внутри транзакции: коммит при выходе, откат при ошибке"""
+        with self.lock:
+            conn = self._connect()
+            with conn:
+                yield conn
+
+    def close(self) -> None:
+        with self.lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Единый реестр соединений на процесс: хранилища одного файла делят соединение
+_databases: Dict[str, LocalDatabase] = {}
+_databases_lock = threading.Lock()
+
+
+def local_database(path: str) -> LocalDatabase:
+    """Общее соединение с файлом базы (создаётся при первом обращении)"""
+    key = os.path.abspath(path)
+    with _databases_lock:
+        database = _databases.get(key)
+        if database is None:
+            database = _databases[key] = LocalDatabase(path)
+        return database
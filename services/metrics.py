@@ -0,0 +1,29 @@
+import logging
+import time
+from typing import Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class StartupMetrics:
+    """Время от запуска процесса до первого ответа пользователю"""
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.first_answer_after: Optional[float] = None
+        self.warm_start = False
+
+    def mark_first_answer(self) -> None:
+        if self.first_answer_after is not None:
+            return
+
+        self.first_answer_after = time.monotonic() - self.started_at
+        start_kind = "тёплый" if self.warm_start else "холодный"
+        logger.info(f"Первый ответ через {self.first_answer_after:.2f} с после запуска ({start_kind} старт)")
+
+    def stats(self) -> dict:
+        return {"warm_start": self.warm_start, "first_answer_after": self.first_answer_after}
+
+
+startup_metrics = StartupMetrics()
@@ -1,7 +1,11 @@
-import aiohttp
+import logging
 import pandas as pd
 from datetime import datetime
 from config import Config
+from services.http_client import http_client
+
+
+logger = logging.getLogger(__name__)
 
 
 class MoexAPI:
@@ -14,18 +18,14 @@ class MoexAPI:
         """Выполнение асинхронного запроса к API"""
         url = f"{self.base_url}{endpoint}"
 
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(
-                        url,
-                        params=params,
-                        timeout=Config.REQUEST_TIMEOUT
-                ) as response:
-                    response.raise_for_status()
-                    return await response.json()
-            except Exception as e:
-                print(f"Ошибка запроса к MOEX API: {e}")
-                return {}
+        try:
+            session = await http_client.get_session()
+            async with session.get(url, params=params) as response:
+                response.raise_for_status()
+                return await response.json()
+        except Exception as e:
+            logger.error(f"Ошибка запроса к MOEX API: {e}")
+            return {}
 
     async def get_all_bonds(self) -> pd.DataFrame:
         """Получение списка всех облигаций с рынка Т+2"""
@@ -36,7 +36,7 @@ class MoexAPI:
                 "SECID,SHORTNAME,SECNAME,ISSUESIZE,COUPONPERCENT,"
                 "COUPONPERIOD,MATDATE,LISTLEVEL,FACEVALUE,CURRENCY"
             ),
-            "marketdata.columns": "YIELDCLOSE,COUPONVALUE"
+            "marketdata.columns": "SECID,YIELDCLOSE,COUPONVALUE"
         }
 
         data = await self._fetch_json(endpoint, params)
@@ -54,8 +54,8 @@ class MoexAPI:
         mkt_data = data['marketdata']['data']
         df_marketdata = pd.DataFrame(mkt_data, columns=mkt_cols)
 
-        # Объединяем
-        df = pd.concat([df_securities, df_marketdata], axis=1)
+        # Объединяем по SECID, а не по позиции строки
+        df = df_securities.merge(df_marketdata, on='SECID', how='left')
 
         # Преобразуем даты и числа
         df['MATDATE'] = pd.to_datetime(df['MATDATE'], errors='coerce')
@@ -75,18 +75,13 @@ class MoexAPI:
         if not data or 'coupons' not in data:
             return []
 
-        coupons = data['coupons']['data']
-        coupon_cols = data['coupons']['columns']
-
-        # Возвращаем только будущие купоны
-        today = datetime.now().date()
-        future_coupons = []
+        coupons = pd.DataFrame(data['coupons']['data'], columns=data['coupons']['columns'])
 
-        for coupon in coupons:
-            coupon_dict = dict(zip(coupon_cols, coupon))
-            coupon_date = coupon_dict.get('coupondate')
+        if coupons.empty or 'coupondate' not in coupons.columns:
+            return []
 
-            if coupon_date and datetime.strptime(coupon_date, '%Y-%m-%d').date() > today:
-                future_coupons.append(coupon_dict)
+        # Возвращаем только будущие купоны
+        dates = pd.to_datetime(coupons['coupondate'], errors='coerce')
+        future_coupons = coupons[dates > pd.Timestamp(datetime.now().date())]
 
-        return future_coupons[:3]  # Только ближайшие 3 купона
\ No newline at end of file
+        return future_coupons.head(3).to_dict('records')  # Только ближайшие 3 купона
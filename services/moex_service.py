@@ -1,12 +1,39 @@
-import aiohttp
+import asyncio
+import logging
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
+from typing import AsyncIterator
 from config import Config
+from services.http_client import http_client
+from services.filter_engine import (
+    compile_keywords, keyword_mask, lower_text, matures_after, top_n
+)
+
+
+logger = logging.getLogger(__name__)
 
 
 class MoexService:
     """Сервис для работы с API Московской биржи"""
 
+    # Ключевые слова для отсева оферты/амортизации и упрощённого рейтинга
+    OFFER_PATTERN = compile_keywords(['оферта', 'досрочн', 'погашен', 'call', 'put'])
+    AMORT_PATTERN = compile_keywords(['аморт'])
+    BANK_PATTERN = compile_keywords(['сбербанк', 'втб'])
+    CORP_PATTERN = compile_keywords(['газпром', 'роснефть', 'лукойл'])
+
+    # Рыночные поля, которые обновляются отдельно от справочника
+    MARKETDATA_COLUMNS = ["LAST", "YIELD", "YIELDCLOSE"]
+
+    # Доходность бумаги: по последней сделке, без сделок — закрытия (одна для истории и подписок)
+    YIELD_COLUMNS = ("YIELD", "YIELDCLOSE")
+
+    # Рейтинги в порядке надёжности: код рейтинга = позиция + 1
+    RATING_LABELS = np.array(
+        ["🇷🇺 AAA (ОФЗ)", "🏦 AA (Банк)", "🏭 A (Корпорация)", "📊 BBB (Иные)"], dtype=object
+    )
+
     def __init__(self):
         self.base_url = Config.MOEX_API_URL
 
@@ -14,143 +41,289 @@ class MoexService:
         """Выполнение асинхронного запроса к API"""
         url = f"{self.base_url}{endpoint}"
 
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(
-                        url,
-                        params=params,
-                        timeout=Config.REQUEST_TIMEOUT
-                ) as response:
-                    if response.status == 200:
-                        return await response.json()
-                    else:
-                        print(f"API error: {response.status}")
-                        return {}
-            except Exception as e:
-                print(f"Ошибка запроса к MOEX API: {e}")
-                return {}
-
-    async def get_all_bonds(self) -> pd.DataFrame:
-        """Получение списка всех облигаций"""
-        endpoint = "/engines/stock/markets/bonds/boards/TQOB/securities.json"
+        try:
+            session = await http_client.get_session()
+            async with session.get(url, params=params) as response:
+                if response.status == 200:
+                    return await response.json()
+                else:
+                    logger.warning(f"MOEX API вернул статус {response.status}: {endpoint}")
+                    return {}
+        except Exception as e:
+            logger.error(f"Ошибка запроса к MOEX API: {e}")
+            return {}
+
+    async def _iter_pages(self, endpoint: str, params: dict,
+                          block: str = "securities") -> AsyncIterator[pd.DataFrame]:
+        """Постраничная выгрузка блока ISS по параметру start"""
+        start = 0
+        first_row = None
+
+        while True:
+            data = await self._fetch_json(endpoint, {**params, "start": start})
+
+            if not data or block not in data or not data[block]['data']:
+                return
+
+            rows = data[block]['data']
+
+            # ISS может игнорировать start и снова отдать первую страницу
+            if first_row is None:
+                first_row = rows[0]
+            elif rows[0] == first_row:
+                return
+
+            yield pd.DataFrame(rows, columns=data[block]['columns'])
+
+            start += len(rows)
+
+            # Если есть курсор — идём по нему, иначе до неполной страницы
+            cursor = data.get(f"{block}.cursor")
+            if cursor and cursor['data']:
+                index, total, page_size = cursor['data'][0][:3]
+                if index + page_size >= total:
+                    return
+            elif len(rows) < Config.ISS_PAGE_SIZE:
+                return
+
+    async def get_all_bonds(self, board: str = Config.BONDS_BOARD) -> pd.DataFrame:
+        """Получение списка всех облигаций режима торгов вместе с рыночными данными"""
+        reference, marketdata = await asyncio.gather(
+            self.get_reference(board), self.get_marketdata(board)
+        )
+        return self.merge_marketdata(reference, marketdata)
+
+    async def get_reference(self, board: str = Config.BONDS_BOARD) -> pd.DataFrame:
+        """Справочные данные облигаций режима торгов (меняются редко)"""
+        endpoint = f"/engines/stock/markets/bonds/boards/{board}/securities.json"
 
         params = {
+            "iss.only": "securities",
+            "iss.meta": "off",
             "securities.columns": (
-                "SECID,SHORTNAME,SECNAME,ISSUESIZE,COUPONPERCENT,"
-                "COUPONPERIOD,MATDATE,LISTLEVEL,FACEVALUE,CURRENCY"
-            ),
-            "marketdata.columns": "YIELDCLOSE"
+                "SECID,BOARDID,SHORTNAME,SECNAME,ISIN,ISSUESIZE,COUPONPERCENT,"
+                "COUPONPERIOD,MATDATE,LISTLEVEL,FACEVALUE,FACEUNIT,ACCRUEDINT,PREVPRICE"
+            )
         }
 
-        data = await self._fetch_json(endpoint, params)
+        chunks = [chunk async for chunk in self._iter_pages(endpoint, params)]
 
-        if not data or 'securities' not in data:
+        if not chunks:
             return pd.DataFrame()
 
-        sec_cols = data['securities']['columns']
-        sec_data = data['securities']['data']
-        df = pd.DataFrame(sec_data, columns=sec_cols)
+        df = pd.concat(chunks, ignore_index=True)
+
+        return self._normalize_bonds(df, board)
+
+    async def get_marketdata(self, board: str = Config.BONDS_BOARD) -> pd.DataFrame:
+        """Лёгкая выгрузка только рыночных данных режима торгов"""
+        endpoint = f"/engines/stock/markets/bonds/boards/{board}/securities.json"
+
+        params = {
+            "iss.only": "marketdata",
+            "iss.meta": "off",
+            "marketdata.columns": "SECID," + ",".join(self.MARKETDATA_COLUMNS)
+        }
+
+        chunks = [chunk async for chunk in self._iter_pages(endpoint, params, block="marketdata")]
+
+        if not chunks:
+            return pd.DataFrame()
+
+        df = pd.concat(chunks, ignore_index=True)
+        df['SECID'] = df['SECID'].astype(str)
+
+        for column in self.MARKETDATA_COLUMNS:
+            if column in df.columns:
+                df[column] = pd.to_numeric(df[column], errors='coerce')
+
+        return df.drop_duplicates(subset=['SECID']).set_index('SECID')
+
+    def merge_marketdata(self, reference: pd.DataFrame, marketdata: pd.DataFrame) -> pd.DataFrame:
+        """Подмешивание свежих рыночных данных к справочнику по SECID"""
+        if reference.empty:
+            return reference
+
+        df = reference.drop(columns=[c for c in self.MARKETDATA_COLUMNS if c in reference.columns])
+
+        if marketdata.empty:
+            return df
+
+        return df.join(marketdata, on='SECID')
+
+    async def get_bonds_universe(self, boards: tuple = Config.BONDS_BOARDS) -> pd.DataFrame:
+        """Параллельная загрузка облигаций со всех режимов торгов"""
+        frames = await asyncio.gather(*(self.get_all_bonds(board) for board in boards))
+        return self.combine_boards(frames)
+
+    async def get_bond_coupons(self, secid: str) -> pd.DataFrame:
+        """Полный график купонов облигации (даты разобраны векторно)"""
+        endpoint = f"/securities/{secid}/bondization.json"
+
+        params = {
+            "iss.only": "coupons",
+            "iss.meta": "off",
+            "limit": Config.ISS_PAGE_SIZE,
+            "coupons.columns": "coupondate,value,valueprc,facevalue"
+        }
+
+        chunks = [chunk async for chunk in self._iter_pages(endpoint, params, block="coupons")]
+
+        if not chunks:
+            return pd.DataFrame(columns=['coupondate', 'value', 'valueprc', 'facevalue'])
+
+        df = pd.concat(chunks, ignore_index=True)
+        df['coupondate'] = pd.to_datetime(df['coupondate'], errors='coerce')
+        df['value'] = pd.to_numeric(df['value'], errors='coerce')
+        df['valueprc'] = pd.to_numeric(df['valueprc'], errors='coerce')
+        df['facevalue'] = pd.to_numeric(df['facevalue'], errors='coerce')
+
+        return df.dropna(subset=['coupondate']).sort_values('coupondate', ignore_index=True)
+
+    @staticmethod
+    def combine_boards(frames: list) -> pd.DataFrame:
+        """Объединение режимов торгов в одну таблицу с ключом SECID/BOARDID"""
+        frames = [f for f in frames if not f.empty]
+
+        if not frames:
+            return pd.DataFrame()
+
+        df = pd.concat(frames, ignore_index=True)
+        return df.drop_duplicates(subset=['SECID', 'BOARDID']).reset_index(drop=True)
+
+    @staticmethod
+    def _normalize_bonds(df: pd.DataFrame, board: str) -> pd.DataFrame:
+        """Приведение типов колонок таблицы облигаций"""
+        if 'BOARDID' not in df.columns:
+            df['BOARDID'] = board
 
         # Преобразуем типы данных
+        df['SECID'] = df['SECID'].astype(str)
+        df['BOARDID'] = df['BOARDID'].astype(str)
         df['MATDATE'] = pd.to_datetime(df['MATDATE'], errors='coerce')
         df['COUPONPERCENT'] = pd.to_numeric(df['COUPONPERCENT'], errors='coerce')
         df['COUPONPERIOD'] = pd.to_numeric(df['COUPONPERIOD'], errors='coerce')
         df['ISSUESIZE'] = pd.to_numeric(df['ISSUESIZE'], errors='coerce')
         df['FACEVALUE'] = pd.to_numeric(df['FACEVALUE'], errors='coerce')
+        df['LISTLEVEL'] = pd.to_numeric(df['LISTLEVEL'], errors='coerce')
 
-        return df
+        # НКД и цена предыдущего дня нужны для расчёта доходности к погашению
+        for column in ('ACCRUEDINT', 'PREVPRICE'):
+            if column in df.columns:
+                df[column] = pd.to_numeric(df[column], errors='coerce')
 
+        # В ISS рубль обозначается как SUR
+        if 'FACEUNIT' in df.columns:
+            df['CURRENCY'] = df.pop('FACEUNIT').replace('SUR', 'RUB')
+
+        return df.drop_duplicates(subset=['SECID', 'BOARDID']).reset_index(drop=True)
 
     def filter_reliable_bonds(self, df: pd.DataFrame, limit: int = 10) -> pd.DataFrame:
         """Фильтрация надёжных облигаций с проверкой наличия колонок"""
         if df.empty:
             return df
 
-        filtered = df.copy()
+        columns = df.columns
+        mask = np.ones(len(df), dtype=bool)
 
         # Фильтр 1: Только 1-й уровень листинга (если колонка существует)
-        if 'LISTLEVEL' in filtered.columns:
-            filtered = filtered[filtered['LISTLEVEL'] == 1]
+        if 'LISTLEVEL' in columns:
+            mask &= (df['LISTLEVEL'] == 1).to_numpy()
 
-        # Фильтр 2: Только рублёвые облигации (если колонка существует)
-        if 'CURRENCY' in filtered.columns:
-            filtered = filtered[filtered['CURRENCY'] == 'RUB']
-        else:
-            # Если нет колонки CURRENCY, предполагаем, что все облигации рублёвые
-            # или пропускаем этот фильтр
-            pass
+        # Фильтр 2: Только рублёвые облигации (если колонки нет — считаем рублёвыми)
+        if 'CURRENCY' in columns:
+            mask &= (df['CURRENCY'] == 'RUB').to_numpy()
 
         # Фильтр 3: Только с купонной доходностью
-        if 'COUPONPERCENT' in filtered.columns:
-            filtered = filtered[
-                filtered['COUPONPERCENT'].notna() &
-                (filtered['COUPONPERCENT'] > 0)
-                ]
+        if 'COUPONPERCENT' in columns:
+            mask &= (df['COUPONPERCENT'].notna() & (df['COUPONPERCENT'] > 0)).to_numpy()
 
         # Фильтр 4: Срок погашения в будущем
-        if 'MATDATE' in filtered.columns:
-            today = datetime.now().date()
-            filtered = filtered[
-                pd.to_datetime(filtered['MATDATE'], errors='coerce').dt.date > today + timedelta(days=30)
-                ]
+        if 'MATDATE' in columns:
+            mask &= matures_after(df['MATDATE'], datetime.now().date() + timedelta(days=Config.SCREEN_MIN_DAYS))
 
         # Фильтр 5: Минимальный объём выпуска
-        if 'ISSUESIZE' in filtered.columns:
-            filtered = filtered[filtered['ISSUESIZE'] >= 100_000_000]
+        if 'ISSUESIZE' in columns:
+            mask &= (df['ISSUESIZE'] >= Config.SCREEN_MIN_ISSUE).to_numpy()
 
-        # Проверка на оферту и амортизацию
-        def has_offer(name):
-            keywords = ['оферта', 'досрочн', 'погашен', 'call', 'put']
-            return any(kw in str(name).lower() for kw in keywords)
+        filtered = df[mask]
 
-        def has_amort(name):
-            return 'аморт' in str(name).lower()
+        # Проверка на оферту и амортизацию
+        if 'SECNAME' in columns:
+            secname = lower_text(filtered['SECNAME'])
+            filtered = filtered[
+                ~keyword_mask(secname, self.OFFER_PATTERN) &
+                ~keyword_mask(secname, self.AMORT_PATTERN)
+                ]
 
-        if 'SECNAME' in filtered.columns:
-            filtered = filtered[~filtered['SECNAME'].apply(has_offer)]
-            filtered = filtered[~filtered['SECNAME'].apply(has_amort)]
+        # Сортировка: рейтинг по возрастанию, доходность к погашению по убыванию
+        # (без цены — по купону)
+        codes = self.rating_codes(filtered)
+        top = top_n(codes, -self.return_measure(filtered), limit)
+
+        result = filtered.iloc[top].copy()
+        self.add_derived_columns(result, codes[top])
+
+        return result.reset_index(drop=True)
+
+    @staticmethod
+    def coalesce(df: pd.DataFrame, columns) -> np.ndarray:
+        """Первое непустое значение из колонок по каждой строке (NaN, если пусто везде)"""
+        values = np.full(len(df), np.nan)
+        for name in reversed(columns):
+            if name in df.columns:
+                current = pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=float)
+                values = np.where(np.isnan(current), values, current)
+        return values
+
+    @staticmethod
+    def return_measure(df: pd.DataFrame) -> np.ndarray:
+        """Мера доходности для ранжирования: YTM, где посчитана, иначе купон"""
+        coupon = df['COUPONPERCENT'].to_numpy(dtype=float)
+        if 'YTM' not in df.columns:
+            return coupon
+
+        ytm = df['YTM'].to_numpy(dtype=float)
+        return np.where(np.isnan(ytm), coupon, ytm)
+
+    def add_derived_columns(self, df: pd.DataFrame, codes: np.ndarray = None) -> pd.DataFrame:
+        """Расчётные поля: рейтинг, частота купона и срок до погашения"""
+        if codes is None:
+            codes = self.rating_codes(df)
 
         # Добавляем недостающие колонки со значениями по умолчанию
-        if 'CURRENCY' not in filtered.columns:
-            filtered['CURRENCY'] = 'RUB'  # Предполагаем рубли по умолчанию
+        if 'CURRENCY' not in df.columns:
+            df['CURRENCY'] = 'RUB'  # Предполагаем рубли по умолчанию
 
-        if 'FACEVALUE' not in filtered.columns:
-            filtered['FACEVALUE'] = 1000.0  # Стандартный номинал
+        if 'FACEVALUE' not in df.columns:
+            df['FACEVALUE'] = 1000.0  # Стандартный номинал
 
-        # Рейтинги
-        def calculate_rating(row):
-            if 'SHORTNAME' not in row.index or 'SECNAME' not in row.index:
-                return "📊 BBB (Иные)"
-
-            shortname = str(row['SHORTNAME']).lower() if pd.notna(row['SHORTNAME']) else ''
-            secname = str(row['SECNAME']).lower() if pd.notna(row['SECNAME']) else ''
-
-            if 'офз' in shortname:
-                return "🇷🇺 AAA (ОФЗ)"
-            elif any(x in secname for x in ['сбербанк', 'втб']):
-                return "🏦 AA (Банк)"
-            elif any(x in secname for x in ['газпром', 'роснефть', 'лукойл']):
-                return "🏭 A (Корпорация)"
-            else:
-                return "📊 BBB (Иные)"
-
-        filtered['RATING'] = filtered.apply(calculate_rating, axis=1)
+        df['RATING'] = self.RATING_LABELS[codes - 1]
 
         # Купонная частота
-        if 'COUPONPERIOD' in filtered.columns:
-            filtered['COUPON_FREQ'] = (365 / filtered['COUPONPERIOD']).round().fillna(0).astype(int)
+        if 'COUPONPERIOD' in df.columns:
+            df['COUPON_FREQ'] = (365 / df['COUPONPERIOD']).round().fillna(0).astype(int)
         else:
-            filtered['COUPON_FREQ'] = 2  # По умолчанию 2 раза в год
+            df['COUPON_FREQ'] = 2  # По умолчанию 2 раза в год
 
         # Срок до погашения
-        if 'MATDATE' in filtered.columns:
-            filtered['YEARS'] = ((pd.to_datetime(filtered['MATDATE']) - pd.Timestamp.now()).dt.days / 365).round(1)
+        if 'MATDATE' in df.columns:
+            df['YEARS'] = ((pd.to_datetime(df['MATDATE']) - pd.Timestamp.now()).dt.days / 365).round(1)
         else:
-            filtered['YEARS'] = 1.0
+            df['YEARS'] = 1.0
+
+        return df
+
+    def rating_codes(self, df: pd.DataFrame) -> np.ndarray:
+        """Код упрощённого рейтинга (1 — лучший) для каждой строки таблицы"""
+        if 'SHORTNAME' not in df.columns or 'SECNAME' not in df.columns:
+            return np.full(len(df), 4)
 
-        # Сортировка
-        rating_order = {'🇷🇺 AAA (ОФЗ)': 1, '🏦 AA (Банк)': 2, '🏭 A (Корпорация)': 3, '📊 BBB (Иные)': 4}
-        filtered['R_ORDER'] = filtered['RATING'].map(lambda x: rating_order.get(x, 5))
-        filtered = filtered.sort_values(['R_ORDER', 'COUPONPERCENT'], ascending=[True, False])
+        shortname = lower_text(df['SHORTNAME'])
+        secname = lower_text(df['SECNAME'])
 
-        return filtered.head(limit).reset_index(drop=True).drop(columns=['R_ORDER'])
\ No newline at end of file
+        return np.select([
+            shortname.str.contains('офз', regex=False).to_numpy(dtype=bool),
+            keyword_mask(secname, self.BANK_PATTERN),
+            keyword_mask(secname, self.CORP_PATTERN),
+        ], [1, 2, 3], default=4)
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+from services.coupons import CouponStore, coupon_store
+from services.local_db import local_database
+
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS holdings (
+        user_id INTEGER NOT NULL,
+        secid TEXT NOT NULL,
+        quantity REAL NOT NULL,
+        PRIMARY KEY (user_id, secid)
+    ) WITHOUT ROWID;
+'''
+
+
+class PortfolioProjection:
+    """Календарь выплат портфеля: суммы по месяцам и ближайшие платежи"""
+
+    def __init__(self, holdings: Dict[str, float], monthly: pd.DataFrame, upcoming: pd.DataFrame,
+                 missing: Tuple[str, ...]):
+        self.holdings = holdings
+        self.monthly = monthly
+        self.upcoming = upcoming
+        self.missing = missing
+
+    @property
+    def total(self) -> float:
+        return float(self.monthly['amount'].sum()) if not self.monthly.empty else 0.0
+
+
+class PortfolioStore:
+    """Позиции пользователей (SQLite) и кэш их календарей выплат"""
+
+    def __init__(self, path: str = Config.DB_PATH, coupons: CouponStore = coupon_store,
+                 cache_size: int = Config.PORTFOLIO_CACHE_SIZE):
+        self.db = local_database(path)
+        self.db.add_schema(SCHEMA)
+        self.coupons = coupons
+        self.cache_size = cache_size
+        # Кэши меняют обработчики (через to_thread) и цикл событий: чтение базы и запись
+        # в кэш, как и запись в базу и сброс кэша, идут под одним замком
+        self._lock = threading.RLock()
+
+        # Позиции и календари по пользователю; календарь помнит ключ, при котором построен
+        self._holdings: "OrderedDict[int, Dict[str, float]]" = OrderedDict()
+        self._projections: "OrderedDict[int, Tuple[tuple, PortfolioProjection]]" = OrderedDict()
+        self._versions: Dict[int, int] = {}
+
+        # Общая таблица потоков по всем загруженным графикам
+        self._flows: Optional[pd.DataFrame] = None
+        self._flows_key: Optional[tuple] = None
+
+        self.hits = 0
+        self.misses = 0
+
+    def holdings(self, user_id: int) -> Dict[str, float]:
+        """Позиции пользователя: SECID → количество бумаг"""
+        with self._lock:
+            cached = self._holdings.get(user_id)
+            if cached is not None:
+                self._holdings.move_to_end(user_id)
+                return cached
+
+            with self.db.read() as conn:
+                rows = conn.execute(
+                    "SELECT secid, quantity FROM holdings WHERE user_id = ? ORDER BY secid", (user_id,)
+                ).fetchall()
+
+            holdings = dict(rows)
+            self._remember(self._holdings, user_id, holdings)
+            return holdings
+
+    def set(self, user_id: int, secid: str, quantity: float) -> None:
+        """Количество бумаг в позиции; 0 — закрыть позицию"""
+        with self._lock:
+            with self.db.transaction() as conn:
+                if quantity > 0:
+                    conn.execute(
+                        "INSERT INTO holdings (user_id, secid, quantity) VALUES (?, ?, ?) "
+                        "ON CONFLICT (user_id, secid) DO UPDATE SET quantity = excluded.quantity",
+                        (user_id, secid, quantity)
+                    )
+                else:
+                    conn.execute("DELETE FROM holdings WHERE user_id = ? AND secid = ?", (user_id, secid))
+
+            # Изменение позиций — единственное, что кроме графиков сбрасывает календарь
+            self._holdings.pop(user_id, None)
+            self._projections.pop(user_id, None)
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    def _remember(self, cache: OrderedDict, user_id: int, value) -> None:
+        """Запись в LRU-кэш (вызывается под замком)"""
+        cache[user_id] = value
+        while len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+    def _flow_table(self) -> pd.DataFrame:
+        """Все будущие платежи по загруженным графикам; пересобирается при новых графиках"""
+        key = (self.coupons.generation, date.today())
+        if self._flows is not None and self._flows_key == key:
+            return self._flows
+
+        schedules = self.coupons.loaded()
+        if not schedules:
+            # Типизированная пустая таблица: календарь считается и до загрузки графиков
+            flows = pd.DataFrame({
+                'SECID': pd.Series(dtype=object),
+                'coupondate': pd.Series(dtype='datetime64[ns]'),
+                'value': pd.Series(dtype=float),
+                'principal': pd.Series(dtype=float),
+                'estimated': pd.Series(dtype=bool),
+            })
+        else:
+            flows = pd.concat(schedules, names=['SECID', None]).reset_index(level=0)
+            flows = flows[['SECID', 'coupondate', 'value', 'facevalue']].reset_index(drop=True)
+
+            # Необъявленные купоны — по последнему известному размеру этой бумаги
+            flows['estimated'] = flows['value'].isna()
+            flows['value'] = flows.groupby('SECID')['value'].ffill().fillna(0.0)
+
+            # Номинал возвращается вместе с последним купоном
+            last = ~flows['SECID'].duplicated(keep='last')
+            flows['principal'] = np.where(last, flows['facevalue'].fillna(0.0), 0.0)
+
+            flows = flows[flows['coupondate'] > pd.Timestamp(date.today())]
+            flows = flows.drop(columns='facevalue').sort_values('coupondate', ignore_index=True)
+
+        self._flows, self._flows_key = flows, key
+        return flows
+
+    def project(self, user_id: int, horizon: int = Config.PORTFOLIO_HORIZON_MONTHS) -> PortfolioProjection:
+        """Календарь выплат по уже загруженным графикам (кэшируется до изменения позиций/графиков)"""
+        # Позиции, версия и запись календаря — согласованно с set()
+        with self._lock:
+            holdings = self.holdings(user_id)
+            key = (self._versions.get(user_id, 0), self.coupons.generation, date.today(), horizon)
+
+            cached = self._projections.get(user_id)
+            if cached is not None and cached[0] == key:
+                self.hits += 1
+                self._projections.move_to_end(user_id)
+                return cached[1]
+
+            self.misses += 1
+            flows = self._flow_table()
+            end = pd.Timestamp(date.today()) + pd.DateOffset(months=horizon)
+
+            # Один проход по общей таблице: отбор позиций, умножение на количество, группировка по месяцам
+            quantity = flows['SECID'].map(holdings)
+            selected = flows[quantity.notna().to_numpy() & (flows['coupondate'] <= end).to_numpy()]
+            amount = (selected['value'] + selected['principal']) * quantity[selected.index]
+            payments = selected.assign(amount=amount, month=selected['coupondate'].dt.to_period('M'))
+
+            monthly = payments.groupby('month').agg(amount=('amount', 'sum'), estimated=('estimated', 'any'))
+            upcoming = payments.head(Config.PORTFOLIO_UPCOMING_COUNT)[['coupondate', 'SECID', 'amount', 'estimated']]
+            missing = tuple(secid for secid in holdings if self.coupons.peek(secid) is None)
+
+            projection = PortfolioProjection(holdings, monthly.reset_index(), upcoming, missing)
+            self._remember(self._projections, user_id, (key, projection))
+            return projection
+
+    async def calendar(self, user_id: int) -> PortfolioProjection:
+        """Календарь выплат; недостающие графики догружаются перед расчётом"""
+        holdings = await asyncio.to_thread(self.holdings, user_id)
+        await self.coupons.prefetch(holdings)
+        return self.project(user_id)
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self._holdings),
+            "projections": len(self._projections),
+            "flows": 0 if self._flows is None else len(self._flows),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Единое хранилище портфелей на процесс
+portfolio_store = PortfolioStore()
@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional, Set
+
+from config import Config
+from services.snapshot import SnapshotCache, snapshot_cache
+
+
+logger = logging.getLogger(__name__)
+
+# Московское время (без перехода на летнее)
+MSK = timezone(timedelta(hours=3))
+
+
+def load_holidays(path: str = Config.HOLIDAYS_FILE) -> Set[date]:
+    """Загрузка календаря неторговых дней из локального файла"""
+    holidays = set()
+
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    holidays.add(date.fromisoformat(line))
+    except FileNotFoundError:
+        logger.warning(f"Календарь праздников не найден: {path}")
+        return holidays
+
+    # Календарь продлевается вручную раз в год — напоминаем, если он закончился
+    if all(day.year < date.today().year for day in holidays):
+        logger.warning(f"В календаре праздников нет дат {date.today().year} года: {path}")
+
+    return holidays
+
+
+def _at(day: datetime, hhmm: str) -> datetime:
+    hour, minute = map(int, hhmm.split(":"))
+    return day.replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+
+class RefreshScheduler:
+    """Фоновое обновление снимка рынка с учётом торговых сессий"""
+
+    def __init__(self, cache: SnapshotCache = snapshot_cache, holidays: Optional[Set[date]] = None):
+        self.cache = cache
+        self.holidays = holidays if holidays is not None else load_holidays()
+        self._loop_task: Optional[asyncio.Task] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+        # Метрики
+        self.runs = 0
+        self.skipped = 0
+        self.failures = 0
+        self.last_duration = 0.0
+        self.total_duration = 0.0
+        self.last_run_at: Optional[datetime] = None
+
+    def is_trading_day(self, now: datetime) -> bool:
+        return now.weekday() < 5 and now.date() not in self.holidays
+
+    def refresh_interval(self, now: datetime) -> Optional[float]:
+        """Интервал обновления в текущий момент; None — биржа закрыта"""
+        if not self.is_trading_day(now):
+            return None
+
+        main_start, main_end = Config.MAIN_SESSION
+        if _at(now, main_start) <= now < _at(now, main_end):
+            return Config.REFRESH_INTERVAL_MAIN
+
+        evening_start, evening_end = Config.EVENING_SESSION
+        if _at(now, evening_start) <= now < _at(now, evening_end):
+            return Config.REFRESH_INTERVAL_EVENING
+
+        return None
+
+    def next_session_start(self, now: datetime) -> datetime:
+        """Начало ближайшей торговой сессии"""
+        day = now
+        for _ in range(30):
+            if self.is_trading_day(day):
+                for start, _end in (Config.MAIN_SESSION, Config.EVENING_SESSION):
+                    if _at(day, start) > now:
+                        return _at(day, start)
+            day = (day + timedelta(days=1)).replace(hour=0, minute=0)
+        return now + timedelta(days=1)
+
+    def start(self) -> None:
+        """Запуск планировщика; пользовательские запросы больше не ждут биржу"""
+        if self._loop_task is None:
+            self.cache.serve_stale = True
+            self._loop_task = asyncio.create_task(self._run())
+            logger.info("Планировщик обновления снимка запущен")
+
+    async def stop(self) -> None:
+        tasks = [task for task in (self._loop_task, self._refresh_task) if task is not None]
+        for task in tasks:
+            task.cancel()
+
+        # Дожидаемся отмены, чтобы обновление не продолжалось после закрытия HTTP-сессии
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+        self._loop_task = self._refresh_task = None
+        self.cache.serve_stale = False
+
+    async def _run(self) -> None:
+        # Сразу прогреваем кэш, чтобы первый пользователь не ждал биржу
+        self._tick()
+
+        while True:
+            now = datetime.now(MSK)
+            interval = self.refresh_interval(now)
+
+            if interval is None:
+                # Биржа закрыта: спим до открытия (но не больше часа — на случай смены календаря)
+                delay = min((self.next_session_start(now) - now).total_seconds(), 3600)
+            else:
+                delay = interval * (1 + random.uniform(-Config.REFRESH_JITTER, Config.REFRESH_JITTER))
+
+            await asyncio.sleep(max(delay, 1))
+
+            if self.refresh_interval(datetime.now(MSK)) is not None:
+                self._tick()
+
+    def _tick(self) -> None:
+        """Запуск обновления, если предыдущее ещё не закончилось"""
+        if self._refresh_task is not None and not self._refresh_task.done():
+            self.skipped += 1
+            logger.warning("Предыдущее обновление снимка ещё идёт — пропускаем")
+            return
+
+        self._refresh_task = asyncio.create_task(self._refresh())
+
+    async def _refresh(self) -> None:
+        started = time.monotonic()
+
+        try:
+            snapshot = await self.cache.get_universe(force=True)
+            if snapshot.empty:
+                self.failures += 1
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Ошибка фонового обновления снимка: {e}")
+        finally:
+            self.runs += 1
+            self.last_duration = time.monotonic() - started
+            self.total_duration += self.last_duration
+            self.last_run_at = datetime.now(MSK)
+            logger.info(f"Снимок обновлён за {self.last_duration:.2f} с")
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "failures": self.failures,
+            "last_duration": round(self.last_duration, 3),
+            "avg_duration": round(self.total_duration / self.runs, 3) if self.runs else 0.0,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None
+        }
+
+
+# Единый планировщик на процесс
+refresh_scheduler = RefreshScheduler()
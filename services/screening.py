@@ -0,0 +1,312 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+from services.filter_engine import keyword_mask, lower_text, matures_after, top_n
+from services.local_db import local_database
+from services.moex_service import MoexService
+from services.snapshot import BondSnapshot
+
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS screen_profiles (
+        user_id INTEGER PRIMARY KEY,
+        profile TEXT NOT NULL
+    );
+'''
+
+
+class ScreenProfile:
+    """Параметры отбора облигаций; по умолчанию совпадают с filter_reliable_bonds"""
+
+    FIELDS = ("min_days", "max_days", "min_issue", "coupon_min", "coupon_max", "ratings", "boards")
+
+    def __init__(self, min_days: int = Config.SCREEN_MIN_DAYS, max_days: Optional[int] = None,
+                 min_issue: float = Config.SCREEN_MIN_ISSUE, coupon_min: Optional[float] = None,
+                 coupon_max: Optional[float] = None, ratings: Tuple[int, ...] = (),
+                 boards: Tuple[str, ...] = ()):
+        self.min_days = min_days
+        self.max_days = max_days
+        self.min_issue = min_issue
+        self.coupon_min = coupon_min
+        self.coupon_max = coupon_max
+        self.ratings = tuple(sorted(ratings))
+        self.boards = tuple(sorted(boards))
+
+    def atoms(self) -> Tuple[tuple, ...]:
+        """Атомарные условия профиля; каждое — ключ маски в кэше снимка"""
+        atoms = [
+            ("listlevel", 1),
+            ("currency", "RUB"),
+            ("coupon_positive",),
+            ("matures_after", self.min_days),
+            ("min_issue", self.min_issue),
+            ("no_offer",),
+            ("no_amort",),
+        ]
+        if self.max_days is not None:
+            atoms.append(("matures_before", self.max_days))
+        if self.coupon_min is not None:
+            atoms.append(("coupon_min", self.coupon_min))
+        if self.coupon_max is not None:
+            atoms.append(("coupon_max", self.coupon_max))
+        if self.ratings:
+            atoms.append(("ratings", self.ratings))
+        if self.boards:
+            atoms.append(("boards", self.boards))
+        return tuple(atoms)
+
+    @property
+    def key(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.FIELDS)
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ScreenProfile":
+        return cls(**{name: data[name] for name in cls.FIELDS if name in data})
+
+
+def _range(value: str) -> Tuple[Optional[float], Optional[float]]:
+    """«1-5», «1-», «-5» или «3» → (нижняя, верхняя) граница"""
+    low, sep, high = value.replace(",", ".").partition("-")
+    low = float(low) if low else None
+    high = float(high) if high else (None if sep else low)
+    return low, high
+
+
+def parse_profile(args: str, base: ScreenProfile) -> ScreenProfile:
+    """Изменение профиля по строке «years 1-5 issue 1e9 coupon 8-15 rating 1,2 board TQOB»"""
+    words = args.split()
+    if len(words) % 2:
+        raise ValueError("ожидаются пары «параметр значение»")
+
+    data = base.to_dict()
+    for name, value in zip(words[::2], words[1::2]):
+        name = name.lower()
+        if name == "years":
+            low, high = _range(value)
+            data["min_days"] = max(int(low * 365), Config.SCREEN_MIN_DAYS) if low else Config.SCREEN_MIN_DAYS
+            data["max_days"] = int(high * 365) if high else None
+        elif name == "issue":
+            data["min_issue"] = float(value)
+        elif name == "coupon":
+            data["coupon_min"], data["coupon_max"] = _range(value)
+        elif name == "rating":
+            ratings = tuple(int(code) for code in value.split(",") if code)
+            if any(code not in range(1, len(MoexService.RATING_LABELS) + 1) for code in ratings):
+                raise ValueError("рейтинг — числа от 1 до 4")
+            data["ratings"] = ratings
+        elif name == "board":
+            data["boards"] = tuple(board.upper() for board in value.split(",") if board)
+        else:
+            raise ValueError(f"неизвестный параметр {name}")
+
+    return ScreenProfile.from_dict(data)
+
+
+class Screener:
+    """Отбор по профилям: атомарные маски кэшируются на версию снимка и объединяются через &"""
+
+    def __init__(self, moex: Optional[MoexService] = None, cache_size: int = Config.SCREEN_CACHE_SIZE):
+        self._moex = moex or MoexService()
+        self.cache_size = cache_size
+        self._key: Optional[tuple] = None
+        self._masks: Dict[tuple, np.ndarray] = {}
+        self._ratings: Optional[np.ndarray] = None
+        self._secname: Optional[pd.Series] = None
+        self._results: "OrderedDict[tuple, pd.DataFrame]" = OrderedDict()
+
+        self.mask_hits = 0
+        self.mask_misses = 0
+
+    def _check_version(self, snapshot: BondSnapshot) -> None:
+        """Маски зависят от снимка и от даты (сроки до погашения)"""
+        key = (snapshot.version, date.today())
+        if key != self._key:
+            self._masks.clear()
+            self._results.clear()
+            self._ratings = None
+            self._secname = None
+            self._key = key
+
+    def _rating_codes(self, df: pd.DataFrame) -> np.ndarray:
+        if self._ratings is None:
+            self._ratings = self._moex.rating_codes(df)
+        return self._ratings
+
+    def _lower_secname(self, df: pd.DataFrame) -> pd.Series:
+        if self._secname is None:
+            self._secname = lower_text(df['SECNAME'])
+        return self._secname
+
+    def mask(self, snapshot: BondSnapshot, atom: tuple) -> np.ndarray:
+        """Маска одного условия (считается один раз на версию снимка)"""
+        self._check_version(snapshot)
+        mask = self._masks.get(atom)
+
+        if mask is None:
+            self.mask_misses += 1
+            mask = self._masks[atom] = self._compute(snapshot.df, atom)
+        else:
+            self.mask_hits += 1
+        return mask
+
+    def _compute(self, df: pd.DataFrame, atom: tuple) -> np.ndarray:
+        """Условие по колонке; если колонки нет — условие не ограничивает (как в filter_reliable_bonds)"""
+        name, *args = atom
+        columns = df.columns
+        everything = np.ones(len(df), dtype=bool)
+
+        if name == "listlevel":
+            return (df['LISTLEVEL'] == args[0]).to_numpy() if 'LISTLEVEL' in columns else everything
+        if name == "currency":
+            return (df['CURRENCY'] == args[0]).to_numpy() if 'CURRENCY' in columns else everything
+        if name == "coupon_positive":
+            if 'COUPONPERCENT' not in columns:
+                return everything
+            return (df['COUPONPERCENT'].notna() & (df['COUPONPERCENT'] > 0)).to_numpy()
+        if name == "coupon_min":
+            return (df['COUPONPERCENT'] >= args[0]).to_numpy() if 'COUPONPERCENT' in columns else everything
+        if name == "coupon_max":
+            return (df['COUPONPERCENT'] <= args[0]).to_numpy() if 'COUPONPERCENT' in columns else everything
+        if name == "matures_after":
+            if 'MATDATE' not in columns:
+                return everything
+            return matures_after(df['MATDATE'], date.today() + timedelta(days=args[0]))
+        if name == "matures_before":
+            if 'MATDATE' not in columns:
+                return everything
+            return (pd.to_datetime(df['MATDATE']) <= pd.Timestamp(date.today() + timedelta(days=args[0]))).to_numpy()
+        if name == "min_issue":
+            return (df['ISSUESIZE'] >= args[0]).to_numpy() if 'ISSUESIZE' in columns else everything
+        if name == "no_offer":
+            if 'SECNAME' not in columns:
+                return everything
+            return ~keyword_mask(self._lower_secname(df), MoexService.OFFER_PATTERN)
+        if name == "no_amort":
+            if 'SECNAME' not in columns:
+                return everything
+            return ~keyword_mask(self._lower_secname(df), MoexService.AMORT_PATTERN)
+        if name == "ratings":
+            return np.isin(self._rating_codes(df), args[0])
+        if name == "boards":
+            return df['BOARDID'].isin(args[0]).to_numpy() if 'BOARDID' in columns else everything
+
+        raise ValueError(f"Неизвестное условие отбора: {name}")
+
+    def profile_mask(self, snapshot: BondSnapshot, profile: ScreenProfile) -> np.ndarray:
+        """Маска профиля — побитовое И закэшированных атомарных масок"""
+        mask = np.ones(len(snapshot.df), dtype=bool)
+        for atom in profile.atoms():
+            mask &= self.mask(snapshot, atom)
+        return mask
+
+    def rating_codes(self, snapshot: BondSnapshot) -> np.ndarray:
+        """Коды рейтинга всех строк снимка (считаются один раз на версию)"""
+        self._check_version(snapshot)
+        return self._rating_codes(snapshot.df)
+
+    def screen(self, snapshot: BondSnapshot, profile: ScreenProfile,
+               limit: int = Config.BONDS_LIMIT) -> pd.DataFrame:
+        """Топ облигаций по профилю в порядке filter_reliable_bonds"""
+        self._check_version(snapshot)
+        df = snapshot.df
+
+        key = (profile.key, limit)
+        result = self._results.get(key)
+        if result is not None:
+            self._results.move_to_end(key)
+            return result
+
+        if df.empty:
+            return df
+
+        positions = np.flatnonzero(self.profile_mask(snapshot, profile))
+        filtered = df.iloc[positions]
+        codes = self.rating_codes(snapshot)[positions]
+        top = top_n(codes, -self._moex.return_measure(filtered), limit)
+
+        result = filtered.iloc[top].copy()
+        self._moex.add_derived_columns(result, codes[top])
+        result = result.reset_index(drop=True)
+
+        self._results[key] = result
+        while len(self._results) > self.cache_size:
+            self._results.popitem(last=False)
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "version": self._key[0] if self._key else None,
+            "masks": len(self._masks),
+            "results": len(self._results),
+            "mask_hits": self.mask_hits,
+            "mask_misses": self.mask_misses,
+        }
+
+
+class ProfileStore:
+    """Профили отбора пользователей (SQLite, JSON) с кэшем в памяти"""
+
+    def __init__(self, path: str = Config.DB_PATH):
+        self.db = local_database(path)
+        self.db.add_schema(SCHEMA)
+        # Кэш меняют обработчики в разных потоках (to_thread): чтение базы и запись в кэш,
+        # как и удаление из базы и из кэша, идут под одним замком
+        self._lock = threading.Lock()
+        self._profiles: "OrderedDict[int, ScreenProfile]" = OrderedDict()
+
+    def get(self, user_id: int) -> ScreenProfile:
+        """Профиль пользователя (по умолчанию — стандартный отбор)"""
+        with self._lock:
+            profile = self._profiles.get(user_id)
+            if profile is not None:
+                self._profiles.move_to_end(user_id)
+                return profile
+
+            with self.db.read() as conn:
+                row = conn.execute(
+                    "SELECT profile FROM screen_profiles WHERE user_id = ?", (user_id,)
+                ).fetchone()
+
+            profile = ScreenProfile.from_dict(json.loads(row[0])) if row else ScreenProfile()
+            self._remember(user_id, profile)
+            return profile
+
+    def set(self, user_id: int, profile: ScreenProfile) -> None:
+        with self._lock:
+            with self.db.transaction() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO screen_profiles (user_id, profile) VALUES (?, ?)",
+                    (user_id, json.dumps(profile.to_dict()))
+                )
+            self._remember(user_id, profile)
+
+    def reset(self, user_id: int) -> None:
+        with self._lock:
+            with self.db.transaction() as conn:
+                conn.execute("DELETE FROM screen_profiles WHERE user_id = ?", (user_id,))
+            self._profiles.pop(user_id, None)
+
+    def _remember(self, user_id: int, profile: ScreenProfile) -> None:
+        """Запись в LRU-кэш (вызывается под замком)"""
+        self._profiles[user_id] = profile
+        self._profiles.move_to_end(user_id)
+        while len(self._profiles) > Config.SESSION_MAX_USERS:
+            self._profiles.popitem(last=False)
+
+
+# Единый отбор и хранилище профилей на процесс
+screener = Screener()
+profile_store = ProfileStore()
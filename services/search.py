@@ -0,0 +1,158 @@
+import re
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+from services.snapshot import BondSnapshot
+
+
+# Колонки, по которым ищем: коды целиком, названия — ещё и по словам
+CODE_COLUMNS = ("SECID", "ISIN")
+TEXT_COLUMNS = ("SHORTNAME", "SECNAME")
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Верхняя граница для поиска по префиксу в отсортированном массиве
+PREFIX_END = "\U0010ffff"
+
+
+def fold(text: str) -> str:
+    """Нормализация для поиска: регистр (с кириллицей) и ё → е"""
+    return str(text).casefold().replace("ё", "е")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(fold(text))
+
+
+class SearchIndex:
+    """Отсортированный массив ключей (код, название, слова) → строки снимка"""
+
+    def __init__(self, version: int, df: pd.DataFrame):
+        self.version = version
+        self.df = df.reset_index(drop=True)
+
+        pairs = set()
+        for column in CODE_COLUMNS + TEXT_COLUMNS:
+            if column not in self.df.columns:
+                continue
+            for row, value in enumerate(self.df[column]):
+                if value is None or (isinstance(value, float) and np.isnan(value)):
+                    continue
+                folded = fold(value)
+                pairs.add((folded, row))
+                if column in TEXT_COLUMNS:
+                    pairs.update((token, row) for token in TOKEN_PATTERN.findall(folded))
+
+        ordered = sorted(pairs)
+        self.keys: List[str] = [key for key, _ in ordered]
+        self.rows = np.fromiter((row for _, row in ordered), dtype=np.int32, count=len(ordered))
+
+        # Порядок выдачи: крупные выпуски выше
+        sizes = pd.to_numeric(self.df.get('ISSUESIZE', pd.Series(0, index=self.df.index)), errors='coerce')
+        self.rank = (-sizes.fillna(0).to_numpy(dtype=float)).argsort(kind="stable").argsort()
+
+        self._codes = {
+            fold(value): row
+            for column in CODE_COLUMNS if column in self.df.columns
+            for row, value in enumerate(self.df[column]) if isinstance(value, str)
+        }
+
+    def _prefix_range(self, term: str) -> Tuple[int, int]:
+        """Диапазон ключей с данным префиксом в отсортированном массиве"""
+        lo = bisect_left(self.keys, term)
+        return lo, bisect_left(self.keys, term + PREFIX_END, lo)
+
+    def search(self, query: str, limit: int = Config.SEARCH_LIMIT) -> List[int]:
+        """Строки снимка, где каждое слово запроса — префикс какого-либо ключа"""
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        # Сначала самое избирательное слово, остальные сужают уже найденное
+        ranges = sorted((self._prefix_range(term) for term in terms), key=lambda r: r[1] - r[0])
+        lo, hi = ranges[0]
+        found = np.unique(self.rows[lo:hi])
+
+        for lo, hi in ranges[1:]:
+            if not len(found):
+                break
+            found = found[np.isin(found, self.rows[lo:hi])]
+
+        if not len(found):
+            return []
+
+        # Крупные выпуски выше; точное совпадение кода — первым
+        ranks = self.rank[found]
+        if len(found) > limit:
+            top = np.argpartition(ranks, limit)[:limit]
+            found, ranks = found[top], ranks[top]
+        ordered = found[np.argsort(ranks, kind="stable")].tolist()
+
+        exact = self._codes.get(fold(query.strip()))
+        if exact is not None:
+            ordered = [exact] + [row for row in ordered if row != exact][:limit - 1]
+        return ordered
+
+    def rows_frame(self, rows: List[int]) -> pd.DataFrame:
+        return self.df.iloc[rows]
+
+
+class SearchService:
+    """Индекс на текущую версию снимка и кэш ответов по строке запроса"""
+
+    def __init__(self, cache_size: int = Config.SEARCH_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._index: Optional[SearchIndex] = None
+        self._answers: "OrderedDict[tuple, object]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def index(self, snapshot: BondSnapshot) -> SearchIndex:
+        """Индекс строится один раз на версию снимка"""
+        if self._index is None or self._index.version != snapshot.version:
+            self._index = SearchIndex(snapshot.version, snapshot.df)
+            self._answers.clear()
+        return self._index
+
+    async def rebuild(self, snapshot: BondSnapshot) -> None:
+        """Построение индекса заранее (подписчик обновления снимка)"""
+        self.index(snapshot)
+
+    def cached(self, snapshot: BondSnapshot, query: str, generation: int = 0):
+        """Готовый ответ на запрос для текущей версии снимка.
+
+        generation — версия данных, от которых ещё зависит ответ (например, загруженных купонов).
+        """
+        self.index(snapshot)
+        key = (fold(query.strip()), generation)
+        answer = self._answers.get(key)
+
+        if answer is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._answers.move_to_end(key)
+        return answer
+
+    def remember(self, query: str, answer, generation: int = 0) -> None:
+        self._answers[(fold(query.strip()), generation)] = answer
+        while len(self._answers) > self.cache_size:
+            self._answers.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "version": self._index.version if self._index else None,
+            "keys": len(self._index.keys) if self._index else 0,
+            "answers": len(self._answers),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Единый поисковый индекс на процесс
+search_service = SearchService()
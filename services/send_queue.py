@@ -0,0 +1,303 @@
+import asyncio
+import contextvars
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+
+from config import Config
+
+
+logger = logging.getLogger(__name__)
+
+# Приоритеты: ответы пользователю, уведомления, рассылки
+INTERACTIVE = 0
+NOTIFY = 1
+BROADCAST = 2
+PRIORITIES = (INTERACTIVE, NOTIFY, BROADCAST)
+
+# Вызов уже выполняется очередью — middleware пропускает его без повторной постановки
+_in_queue: contextvars.ContextVar[bool] = contextvars.ContextVar("in_send_queue", default=False)
+
+
+class TokenBucket:
+    """Ведро токенов: rate отправок в секунду, всплеск до capacity"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Сколько ждать до следующего токена (0 — можно отправлять)"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def consume(self) -> None:
+        self.tokens -= 1
+
+    def idle(self, now: float) -> bool:
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+class _Item:
+    __slots__ = ("chat_id", "call", "priority", "future", "enqueued_at", "attempts")
+
+    def __init__(self, chat_id: int, call: Callable[[], Awaitable], priority: int,
+                 future: Optional[asyncio.Future]):
+        self.chat_id = chat_id
+        self.call = call
+        self.priority = priority
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+
+
+class SendQueue:
+    """Исходящие вызовы Bot API с лимитами Telegram: общий и по чатам, с приоритетами"""
+
+    def __init__(self, global_rate: float = Config.SEND_GLOBAL_RATE,
+                 chat_rate: float = Config.SEND_CHAT_RATE,
+                 chat_burst: float = Config.SEND_CHAT_BURST,
+                 concurrency: int = Config.SEND_CONCURRENCY,
+                 max_size: int = Config.SEND_QUEUE_SIZE):
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.concurrency = concurrency
+        self.max_size = max_size
+
+        # Очередь каждого приоритета: чат → его сообщения (чаты обходятся по кругу)
+        self._lanes: List["OrderedDict[int, Deque[_Item]]"] = [OrderedDict() for _ in PRIORITIES]
+        self._size = 0
+        self._busy: Set[int] = set()
+        self._buckets: Dict[int, TokenBucket] = {}
+        self._global: Optional[TokenBucket] = None
+        self._paused_until = 0.0
+        self._bot: Optional[Bot] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._last_gc = 0.0
+
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.retried = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def start(self, bot: Bot) -> None:
+        if self._runner is not None:
+            return
+
+        self._bot = bot
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.concurrency)
+        # Небольшой всплеск, чтобы за любую секунду не выйти за лимит Telegram
+        self._global = TokenBucket(self.global_rate, max(1.0, self.global_rate / 4), time.monotonic())
+        self._runner = asyncio.create_task(self._run())
+
+    @property
+    def running(self) -> bool:
+        return self._runner is not None
+
+    async def stop(self, timeout: float = Config.WEBHOOK_SHUTDOWN_TIMEOUT) -> None:
+        """Досылка накопленного (не дольше timeout) и остановка"""
+        if self._runner is None:
+            return
+
+        deadline = time.monotonic() + timeout
+        while (self._size or self._tasks) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+        self._runner.cancel()
+        self._runner = None
+        if self._size:
+            logger.warning(f"Очередь отправки остановлена, не отправлено: {self._size}")
+
+    def call(self, chat_id: int, call: Callable[[], Awaitable], priority: int = BROADCAST,
+             wait: bool = False) -> Optional[asyncio.Future]:
+        """Постановка вызова в очередь; при wait=True возвращается future с результатом"""
+        if not self.running:
+            raise RuntimeError("Очередь отправки не запущена")
+
+        if self._size >= self.max_size and priority != INTERACTIVE:
+            self.dropped += 1
+            return None
+
+        future = asyncio.get_running_loop().create_future() if wait else None
+        self._push(_Item(chat_id, call, priority, future))
+        return future
+
+    def send_message(self, chat_id: int, text: str, priority: int = BROADCAST, **kwargs) -> bool:
+        """Сообщение в очередь без ожидания отправки; False — очередь переполнена"""
+        if priority == INTERACTIVE or self._size < self.max_size:
+            self.call(chat_id, lambda: self._bot.send_message(chat_id, text, **kwargs), priority)
+            return True
+
+        self.dropped += 1
+        return False
+
+    def _push(self, item: _Item, front: bool = False) -> None:
+        lane = self._lanes[item.priority]
+        queue = lane.get(item.chat_id)
+        if queue is None:
+            queue = lane[item.chat_id] = deque()
+        if front:
+            queue.appendleft(item)
+        else:
+            queue.append(item)
+        self._size += 1
+        self._wakeup.set()
+
+    def _next(self, now: float):
+        """Следующий вызов, который можно выполнить сейчас, или время ожидания"""
+        if now < self._paused_until:
+            return None, self._paused_until - now
+
+        global_wait = self._global.wait_time(now)
+        if global_wait > 0:
+            return None, global_wait
+
+        min_wait = None
+        for priority, lane in zip(PRIORITIES, self._lanes):
+            for chat_id, queue in lane.items():
+                # В одном чате — строго по одному вызову, чтобы сохранить порядок
+                if chat_id in self._busy:
+                    continue
+
+                bucket = self._buckets.get(chat_id)
+                if bucket is None:
+                    bucket = self._buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst, now)
+                chat_wait = bucket.wait_time(now)
+                # Ответы на действия пользователя лимит чата не ждут (их темп задаёт сам
+                # пользователь), но расходуют токены, отодвигая уведомления в тот же чат
+                if chat_wait > 0 and priority != INTERACTIVE:
+                    min_wait = chat_wait if min_wait is None else min(min_wait, chat_wait)
+                    continue
+
+                item = queue.popleft()
+                if queue:
+                    lane.move_to_end(chat_id)
+                else:
+                    del lane[chat_id]
+                self._size -= 1
+
+                if chat_wait == 0:
+                    bucket.consume()
+                self._global.consume()
+                return item, 0.0
+
+        return None, min_wait
+
+    async def _run(self) -> None:
+        while True:
+            now = time.monotonic()
+            self._collect_buckets(now)
+            item, wait = self._next(now)
+
+            if item is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._slots.acquire()
+            self._busy.add(item.chat_id)
+            task = asyncio.create_task(self._execute(item))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _execute(self, item: _Item) -> None:
+        _in_queue.set(True)
+        item.attempts += 1
+
+        try:
+            result = await item.call()
+        except TelegramRetryAfter as e:
+            # Флуд-контроль Telegram: пауза для всей очереди и повтор с начала очереди чата
+            self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+            if item.attempts <= Config.SEND_MAX_RETRIES:
+                self.retried += 1
+                self._push(item, front=True)
+            else:
+                self._fail(item, e)
+        except TelegramForbiddenError as e:
+            # Пользователь заблокировал бота — повторять бессмысленно
+            self._fail(item, e)
+        except Exception as e:
+            logger.error(f"Ошибка отправки в чат {item.chat_id}: {e}")
+            self._fail(item, e)
+        else:
+            latency = time.monotonic() - item.enqueued_at
+            self.sent += 1
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+            if item.future is not None and not item.future.done():
+                item.future.set_result(result)
+        finally:
+            self._busy.discard(item.chat_id)
+            self._slots.release()
+            self._wakeup.set()
+
+    def _fail(self, item: _Item, error: Exception) -> None:
+        self.failed += 1
+        if item.future is not None and not item.future.done():
+            item.future.set_exception(error)
+
+    def _collect_buckets(self, now: float) -> None:
+        """Вёдра простаивающих чатов не храним — память не растёт с числом получателей"""
+        if now - self._last_gc < 60:
+            return
+        self._last_gc = now
+
+        pending = {chat_id for lane in self._lanes for chat_id in lane} | self._busy
+        for chat_id in [c for c, b in self._buckets.items() if c not in pending and b.idle(now)]:
+            del self._buckets[chat_id]
+
+    def stats(self) -> dict:
+        return {
+            "depth": {priority: sum(len(q) for q in lane.values())
+                      for priority, lane in zip(PRIORITIES, self._lanes)},
+            "in_flight": len(self._tasks),
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "retried": self.retried,
+            "avg_latency_ms": round(self.latency_total / self.sent * 1000, 2) if self.sent else 0.0,
+            "max_latency_ms": round(self.latency_max * 1000, 2),
+            "paused": max(self._paused_until - time.monotonic(), 0.0),
+        }
+
+
+class SendQueueMiddleware(BaseRequestMiddleware):
+    """Все вызовы Bot API с chat_id идут через очередь с наивысшим приоритетом"""
+
+    def __init__(self, queue: SendQueue):
+        self.queue = queue
+
+    async def __call__(self, make_request, bot, method):
+        chat_id = getattr(method, "chat_id", None)
+
+        if _in_queue.get() or not self.queue.running or not isinstance(chat_id, int):
+            return await make_request(bot, method)
+
+        return await self.queue.call(chat_id, lambda: make_request(bot, method), INTERACTIVE, wait=True)
+
+
+# Единая очередь отправки на процесс; при воркерах общий лимит делится между процессами
+send_queue = SendQueue(
+    global_rate=Config.SEND_GLOBAL_RATE / (Config.WORKERS + 1 if Config.WORKERS > 1 else 1)
+)
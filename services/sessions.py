@@ -0,0 +1,109 @@
+import json
+import sys
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from config import Config
+
+
+class UserSession:
+    """Состояние пользователя: версия снимка и показанные ему SECID"""
+
+    __slots__ = ("version", "secids", "touched_at")
+
+    def __init__(self, version: int, secids: Tuple[str, ...]):
+        self.version = version
+        self.secids = secids
+        self.touched_at = time.monotonic()
+
+
+class SessionStore:
+    """Компактные сессии пользователей с вытеснением по LRU и TTL"""
+
+    def __init__(self, max_size: int = Config.SESSION_MAX_USERS, ttl: float = Config.SESSION_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._sessions: "OrderedDict[int, UserSession]" = OrderedDict()
+        self._kv = None
+        self.evicted = 0
+
+    def attach(self, kv) -> None:
+        """Дублирование сессий в общее хранилище (переживают рестарт и видны другим процессам)"""
+        self._kv = kv
+
+    def set(self, user_id: int, version: int, secids: Tuple[str, ...]) -> None:
+        """Запоминаем, какой список видел пользователь"""
+        self._sessions[user_id] = UserSession(version, secids)
+        self._sessions.move_to_end(user_id)
+        self._evict()
+
+        if self._kv is not None:
+            self._kv.set(f"session:{user_id}", json.dumps([version, secids]), ttl=self.ttl)
+
+    def get(self, user_id: int) -> Optional[UserSession]:
+        """Сессия пользователя или None, если её нет или она истекла"""
+        session = self._sessions.get(user_id)
+
+        if session is None:
+            return None
+
+        now = time.monotonic()
+        if now - session.touched_at > self.ttl:
+            del self._sessions[user_id]
+            self.evicted += 1
+            return None
+
+        session.touched_at = now
+        self._sessions.move_to_end(user_id)
+        return session
+
+    async def fetch(self, user_id: int) -> Optional[UserSession]:
+        """Сессия из памяти, а при промахе — из общего хранилища"""
+        session = self.get(user_id)
+
+        if session is not None or self._kv is None:
+            return session
+
+        raw = await self._kv.get(f"session:{user_id}")
+        if raw is None:
+            return None
+
+        version, secids = json.loads(raw)
+        self._sessions[user_id] = session = UserSession(version, tuple(secids))
+        self._evict()
+        return session
+
+    def _evict(self) -> None:
+        """Вытеснение самых давних сессий: сверх лимита или с истёкшим TTL"""
+        now = time.monotonic()
+
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if len(self._sessions) <= self.max_size and now - oldest.touched_at <= self.ttl:
+                break
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def memory_usage(self) -> int:
+        """Оценка занимаемой памяти в байтах (кортежи SECID общие и считаются один раз)"""
+        total = sys.getsizeof(self._sessions)
+        seen = set()
+
+        for user_id, session in self._sessions.items():
+            total += sys.getsizeof(user_id) + sys.getsizeof(session)
+            if id(session.secids) not in seen:
+                seen.add(id(session.secids))
+                total += sys.getsizeof(session.secids)
+
+        return total
+
+    def stats(self) -> dict:
+        return {"users": len(self._sessions), "evicted": self.evicted, "memory_bytes": self.memory_usage()}
+
+
+# Единое хранилище сессий на процесс
+session_store = SessionStore()
@@ -0,0 +1,250 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+import pandas as pd
+
+from config import Config
+from services.analytics import bond_analytics
+from services.moex_service import MoexService
+
+
+logger = logging.getLogger(__name__)
+
+
+class BondSnapshot:
+    """Снимок рынка облигаций одного режима торгов"""
+
+    def __init__(self, board: str, version: int, df: pd.DataFrame, created_at: Optional[float] = None):
+        self.board = board
+        self.version = version
+        self.df = df
+        self.created_at = time.monotonic() if created_at is None else created_at
+
+    @property
+    def age(self) -> float:
+        """Возраст снимка в секундах"""
+        return time.monotonic() - self.created_at
+
+    @property
+    def empty(self) -> bool:
+        return self.df.empty
+
+
+class SnapshotCache:
+    """Общий для процесса кэш снимков рынка с TTL и объединением запросов"""
+
+    def __init__(self, ttl: float = Config.SNAPSHOT_TTL, service: Optional[MoexService] = None,
+                 reference_ttl: float = Config.REFERENCE_TTL):
+        self.ttl = ttl
+        self.reference_ttl = reference_ttl
+        self._service = service or MoexService()
+        self._snapshots: Dict[str, BondSnapshot] = {}
+
+        # Справочник режима торгов и момент его загрузки (обновляется редко)
+        self._reference: Dict[str, pd.DataFrame] = {}
+        self._reference_at: Dict[str, float] = {}
+
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._version = 0
+
+        # При фоновом обновлении отдаём последний снимок без ожидания биржи
+        self.serve_stale = False
+        # Снимки приходят только через seed (воркер супервизора) — биржа не запрашивается
+        self.offline = False
+
+        # Сводный снимок по всем режимам торгов и версии его составляющих
+        self._universe: Optional[BondSnapshot] = None
+        self._universe_key: Optional[tuple] = None
+        # Кольцо предыдущих сводных снимков — для «что нового» и сравнения версий
+        self._history: Deque[BondSnapshot] = deque(maxlen=Config.SNAPSHOT_HISTORY)
+
+        # Подписчики на новую версию сводного снимка и их фоновые задачи
+        self._listeners: List[Callable[[BondSnapshot], Awaitable]] = []
+        self._background: Set[asyncio.Task] = set()
+
+        # Счётчики для мониторинга
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def boards(self) -> List[str]:
+        """Режимы торгов, по которым уже есть снимки"""
+        return list(self._snapshots)
+
+    def seed(self, board: str, df: pd.DataFrame, saved_at: float) -> BondSnapshot:
+        """Подстановка ранее сохранённого снимка (возраст считается от момента сохранения)"""
+        created_at = time.monotonic() - max(time.time() - saved_at, 0)
+
+        self._version += 1
+        snapshot = BondSnapshot(board, self._version, df, created_at)
+        self._snapshots[board] = snapshot
+
+        # Справочник из сохранённого снимка тоже считаем устаревающим с момента сохранения
+        market_columns = [c for c in self._service.MARKETDATA_COLUMNS if c in df.columns]
+        self._reference[board] = df.drop(columns=market_columns)
+        self._reference_at[board] = created_at
+        return snapshot
+
+    def peek(self, board: str = Config.BONDS_BOARD) -> Optional[BondSnapshot]:
+        """Текущий снимок без обращения к бирже"""
+        return self._snapshots.get(board)
+
+    async def get(self, board: str = Config.BONDS_BOARD, force: bool = False) -> BondSnapshot:
+        """Актуальный снимок режима торгов; при устаревании — одно обновление на всех"""
+        snapshot = self._snapshots.get(board)
+
+        if snapshot is not None and not force and (snapshot.age < self.ttl or self.serve_stale):
+            self.hits += 1
+            return snapshot
+
+        if self.offline:
+            return snapshot if snapshot is not None else BondSnapshot(board, 0, pd.DataFrame())
+
+        self.misses += 1
+        return await self.refresh(board)
+
+    async def get_universe(self, boards: tuple = Config.BONDS_BOARDS, force: bool = False) -> BondSnapshot:
+        """Сводный снимок по нескольким режимам торгов (загружаются параллельно)"""
+        snapshots = await asyncio.gather(*(self.get(board, force) for board in boards))
+        return self._combine(snapshots)
+
+    def add_listener(self, callback: Callable[[BondSnapshot], Awaitable]) -> None:
+        """Подписка на публикацию новой версии сводного снимка"""
+        self._listeners.append(callback)
+
+    def _notify(self, snapshot: BondSnapshot) -> None:
+        """Запуск подписчиков в фоне, чтобы не задерживать ответ пользователю"""
+        for callback in self._listeners:
+            task = asyncio.create_task(self._run_listener(callback, snapshot))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+    @staticmethod
+    async def _run_listener(callback: Callable, snapshot: BondSnapshot) -> None:
+        try:
+            await callback(snapshot)
+        except Exception as e:
+            logger.error(f"Ошибка обработчика снимка {getattr(callback, '__name__', callback)}: {e}")
+
+    def peek_universe(self) -> Optional[BondSnapshot]:
+        """Последний сводный снимок без обращения к бирже"""
+        return self._universe
+
+    def universe_at(self, version: int) -> Optional[BondSnapshot]:
+        """Сводный снимок данной версии: текущий или из кольца предыдущих"""
+        if self._universe is not None and self._universe.version == version:
+            return self._universe
+        for snapshot in self._history:
+            if snapshot.version == version:
+                return snapshot
+        return None
+
+    def oldest_universe(self) -> Optional[BondSnapshot]:
+        """Самый старый сохранённый сводный снимок"""
+        return self._history[0] if self._history else self._universe
+
+    def _combine(self, snapshots: list) -> BondSnapshot:
+        """Сборка сводного снимка; пересобирается только при смене версий"""
+        key = tuple((s.board, s.version) for s in snapshots)
+
+        if self._universe is not None and key == self._universe_key:
+            return self._universe
+
+        df = MoexService.combine_boards([s.df for s in snapshots])
+
+        if df.empty:
+            return self._universe if self._universe is not None else BondSnapshot("ALL", 0, df)
+
+        # YTM, дюрация и выпуклость — для всех бумаг одним векторным проходом
+        df = bond_analytics.enrich(df)
+
+        if self._universe is not None:
+            self._history.append(self._universe)
+
+        self._version += 1
+        self._universe = BondSnapshot("ALL", self._version, df)
+        self._universe_key = key
+        self._notify(self._universe)
+        return self._universe
+
+    async def refresh(self, board: str = Config.BONDS_BOARD) -> BondSnapshot:
+        """Обновление снимка; параллельные вызовы ждут один и тот же запрос"""
+        task = self._inflight.get(board)
+
+        if task is None:
+            task = asyncio.create_task(self._load(board))
+            self._inflight[board] = task
+            task.add_done_callback(lambda _: self._inflight.pop(board, None))
+        else:
+            self.coalesced += 1
+
+        # shield: отмена одного ожидающего не прерывает загрузку для остальных
+        return await asyncio.shield(task)
+
+    async def _load(self, board: str) -> BondSnapshot:
+        """Загрузка данных с биржи и публикация новой версии снимка"""
+        previous = self._snapshots.get(board)
+
+        try:
+            if self._reference_expired(board):
+                # Справочник устарел — берём оба уровня параллельно
+                reference, marketdata = await asyncio.gather(
+                    self._service.get_reference(board), self._service.get_marketdata(board)
+                )
+                if not reference.empty:
+                    self._reference[board] = reference
+                    self._reference_at[board] = time.monotonic()
+            else:
+                # Обычный цикл: только лёгкие рыночные данные
+                marketdata = await self._service.get_marketdata(board)
+        except Exception as e:
+            logger.error(f"Ошибка обновления снимка {board}: {e}")
+            marketdata = pd.DataFrame()
+
+        reference = self._reference.get(board)
+
+        if reference is None or (marketdata.empty and previous is not None):
+            self.errors += 1
+            # Отдаём предыдущий снимок, если он есть
+            return previous if previous is not None else BondSnapshot(board, 0, pd.DataFrame())
+
+        df = self._service.merge_marketdata(reference, marketdata)
+
+        self._version += 1
+        snapshot = BondSnapshot(board, self._version, df)
+        self._snapshots[board] = snapshot
+        return snapshot
+
+    def _reference_expired(self, board: str) -> bool:
+        loaded_at = self._reference_at.get(board)
+        return loaded_at is None or time.monotonic() - loaded_at >= self.reference_ttl
+
+    def stats(self) -> dict:
+        """Счётчики попаданий/промахов и возраст снимков"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "boards": {
+                board: {
+                    "version": s.version,
+                    "age": round(s.age, 1),
+                    "reference_age": (
+                        round(time.monotonic() - self._reference_at[board], 1)
+                        if board in self._reference_at else None
+                    ),
+                    "rows": len(s.df)
+                }
+                for board, s in self._snapshots.items()
+            },
+            "universe_version": self._universe.version if self._universe else 0
+        }
+
+
+# Единый кэш на процесс
+snapshot_cache = SnapshotCache()
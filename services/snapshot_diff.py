@@ -0,0 +1,127 @@
+import hashlib
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from aiogram.types import InlineKeyboardMarkup
+
+from config import Config
+from services.snapshot import BondSnapshot
+
+
+# Поля, изменение которых считается изменением бумаги
+DIFF_COLUMNS = ("LAST", "YIELD", "COUPONPERCENT", "MATDATE")
+
+
+class SnapshotDiff:
+    """Разница двух версий снимка: новые, исчезнувшие и изменившиеся SECID"""
+
+    def __init__(self, old_version: int, new_version: int, added: pd.DataFrame,
+                 removed: pd.DataFrame, changed: pd.DataFrame):
+        self.old_version = old_version
+        self.new_version = new_version
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+
+    @property
+    def empty(self) -> bool:
+        return self.added.empty and self.removed.empty and self.changed.empty
+
+
+def diff_frames(old: pd.DataFrame, new: pd.DataFrame,
+                columns: Tuple[str, ...] = DIFF_COLUMNS) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Сравнение таблиц, выровненных по SECID, без построчного обхода"""
+    old = old.drop_duplicates(subset=['SECID'])
+    new = new.drop_duplicates(subset=['SECID'])
+
+    old_index = pd.Index(old['SECID'])
+    positions = old_index.get_indexer(new['SECID'])
+    present = positions >= 0
+
+    added = new[~present]
+    removed = old[~old_index.isin(new['SECID'])]
+
+    new_rows = np.flatnonzero(present)
+    old_rows = positions[new_rows]
+    changed = np.zeros(len(new_rows), dtype=bool)
+    values = {}
+
+    for column in columns:
+        if column not in old.columns or column not in new.columns:
+            continue
+        before = old[column].to_numpy()[old_rows]
+        after = new[column].to_numpy()[new_rows]
+        # Пустое значение в обеих версиях изменением не считается
+        differs = (before != after) & ~(pd.isna(before) & pd.isna(after))
+        changed |= differs
+        values[f"{column}_OLD"] = before
+        values[column] = after
+
+    frame = pd.DataFrame(values)
+    frame.insert(0, 'SECID', new['SECID'].to_numpy()[new_rows])
+    if 'SHORTNAME' in new.columns:
+        frame.insert(1, 'SHORTNAME', new['SHORTNAME'].to_numpy()[new_rows])
+
+    return added.reset_index(drop=True), removed.reset_index(drop=True), frame[changed].reset_index(drop=True)
+
+
+class SnapshotDiffer:
+    """Кэш разниц между версиями снимка (одна пара версий считается один раз)"""
+
+    def __init__(self, cache_size: int = Config.SNAPSHOT_HISTORY):
+        self.cache_size = cache_size
+        self._diffs: "OrderedDict[tuple, SnapshotDiff]" = OrderedDict()
+
+    def diff(self, old: BondSnapshot, new: BondSnapshot) -> SnapshotDiff:
+        key = (old.version, new.version)
+        diff = self._diffs.get(key)
+
+        if diff is None:
+            diff = SnapshotDiff(old.version, new.version, *diff_frames(old.df, new.df))
+            self._diffs[key] = diff
+            while len(self._diffs) > self.cache_size:
+                self._diffs.popitem(last=False)
+        else:
+            self._diffs.move_to_end(key)
+        return diff
+
+
+def content_hash(text: str, keyboard: Optional[InlineKeyboardMarkup] = None) -> str:
+    """Отпечаток текста и клавиатуры сообщения"""
+    digest = hashlib.blake2b(text.encode(), digest_size=16)
+    if keyboard is not None:
+        digest.update(keyboard.model_dump_json().encode())
+    return digest.hexdigest()
+
+
+class RenderedMessages:
+    """Отпечатки последнего содержимого сообщений — чтобы не редактировать их без изменений"""
+
+    def __init__(self, max_size: int = Config.RENDERED_CACHE_SIZE):
+        self.max_size = max_size
+        self._digests: "OrderedDict[Tuple[int, int], str]" = OrderedDict()
+        self.skipped = 0
+
+    def remember(self, chat_id: int, message_id: int, digest: str) -> None:
+        self._digests[(chat_id, message_id)] = digest
+        self._digests.move_to_end((chat_id, message_id))
+        while len(self._digests) > self.max_size:
+            self._digests.popitem(last=False)
+
+    def forget(self, chat_id: int, message_id: int) -> None:
+        self._digests.pop((chat_id, message_id), None)
+
+    def changed(self, chat_id: int, message_id: int, digest: str) -> bool:
+        """True — содержимое новое (и запомнено), False — правка не нужна"""
+        if self._digests.get((chat_id, message_id)) == digest:
+            self.skipped += 1
+            return False
+        self.remember(chat_id, message_id, digest)
+        return True
+
+
+# Единые кэш разниц и отпечатки сообщений на процесс
+snapshot_differ = SnapshotDiffer()
+rendered_messages = RenderedMessages()
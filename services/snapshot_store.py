@@ -0,0 +1,146 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+from services.snapshot import BondSnapshot, SnapshotCache
+
+
+logger = logging.getLogger(__name__)
+
+# Версия формата на диске: при несовпадении снимок игнорируется
+SCHEMA_VERSION = 1
+
+
+class SnapshotStore:
+    """Снимки рынка на диске: по файлу .npy на колонку (читаются через mmap) и meta.json"""
+
+    def __init__(self, path: str = Config.SNAPSHOT_DIR, keep: int = 2):
+        self.path = path
+        self.keep = keep
+
+    def save(self, snapshot: BondSnapshot) -> str:
+        """Атомарная запись снимка: новая папка версии + переключение указателя current.json"""
+        board_dir = os.path.join(self.path, snapshot.board)
+        saved_at = time.time()
+        name = f"v{time.time_ns()}"
+        tmp_dir = os.path.join(board_dir, name + ".tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        columns = []
+        for column in snapshot.df.columns:
+            columns.append(self._save_column(tmp_dir, column, snapshot.df[column]))
+
+        meta = {
+            "schema": SCHEMA_VERSION,
+            "board": snapshot.board,
+            "saved_at": saved_at,
+            "rows": len(snapshot.df),
+            "columns": columns
+        }
+        with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        os.replace(tmp_dir, os.path.join(board_dir, name))
+        self._write_pointer(board_dir, name)
+        self._prune(board_dir, name)
+        return os.path.join(board_dir, name)
+
+    def load(self, board: str, mmap: bool = True) -> Optional[Tuple[pd.DataFrame, float]]:
+        """Чтение последнего снимка режима торгов: (таблица, время сохранения)"""
+        board_dir = os.path.join(self.path, board)
+
+        try:
+            with open(os.path.join(board_dir, "current.json"), encoding="utf-8") as f:
+                version_dir = os.path.join(board_dir, json.load(f)["current"])
+            with open(os.path.join(version_dir, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (FileNotFoundError, KeyError, ValueError):
+            return None
+
+        if meta.get("schema") != SCHEMA_VERSION:
+            logger.warning(f"Снимок {board} на диске в старом формате — пропускаем")
+            return None
+
+        mmap_mode = "r" if mmap else None
+        data = {}
+        for column in meta["columns"]:
+            data[column["name"]] = self._load_column(version_dir, column, mmap_mode)
+
+        # copy=False: числовые колонки остаются отображёнными в память, а не копируются в блоки
+        return pd.DataFrame(data, copy=False), meta["saved_at"]
+
+    async def persist(self, cache: SnapshotCache) -> None:
+        """Сохранение всех снимков кэша в фоновом потоке"""
+        for board in list(cache.boards()):
+            snapshot = cache.peek(board)
+            if snapshot is not None and not snapshot.empty:
+                await asyncio.to_thread(self.save, snapshot)
+
+    async def restore(self, cache: SnapshotCache, boards: tuple = Config.BONDS_BOARDS) -> int:
+        """Тёплый старт: загрузка сохранённых снимков в кэш без обращения к бирже"""
+        restored = 0
+
+        for board in boards:
+            loaded = await asyncio.to_thread(self.load, board)
+            if loaded is not None:
+                df, saved_at = loaded
+                cache.seed(board, df, saved_at)
+                restored += 1
+
+        if restored:
+            logger.info(f"Тёплый старт: восстановлено снимков — {restored}")
+        return restored
+
+    @staticmethod
+    def _save_column(directory: str, name: str, series: pd.Series) -> dict:
+        """Колонка в .npy; строки — в Unicode фиксированной ширины с маской пропусков"""
+        path = os.path.join(directory, f"{name}.npy")
+
+        if pd.api.types.is_datetime64_dtype(series) or pd.api.types.is_numeric_dtype(series):
+            np.save(path, series.to_numpy())
+            return {"name": name, "kind": "array"}
+
+        nulls = series.isna().to_numpy()
+        np.save(path, series.fillna("").astype(str).to_numpy(dtype=str))
+        if nulls.any():
+            np.save(os.path.join(directory, f"{name}.null.npy"), nulls)
+        return {"name": name, "kind": "text", "nulls": bool(nulls.any())}
+
+    @staticmethod
+    def _load_column(directory: str, column: dict, mmap_mode: Optional[str]):
+        values = np.load(os.path.join(directory, f"{column['name']}.npy"), mmap_mode=mmap_mode)
+
+        if column["kind"] != "text":
+            # Обычный ndarray поверх отображения: без копии, но и без подкласса memmap в таблице
+            return values.view(np.ndarray)
+
+        values = values.astype(object)
+        if column.get("nulls"):
+            values[np.load(os.path.join(directory, f"{column['name']}.null.npy"))] = None
+        return values
+
+    @staticmethod
+    def _write_pointer(board_dir: str, name: str) -> None:
+        pointer = os.path.join(board_dir, "current.json")
+        with open(pointer + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"current": name}, f)
+        os.replace(pointer + ".tmp", pointer)
+
+    def _prune(self, board_dir: str, current: str) -> None:
+        """Удаление старых версий (открытые mmap продолжают работать)"""
+        versions = sorted(d for d in os.listdir(board_dir) if d.startswith("v") and not d.endswith(".tmp"))
+        for old in versions[:-self.keep]:
+            if old != current:
+                shutil.rmtree(os.path.join(board_dir, old), ignore_errors=True)
+
+
+# Единое хранилище на процесс
+snapshot_store = SnapshotStore()
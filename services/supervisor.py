@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import multiprocessing
+import queue
+import time
+from typing import Callable, Dict, List, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from config import Config
+
+
+logger = logging.getLogger(__name__)
+
+
+class UserSequencer:
+    """Обновления одного пользователя выполняются строго по очереди, разных — параллельно"""
+
+    def __init__(self):
+        self._tails: Dict[int, asyncio.Task] = {}
+
+    def submit(self, user_id: int, coro) -> asyncio.Task:
+        previous = self._tails.get(user_id)
+        task = asyncio.create_task(self._run(previous, coro))
+        self._tails[user_id] = task
+        task.add_done_callback(lambda t: self._release(user_id, t))
+        return task
+
+    @staticmethod
+    async def _run(previous: Optional[asyncio.Task], coro) -> None:
+        if previous is not None:
+            await asyncio.wait([previous])
+        await coro
+
+    def _release(self, user_id: int, task: asyncio.Task) -> None:
+        if self._tails.get(user_id) is task:
+            del self._tails[user_id]
+
+    async def drain(self) -> None:
+        if self._tails:
+            await asyncio.wait(list(self._tails.values()))
+
+    def __len__(self) -> int:
+        return len(self._tails)
+
+
+class WorkerStats:
+    """Очередь и задержки одного воркера (глазами супервизора)"""
+
+    __slots__ = ("sent", "handled", "failed", "wait_total", "handle_total", "handle_max")
+
+    def __init__(self):
+        self.sent = 0
+        self.handled = 0
+        self.failed = 0
+        self.wait_total = 0.0
+        self.handle_total = 0.0
+        self.handle_max = 0.0
+
+    def as_dict(self) -> dict:
+        done = self.handled + self.failed
+        return {
+            "depth": self.sent - done,
+            "handled": self.handled,
+            "failed": self.failed,
+            "avg_wait_ms": round(self.wait_total / done * 1000, 2) if done else 0.0,
+            "avg_handle_ms": round(self.handle_total / done * 1000, 2) if done else 0.0,
+            "max_handle_ms": round(self.handle_max * 1000, 2),
+        }
+
+
+def drain_queue(source, limit: int = 1000) -> list:
+    """Блокирующее ожидание первого элемента и всё, что уже накопилось, одной пачкой"""
+    items = [source.get()]
+    while len(items) < limit and items[-1] is not None:
+        try:
+            items.append(source.get_nowait())
+        except queue.Empty:
+            break
+    return items
+
+
+def user_key(update: Update) -> int:
+    """Ключ шардирования: пользователь, а для событий без него — чат"""
+    event = update.event
+    user = getattr(event, "from_user", None)
+    if user is not None:
+        return user.id
+
+    chat = getattr(event, "chat", None) or getattr(getattr(event, "message", None), "chat", None)
+    return chat.id if chat is not None else 0
+
+
+class Supervisor:
+    """Приём обновлений в одном процессе и раздача их N воркерам по user_id"""
+
+    def __init__(self, worker_target: Callable, workers: int = Config.WORKERS,
+                 queue_size: int = Config.WORKER_QUEUE_SIZE):
+        self.worker_target = worker_target
+        self.workers = workers
+        self.queue_size = queue_size
+        self._context = multiprocessing.get_context("spawn")
+        self._inboxes: List = []
+        self._processes: List = []
+        self._outbox = None
+        self._stats = [WorkerStats() for _ in range(workers)]
+        self._collector: Optional[asyncio.Task] = None
+        self._reporter: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._outbox = self._context.Queue()
+
+        for index in range(self.workers):
+            inbox = self._context.Queue(maxsize=self.queue_size)
+            process = self._context.Process(
+                target=self.worker_target, args=(index, inbox, self._outbox),
+                name=f"bot-worker-{index}", daemon=True
+            )
+            process.start()
+            self._inboxes.append(inbox)
+            self._processes.append(process)
+
+        self._collector = asyncio.create_task(self._collect())
+        self._reporter = asyncio.create_task(self._report())
+        logger.info(f"Запущено воркеров: {self.workers}")
+
+    async def dispatch(self, update: Update) -> None:
+        """Отправка обновления воркеру его пользователя (порядок внутри пользователя сохраняется)"""
+        user_id = user_key(update)
+        index = user_id % self.workers
+        item = ("update", user_id, update.model_dump(mode="json", exclude_none=True), time.time())
+
+        self._stats[index].sent += 1
+        try:
+            self._inboxes[index].put_nowait(item)
+        except queue.Full:
+            # Воркер не успевает — ждём место, притормаживая приём
+            await asyncio.to_thread(self._inboxes[index].put, item)
+
+    def broadcast_snapshot(self) -> None:
+        """Сигнал воркерам перечитать снимок рынка с диска"""
+        for inbox in self._inboxes:
+            try:
+                inbox.put_nowait(("snapshot",))
+            except queue.Full:
+                pass
+
+    async def poll(self, bot: Bot, dp: Dispatcher) -> None:
+        """Long polling в супервизоре; обработка — в воркерах"""
+        offset = None
+        allowed_updates = dp.resolve_used_update_types()
+
+        while True:
+            try:
+                updates = await bot.get_updates(offset=offset, timeout=10, allowed_updates=allowed_updates)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка получения обновлений: {e}")
+                await asyncio.sleep(1)
+                continue
+
+            for update in updates:
+                offset = update.update_id + 1
+                await self.dispatch(update)
+
+    async def _collect(self) -> None:
+        """Отчёты воркеров об обработанных обновлениях"""
+        while True:
+            for report in await asyncio.to_thread(drain_queue, self._outbox):
+                if report is None:
+                    return
+                self._account(*report)
+
+    def _account(self, index: int, ok: bool, wait: float, handle: float) -> None:
+        stats = self._stats[index]
+        if ok:
+            stats.handled += 1
+        else:
+            stats.failed += 1
+        stats.wait_total += wait
+        stats.handle_total += handle
+        stats.handle_max = max(stats.handle_max, handle)
+
+    async def _report(self) -> None:
+        while True:
+            await asyncio.sleep(Config.SUPERVISOR_STATS_INTERVAL)
+            logger.info(f"Воркеры: {self.stats()}")
+
+    def stats(self) -> dict:
+        return {index: stats.as_dict() for index, stats in enumerate(self._stats)}
+
+    async def stop(self, timeout: float = Config.WEBHOOK_SHUTDOWN_TIMEOUT) -> None:
+        for inbox in self._inboxes:
+            await asyncio.to_thread(inbox.put, None)
+
+        for process in self._processes:
+            await asyncio.to_thread(process.join, timeout)
+            if process.is_alive():
+                process.terminate()
+
+        # Сборщик отчётов дочитывает очередь до маркера и завершается сам
+        self._outbox.put(None)
+        if self._collector is not None:
+            await self._collector
+        if self._reporter is not None:
+            self._reporter.cancel()
+
+        logger.info(f"Воркеры остановлены: {self.stats()}")
+
+
+async def serve_worker(index: int, inbox, outbox, dp: Dispatcher, bot: Bot,
+                       on_snapshot: Callable) -> None:
+    """Цикл воркера: обновления из очереди супервизора в диспетчер aiogram"""
+    sequencer = UserSequencer()
+    workflow_data = {"dispatcher": dp, "bots": [bot], **dp.workflow_data}
+    await dp.emit_startup(bot=bot, **workflow_data)
+
+    async def handle(data: dict, enqueued_at: float) -> None:
+        started = time.time()
+        ok = True
+        try:
+            await dp.feed_raw_update(bot, data)
+        except Exception as e:
+            ok = False
+            logger.error(f"Воркер {index}: ошибка обработки обновления: {e}")
+        outbox.put((index, ok, started - enqueued_at, time.time() - started))
+
+    try:
+        running = True
+        while running:
+            for item in await asyncio.to_thread(drain_queue, inbox):
+                if item is None:
+                    running = False
+                elif item[0] == "snapshot":
+                    await on_snapshot()
+                else:
+                    _kind, user_id, data, enqueued_at = item
+                    sequencer.submit(user_id, handle(data, enqueued_at))
+    finally:
+        await sequencer.drain()
+        await dp.emit_shutdown(bot=bot, **workflow_data)
+        await bot.session.close()
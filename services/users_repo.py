@@ -0,0 +1,43 @@
+from typing import Optional, Tuple
+
+from config import Config
+from services.async_db import AsyncDatabase
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    telegram_id INTEGER UNIQUE,
+    name TEXT,
+    category1 TEXT,
+    category2 TEXT,
+    category3 TEXT,
+    expenses1 REAL,
+    expenses2 REAL,
+    expenses3 REAL
+    )
+'''
+
+
+class UserRepository:
+    """Пользователи финансового бота"""
+
+    def __init__(self, db: AsyncDatabase):
+        self.db = db
+        self.db.add_schema(SCHEMA)
+
+    async def register(self, telegram_id: int, name: str) -> bool:
+        """Регистрация одной записью; False — пользователь уже есть"""
+        inserted = await self.db.execute(
+            'INSERT OR IGNORE INTO users (telegram_id, name) VALUES (?, ?)',
+            (telegram_id, name)
+        )
+        return inserted > 0
+
+    async def get(self, telegram_id: int) -> Optional[Tuple]:
+        return await self.db.fetchone('SELECT * FROM users WHERE telegram_id = ?', (telegram_id,))
+
+
+# Единая база финансового бота на процесс
+finance_db = AsyncDatabase(Config.FINANCE_DB_PATH)
+users_repo = UserRepository(finance_db)
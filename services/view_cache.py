@@ -0,0 +1,201 @@
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+from aiogram.types import InlineKeyboardMarkup
+
+from config import Config
+from keyboards.inline_kb import bonds_list_keyboard, paged_bonds_keyboard
+from services.coupons import coupon_store
+from services.moex_service import MoexService
+from services.screening import ScreenProfile, screener
+from services.snapshot_diff import content_hash
+from services.snapshot import BondSnapshot
+from utils.formatters import format_bonds_table, format_bond_details
+
+
+# Режимы сортировки постраничного списка
+SORT_MODES = {
+    "rating": "⭐ Рейтинг",
+    "yield": "📈 Доходность",
+    "maturity": "⏳ Погашение",
+    "size": "💼 Объём",
+}
+
+
+class BondsView:
+    """Готовый ответ на /bonds для одной версии снимка и набора параметров"""
+
+    def __init__(self, version: int, df: pd.DataFrame, title: Optional[str] = None,
+                 keyboard: Optional[InlineKeyboardMarkup] = None):
+        self.version = version
+        self.df = df
+        self.table: str = format_bonds_table(df, title) if title else format_bonds_table(df)
+        if keyboard is None and not df.empty:
+            keyboard = bonds_list_keyboard(df)
+        self.keyboard: Optional[InlineKeyboardMarkup] = keyboard
+
+        # Общий для всех сессий кортеж SECID этого списка
+        self.secids = tuple(df['SECID']) if not df.empty else ()
+        self._positions = {secid: pos for pos, secid in enumerate(self.secids)}
+        self._details: Dict[str, str] = {}
+        self._digest: Optional[str] = None
+
+    @property
+    def digest(self) -> str:
+        """Отпечаток таблицы с клавиатурой — для пропуска правок без изменений"""
+        if self._digest is None:
+            self._digest = content_hash(self.table, self.keyboard)
+        return self._digest
+
+    @property
+    def empty(self) -> bool:
+        return self.df.empty
+
+    def __contains__(self, secid: str) -> bool:
+        return secid in self._positions
+
+    def details(self, secid: str) -> Optional[str]:
+        """Карточка облигации (формируется один раз на версию снимка)"""
+        text = self._details.get(secid)
+
+        if text is None:
+            pos = self._positions.get(secid)
+            if pos is None:
+                return None
+            text = format_bond_details(self.df.iloc[pos], coupon_store.next_coupons(secid))
+            self._details[secid] = text
+
+        return text
+
+
+class ViewCache:
+    """Мемоизация отфильтрованных таблиц и готовых сообщений по версии снимка"""
+
+    def __init__(self):
+        self._moex = MoexService()
+        self._version: Optional[int] = None
+        self._views: Dict[tuple, BondsView] = {}
+        # Карточки бумаг, не попавших в списки текущей версии
+        self._details: Dict[str, Optional[str]] = {}
+        # Перестановки строк снимка по режимам сортировки
+        self._orders: Dict[str, np.ndarray] = {}
+        # Поколение графиков купонов, с которыми собраны карточки
+        self._coupons_generation: Optional[int] = None
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, snapshot: BondSnapshot, limit: int = Config.BONDS_LIMIT) -> BondsView:
+        """Представление для снимка; при смене версии старые записи сбрасываются"""
+        self._check_version(snapshot)
+
+        key = (limit,)
+        view = self._views.get(key)
+
+        if view is not None:
+            self.hits += 1
+            return view
+
+        self.misses += 1
+        df_filtered = self._moex.filter_reliable_bonds(snapshot.df, limit=limit)
+        view = BondsView(snapshot.version, df_filtered)
+        self._views[key] = view
+        return view
+
+    def order(self, snapshot: BondSnapshot, mode: str) -> np.ndarray:
+        """Позиции надёжных облигаций снимка в порядке режима (сортировка — раз на версию)"""
+        self._check_version(snapshot)
+        order = self._orders.get(mode)
+
+        if order is None:
+            df = snapshot.df
+            base = np.flatnonzero(screener.profile_mask(snapshot, ScreenProfile()))
+            filtered = df.iloc[base]
+            measure = self._moex.return_measure(filtered)
+
+            if mode == "rating":
+                # Тот же порядок, что у filter_reliable_bonds: рейтинг, затем доходность
+                permutation = np.lexsort((-measure, screener.rating_codes(snapshot)[base]))
+            elif mode == "yield":
+                permutation = np.argsort(-measure, kind="stable")
+            elif mode == "maturity":
+                permutation = np.argsort(filtered['MATDATE'].to_numpy(), kind="stable")
+            elif mode == "size":
+                permutation = np.argsort(-filtered['ISSUESIZE'].to_numpy(dtype=float), kind="stable")
+            else:
+                raise ValueError(f"Неизвестный режим сортировки: {mode}")
+
+            order = self._orders[mode] = base[permutation]
+
+        return order
+
+    def page(self, snapshot: BondSnapshot, mode: str = "rating", page: int = 0,
+             size: int = Config.BONDS_PAGE_SIZE) -> BondsView:
+        """Страница списка — срез готовой перестановки, любая страница стоит как первая"""
+        order = self.order(snapshot, mode)
+        pages = max(1, -(-len(order) // size))
+        page = min(max(page, 0), pages - 1)
+
+        key = ("page", mode, page, size)
+        view = self._views.get(key)
+
+        if view is not None:
+            self.hits += 1
+            return view
+
+        self.misses += 1
+        start = page * size
+        rows = order[start:start + size]
+
+        df_page = snapshot.df.iloc[rows].copy()
+        self._moex.add_derived_columns(df_page, screener.rating_codes(snapshot)[rows])
+        df_page.index = pd.RangeIndex(start, start + len(rows))
+
+        keyboard = paged_bonds_keyboard(df_page, mode, page, pages, SORT_MODES) if len(rows) else None
+        view = BondsView(snapshot.version, df_page, f"Надёжные облигации · {SORT_MODES[mode]}", keyboard)
+        self._views[key] = view
+        return view
+
+    def details(self, snapshot: BondSnapshot, secid: str, limit: int = Config.BONDS_LIMIT) -> Optional[str]:
+        """Карточка облигации по общему снимку (сначала ищем в готовом списке)"""
+        text = self.get(snapshot, limit).details(secid)
+
+        if text is not None:
+            return text
+
+        if secid not in self._details:
+            rows = snapshot.df[snapshot.df['SECID'] == secid]
+            if rows.empty:
+                self._details[secid] = None
+            else:
+                row = self._moex.add_derived_columns(rows.head(1).copy()).iloc[0]
+                self._details[secid] = format_bond_details(row, coupon_store.next_coupons(secid))
+
+        return self._details[secid]
+
+    async def prefetch_coupons(self, snapshot: BondSnapshot) -> None:
+        """Предзагрузка купонов для текущего топа (подписчик обновления снимка)"""
+        await coupon_store.prefetch(self.get(snapshot).secids)
+
+    def _check_version(self, snapshot: BondSnapshot) -> None:
+        """Сброс кэша при смене версии снимка"""
+        if snapshot.version != self._version:
+            self._views.clear()
+            self._details.clear()
+            self._orders.clear()
+            self._version = snapshot.version
+
+        # Карточки показывают ближайшие купоны — после загрузки новых графиков собираются заново
+        if coupon_store.generation != self._coupons_generation:
+            self._details.clear()
+            for view in self._views.values():
+                view._details.clear()
+            self._coupons_generation = coupon_store.generation
+
+    def stats(self) -> dict:
+        return {"version": self._version, "views": len(self._views), "hits": self.hits, "misses": self.misses}
+
+
+# Единый кэш представлений на процесс
+view_cache = ViewCache()
@@ -0,0 +1,149 @@
+import asyncio
+import hmac
+import logging
+import signal
+import time
+from typing import Optional, Set
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+
+from config import Config
+
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookServer:
+    """Приём обновлений через вебхук: быстрый ответ 200 и обработка в фоне"""
+
+    def __init__(self, dp: Dispatcher, bot: Bot,
+                 path: str = Config.WEBHOOK_PATH,
+                 secret: str = Config.WEBHOOK_SECRET,
+                 max_concurrency: int = Config.WEBHOOK_MAX_CONCURRENCY):
+        self.dp = dp
+        self.bot = bot
+        self.path = path
+        self.secret = secret
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+        self._closing = False
+
+        self.received = 0
+        self.rejected = 0
+        self.handled = 0
+        self.failed = 0
+        self.busy_time = 0.0
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.path, self.handle)
+        return app
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if self.secret and not hmac.compare_digest(
+            request.headers.get(SECRET_HEADER, ""), self.secret
+        ):
+            self.rejected += 1
+            return web.Response(status=401)
+
+        if self._closing:
+            # Telegram повторит доставку, когда поднимется другая реплика
+            return web.Response(status=503)
+
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": self.bot})
+        except Exception:
+            self.rejected += 1
+            return web.Response(status=400)
+
+        self.received += 1
+
+        # Ограничение параллельных обновлений: при насыщении ответ задерживается,
+        # и Telegram сам притормаживает доставку
+        await self._semaphore.acquire()
+        task = asyncio.create_task(self._process(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        return web.Response()
+
+    async def _process(self, update: Update) -> None:
+        started = time.perf_counter()
+        try:
+            await self.dp.feed_update(self.bot, update)
+            self.handled += 1
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Ошибка обработки обновления {update.update_id}: {e}")
+        finally:
+            self.busy_time += time.perf_counter() - started
+            self._semaphore.release()
+
+    async def drain(self, timeout: float = Config.WEBHOOK_SHUTDOWN_TIMEOUT) -> None:
+        """Перестаём принимать обновления и дожидаемся уже начатых"""
+        self._closing = True
+        if not self._tasks:
+            return
+
+        logger.info(f"Ожидание {len(self._tasks)} обновлений в обработке")
+        _done, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in pending:
+            task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "received": self.received,
+            "rejected": self.rejected,
+            "handled": self.handled,
+            "failed": self.failed,
+            "in_flight": len(self._tasks),
+            "avg_handle_ms": round(self.busy_time / self.handled * 1000, 2) if self.handled else 0.0,
+        }
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot, stop: Optional[asyncio.Event] = None) -> None:
+    """Запуск бота в режиме вебхука до SIGINT/SIGTERM"""
+    server = WebhookServer(dp, bot)
+    workflow_data = {"dispatcher": dp, "bots": [bot], **dp.workflow_data}
+
+    if not Config.WEBHOOK_SECRET:
+        logger.warning("WEBHOOK_SECRET не задан: запросы к вебхуку не проверяются")
+
+    await dp.emit_startup(bot=bot, **workflow_data)
+
+    runner = web.AppRunner(server.app())
+    await runner.setup()
+    site = web.TCPSite(runner, Config.WEBHOOK_HOST, Config.WEBHOOK_PORT)
+    await site.start()
+
+    # Реплики за балансировщиком регистрируют один и тот же адрес — это идемпотентно
+    if Config.WEBHOOK_URL:
+        await bot.set_webhook(
+            Config.WEBHOOK_URL + Config.WEBHOOK_PATH,
+            secret_token=Config.WEBHOOK_SECRET or None,
+            allowed_updates=dp.resolve_used_update_types(),
+            max_connections=min(Config.WEBHOOK_MAX_CONCURRENCY, 100),
+        )
+
+    logging.info(f"🌐 Вебхук слушает {Config.WEBHOOK_HOST}:{Config.WEBHOOK_PORT}{Config.WEBHOOK_PATH}")
+
+    stop = stop or asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    try:
+        await stop.wait()
+    finally:
+        await server.drain()
+        await runner.cleanup()
+        await dp.emit_shutdown(bot=bot, **workflow_data)
+        await bot.session.close()
+        logger.info(f"Вебхук остановлен: {server.stats()}")
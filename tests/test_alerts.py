@@ -0,0 +1,104 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from services.alerts import AlertStore
+
+
+def market(values: dict) -> pd.DataFrame:
+    return pd.DataFrame({"SECID": list(values), "YIELD": list(values.values()), "LAST": 100.0})
+
+
+def test_crossing_fires_once_and_rearms(tmp_path):
+    store = AlertStore(str(tmp_path / "alerts.db"))
+    store.load()
+    alert_id = store.add(1, "A", "yield", 1, 15.0)
+
+    assert store.evaluate(market({"A": 14.0}), now=1000) == {}
+    fired = store.evaluate(market({"A": 16.0}), now=1001)
+    assert [item["id"] for item in fired[1]] == [alert_id]
+
+    # Условие держится — повторного срабатывания нет
+    assert store.evaluate(market({"A": 17.0}), now=1002) == {}
+
+    # Уровень снова пересечён после возврата — срабатывание после паузы
+    store.evaluate(market({"A": 14.0}), now=1003)
+    assert store.evaluate(market({"A": 16.0}), now=1004) == {} and store.suppressed == 1
+    store.evaluate(market({"A": 14.0}), now=10**9)
+    assert store.evaluate(market({"A": 16.0}), now=10**9 + 1)[1][0]["id"] == alert_id
+
+    assert store.remove(1, alert_id)
+    assert store.evaluate(market({"A": 10.0}), now=2 * 10**9) == {}
+    assert store.evaluate(market({"A": 20.0}), now=2 * 10**9 + 1) == {}
+
+
+def test_state_survives_reload(tmp_path):
+    path = str(tmp_path / "alerts.db")
+    store = AlertStore(path)
+    store.load()
+    store.add(1, "A", "price", -1, 90.0)
+    store.evaluate(pd.DataFrame({"SECID": ["A"], "LAST": [85.0]}), now=1000)
+
+    # Новый экземпляр — как перезапуск процесса: подписка не взведена, повтора нет
+    restarted = AlertStore(path)
+    assert restarted.load() == 1
+    assert restarted.evaluate(pd.DataFrame({"SECID": ["A"], "LAST": [80.0]}), now=1001) == {}
+
+
+def test_concurrent_adds_removes_and_checks_keep_state_consistent(tmp_path):
+    store = AlertStore(str(tmp_path / "alerts.db"))
+    store.load()
+    df = market({f"S{i}": 5.0 for i in range(200)})
+    stop = threading.Event()
+    removed = []
+
+    def checker():
+        while not stop.is_set():
+            store._check(df)
+            store.load()
+
+    def adder(user_id: int):
+        for i in range(50):
+            alert_id = store.add(user_id, f"S{user_id * 50 + i}", "yield", 1, 10.0)
+            if i % 5 == 0 and store.remove(user_id, alert_id):
+                removed.append(alert_id)
+
+    threads = [threading.Thread(target=checker)] + [threading.Thread(target=adder, args=(u,)) for u in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads[1:]:
+        thread.join()
+    stop.set()
+    threads[0].join()
+
+    store.evaluate(df)
+    # Каждый SECID закодирован один раз, подписки не задвоены, удалённые не ожили
+    assert len(set(store._secids)) == len(store._secids)
+    assert all(store._secids[code] == secid for secid, code in store._codes.items())
+    assert len(np.unique(store.ids)) == len(store.ids)
+
+    # Номера удалённых подписок SQLite может выдать снова, поэтому сверяемся с базой
+    active = store.ids[store.active].tolist()
+    with store.db.read() as conn:
+        stored = [row[0] for row in conn.execute("SELECT id FROM alerts ORDER BY id")]
+    assert sorted(active) == stored and len(stored) == 4 * 50 - len(removed)
+
+    # Все живые подписки срабатывают ровно один раз
+    crossing = market({f"S{i}": 20.0 for i in range(200)})
+    fired = store.evaluate(crossing)
+    assert sorted(item["id"] for items in fired.values() for item in items) == stored
+
+
+def test_yield_falls_back_to_close_like_history(tmp_path):
+    store = AlertStore(str(tmp_path / "alerts.db"))
+    store.load()
+    store.add(1, "A", "yield", 1, 15.0)
+    store.add(1, "B", "yield", 1, 15.0)
+
+    before = pd.DataFrame({"SECID": ["A", "B"], "YIELD": [14.0, np.nan], "YIELDCLOSE": [20.0, 14.0]})
+    after = pd.DataFrame({"SECID": ["A", "B"], "YIELD": [16.0, np.nan], "YIELDCLOSE": [14.0, 16.0]})
+
+    assert store.evaluate(before, now=1000) == {}
+    fired = store.evaluate(after, now=1001)
+    assert sorted(item["secid"] for item in fired[1]) == ["A", "B"]
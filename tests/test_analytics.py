@@ -0,0 +1,116 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.analytics import BondAnalytics, risk_measures, solve_ytm, synthetic_cashflows
+
+
+TODAY = date(2026, 1, 15)
+
+
+class Schedules:
+    """Вместо CouponStore: заранее заданные графики купонов"""
+
+    def __init__(self, schedules: dict):
+        self.schedules = schedules
+
+    def loaded(self) -> dict:
+        return self.schedules
+
+    def peek(self, secid: str):
+        return self.schedules.get(secid)
+
+
+def solve(times, amounts, price, guess=0.05):
+    times = np.atleast_2d(np.asarray(times, dtype=float))
+    amounts = np.atleast_2d(np.asarray(amounts, dtype=float))
+    price = np.atleast_1d(np.asarray(price, dtype=float))
+    return solve_ytm(times, amounts, price, np.full(len(price), guess))
+
+
+def test_par_bond_yields_its_coupon():
+    # Годовой купон 10% по номиналу 100, цена — номинал
+    times = np.arange(1, 6)
+    amounts = np.array([10.0, 10.0, 10.0, 10.0, 110.0])
+    assert solve(times, amounts, 100.0)[0] == pytest.approx(0.10, abs=1e-10)
+
+
+def test_semiannual_par_bond_gives_effective_annual_yield():
+    times = np.arange(1, 11) / 2
+    amounts = np.full(10, 4.0)
+    amounts[-1] += 100.0
+    assert solve(times, amounts, 100.0, guess=0.5)[0] == pytest.approx(1.04 ** 2 - 1, abs=1e-10)
+
+
+def test_zero_coupon_yield_and_duration():
+    price = 100.0 / 1.12 ** 3
+    ytm = solve([[3.0]], [[100.0]], price)
+    duration, modified, convexity = risk_measures(np.array([[3.0]]), np.array([[100.0]]), np.array([price]), ytm)
+
+    assert ytm[0] == pytest.approx(0.12, abs=1e-10)
+    assert duration[0] == pytest.approx(3.0)
+    assert modified[0] == pytest.approx(3.0 / 1.12)
+    assert convexity[0] == pytest.approx(3 * 4 / 1.12 ** 2)
+
+
+def test_unpriceable_rows_are_nan():
+    times = np.array([[1.0], [1.0], [1.0]])
+    amounts = np.array([[110.0], [0.0], [110.0]])
+    ytm = solve_ytm(times, amounts, np.array([100.0, 100.0, np.nan]), np.array([np.nan, 0.1, 0.1]))
+    assert ytm[0] == pytest.approx(0.10) and np.isnan(ytm[1:]).all()
+
+
+def test_synthetic_flows_repay_face_at_maturity():
+    days, amounts = synthetic_cashflows(np.array([400.0]), np.array([182.0]), np.array([50.0]), np.array([1000.0]))
+    assert days[0].tolist()[:3] == [400.0, 218.0, 36.0]
+    assert amounts[0].tolist()[:3] == [1050.0, 50.0, 50.0]
+
+
+def bonds(matdate: str, secids=("A",)) -> pd.DataFrame:
+    return pd.DataFrame({
+        "SECID": list(secids),
+        "FACEVALUE": 1000.0,
+        "COUPONPERCENT": 10.0,
+        "COUPONPERIOD": 182.0,
+        "ACCRUEDINT": 0.0,
+        "LAST": 100.0,
+        "MATDATE": pd.Timestamp(matdate),
+    })
+
+
+def schedule(dates, values) -> pd.DataFrame:
+    return pd.DataFrame({"coupondate": pd.to_datetime(dates), "value": values, "facevalue": 1000.0})
+
+
+def expected_ytm(days, amounts, price=1000.0) -> float:
+    return solve(np.array(days) / 365, amounts, price)[0] * 100
+
+
+def test_schedule_replaces_synthetic_flows_and_repays_face():
+    flows = schedule(["2025-12-01", "2026-03-01", "2026-09-01", "2027-03-01"], [49.0, 50.0, None, 51.0])
+    analytics = BondAnalytics(Schedules({"A": flows}))
+    result = analytics.enrich(bonds("2027-03-01"), today=TODAY)
+
+    # Прошедший купон отброшен, необъявленный — по предыдущему, номинал — в дату погашения
+    days = [45, 229, 410, 410]
+    assert result['YTM'].iloc[0] == pytest.approx(expected_ytm(days, [50.0, 50.0, 51.0, 1000.0]))
+
+
+def test_face_is_repaid_when_schedule_ends_before_maturity():
+    flows = schedule(["2026-03-01", "2026-09-01"], [50.0, 50.0])
+    analytics = BondAnalytics(Schedules({"A": flows}))
+    result = analytics.enrich(bonds("2027-03-01"), today=TODAY)
+
+    assert result['YTM'].iloc[0] == pytest.approx(expected_ytm([45, 229, 410], [50.0, 50.0, 1000.0]))
+
+
+def test_schedules_apply_to_every_board_row_and_leave_others_synthetic():
+    flows = schedule(["2026-03-01", "2027-03-01"], [50.0, 50.0])
+    df = bonds("2027-03-01", secids=("A", "B", "A"))
+    with_schedule = BondAnalytics(Schedules({"A": flows})).enrich(df, today=TODAY)
+    synthetic = BondAnalytics(Schedules({})).enrich(df, today=TODAY)
+
+    expected = expected_ytm([45, 410, 410], [50.0, 50.0, 1000.0])
+    assert with_schedule['YTM'].tolist() == pytest.approx([expected, synthetic['YTM'].iloc[1], expected])
@@ -0,0 +1,71 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from services.async_db import AsyncDatabase
+from services.users_repo import UserRepository
+
+
+def test_concurrent_writes_are_group_committed(tmp_path):
+    async def scenario():
+        db = AsyncDatabase(str(tmp_path / "finance.db"), readers=2, batch_size=64)
+        repo = UserRepository(db)
+        await db.start()
+        try:
+            results = await asyncio.gather(*(repo.register(1000 + i, f"user{i}") for i in range(200)))
+            assert all(results)
+            assert db.statements == 200
+            assert db.commits < db.statements
+
+            # Повторная регистрация не создаёт запись
+            assert not await repo.register(1000, "again")
+            assert (await repo.get(1000))[2] == "user0"
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_readers_see_committed_rows(tmp_path):
+    async def scenario():
+        db = AsyncDatabase(str(tmp_path / "finance.db"), readers=3)
+        db.add_schema("CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY, value TEXT)")
+        await db.start()
+        try:
+            for i in range(10):
+                await db.execute("INSERT INTO items (id, value) VALUES (?, ?)", (i, str(i)))
+                # Запись подтверждена только после коммита — любой читатель пула её видит
+                counts = await asyncio.gather(*(db.fetchone("SELECT COUNT(*) FROM items") for _ in range(3)))
+                assert counts == [(i + 1,)] * 3
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_failed_statement_does_not_roll_back_its_batch(tmp_path):
+    async def scenario():
+        db = AsyncDatabase(str(tmp_path / "finance.db"))
+        db.add_schema("CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY)")
+        await db.start()
+        try:
+            results = await asyncio.gather(
+                db.execute("INSERT INTO items (id) VALUES (1)"),
+                db.execute("INSERT INTO items (id) VALUES (1)"),
+                db.execute("INSERT INTO items (id) VALUES (2)"),
+                return_exceptions=True
+            )
+            assert results[0] == 1 and results[2] == 1
+            assert isinstance(results[1], sqlite3.IntegrityError)
+            assert await db.fetchall("SELECT id FROM items ORDER BY id") == [(1,), (2,)]
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_writes_before_start_are_rejected(tmp_path):
+    db = AsyncDatabase(str(tmp_path / "finance.db"))
+    with pytest.raises(RuntimeError):
+        asyncio.run(db.execute("SELECT 1"))
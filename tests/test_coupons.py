@@ -0,0 +1,112 @@
+import asyncio
+from datetime import date, timedelta
+
+import pandas as pd
+
+from services.coupons import CouponStore
+
+
+def make_schedule(count: int = 6) -> pd.DataFrame:
+    today = pd.Timestamp(date.today())
+    return pd.DataFrame({
+        "coupondate": [today + pd.Timedelta(days=91 * (i - 2)) for i in range(count)],
+        "value": [40.0] * (count - 1) + [float("nan")],
+        "valueprc": 16.0,
+        "facevalue": 1000.0,
+    })
+
+
+class Fetcher:
+    """Подмена запроса к ISS: считает вызовы и параллельность"""
+
+    def __init__(self, empty=(), failing=()):
+        self.empty = set(empty)
+        self.failing = set(failing)
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, secid: str) -> pd.DataFrame:
+        self.calls.append(secid)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            self.in_flight -= 1
+
+        if secid in self.failing:
+            raise RuntimeError("ISS недоступна")
+        return pd.DataFrame() if secid in self.empty else make_schedule()
+
+
+def test_prefetch_loads_missing_schedules_with_bounded_concurrency():
+    async def scenario():
+        fetcher = Fetcher(empty={"EMPTY"})
+        store = CouponStore(fetcher, concurrency=3)
+        await store.get("CACHED")
+
+        secids = ["CACHED", "EMPTY"] + [f"RU{i}" for i in range(10)]
+        await store.prefetch(secids)
+
+        assert sorted(fetcher.calls) == sorted(["CACHED"] + secids[1:])
+        assert fetcher.max_in_flight <= 3
+        # Поколение растёт только на загруженных графиках; пустой ответ не кэшируется
+        assert store.generation == 11
+        assert store.peek("EMPTY") is None
+        assert all(store.peek(f"RU{i}") is not None for i in range(10))
+
+        await store.prefetch(secids)
+        assert fetcher.calls.count("EMPTY") == 2
+        assert store.generation == 11
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_gets_share_one_load():
+    async def scenario():
+        fetcher = Fetcher()
+        store = CouponStore(fetcher)
+
+        schedules = await asyncio.gather(*(store.get("RU1") for _ in range(5)))
+
+        assert fetcher.calls == ["RU1"]
+        assert all(s is schedules[0] for s in schedules)
+        assert store.generation == 1
+
+        await store.get("RU1")
+        assert store.hits == 1 and store.misses == 5
+
+    asyncio.run(scenario())
+
+
+def test_failed_load_keeps_previous_schedule():
+    async def scenario():
+        fetcher = Fetcher()
+        store = CouponStore(fetcher)
+        loaded = await store.get("RU1")
+
+        # На следующий день график устарел, а ISS недоступна
+        store._fetched_on["RU1"] = date.today() - timedelta(days=1)
+        fetcher.failing.add("RU1")
+
+        assert store.peek("RU1") is None
+        assert await store.get("RU1") is loaded
+        assert store.generation == 1
+        assert not (await store.get("RU2")).empty
+
+    asyncio.run(scenario())
+
+
+def test_next_coupons_lists_only_future_dates():
+    async def scenario():
+        store = CouponStore(Fetcher())
+        assert store.next_coupons("RU1") is None
+
+        await store.get("RU1")
+        coupons = store.next_coupons("RU1", count=2)
+
+        assert len(coupons) == 2
+        assert all(c["coupondate"] > pd.Timestamp(date.today()) for c in coupons)
+
+    asyncio.run(scenario())
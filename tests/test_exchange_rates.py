@@ -0,0 +1,160 @@
+import asyncio
+import time
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from services.exchange_rates import ExchangeRateService
+from services.http_client import http_client
+
+
+RATES = {"USD": 1.0, "RUB": 90.0, "EUR": 0.9}
+
+
+async def _serve(handler) -> TestServer:
+    app = web.Application()
+    app.router.add_get("/rates", handler)
+    server = TestServer(app)
+    await server.start_server()
+    return server
+
+
+def test_slow_source_does_not_stall_other_handlers():
+    async def scenario():
+        calls = 0
+
+        async def handler(request):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.3)
+            return web.json_response({"conversion_rates": RATES})
+
+        server = await _serve(handler)
+        service = ExchangeRateService(str(server.make_url("/rates")))
+
+        # «Другой обработчик»: отмечает, как часто ему удаётся выполниться
+        gaps = []
+
+        async def heartbeat():
+            last = time.monotonic()
+            while True:
+                await asyncio.sleep(0.01)
+                now = time.monotonic()
+                gaps.append(now - last)
+                last = now
+
+        ticker = asyncio.create_task(heartbeat())
+        try:
+            results = await asyncio.gather(*(service.get_rates() for _ in range(20)))
+        finally:
+            ticker.cancel()
+            await http_client.close()
+            await server.close()
+
+        assert all(r == RATES for r in results)
+        assert calls == 1
+        assert len(gaps) >= 10 and max(gaps) < 0.2
+
+    asyncio.run(scenario())
+
+
+def test_stale_rates_are_served_while_refreshing_in_background():
+    async def scenario():
+        rates = dict(RATES)
+        calls = 0
+
+        async def handler(request):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.3)
+            return web.json_response({"conversion_rates": rates})
+
+        server = await _serve(handler)
+        service = ExchangeRateService(str(server.make_url("/rates")), ttl=60)
+        try:
+            assert await service.get_rates() == RATES
+
+            rates["RUB"] = 95.0
+            service._fetched_at -= 120
+
+            # Устаревшие курсы отдаются без ожидания источника, обновление — одно на всех
+            started = time.monotonic()
+            results = await asyncio.gather(*(service.get_rates() for _ in range(10)))
+            assert time.monotonic() - started < 0.1
+            assert all(r["RUB"] == 90.0 for r in results)
+
+            await service._inflight
+            assert calls == 2 and not service.is_stale
+            assert await service.cross_rate("USD", "RUB") == 95.0
+        finally:
+            await http_client.close()
+            await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_failed_refresh_serves_stale_rates_and_backs_off():
+    async def scenario():
+        status = 200
+        calls = 0
+
+        async def handler(request):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.2)
+            if status != 200:
+                return web.Response(status=status)
+            return web.json_response({"conversion_rates": RATES})
+
+        server = await _serve(handler)
+        service = ExchangeRateService(str(server.make_url("/rates")), ttl=60, retry=30)
+        try:
+            assert await service.cross_rate("USD", "RUB") == 90.0
+
+            status = 503
+            service._fetched_at -= 120
+
+            started = time.monotonic()
+            assert await service.get_rates() == RATES
+            assert time.monotonic() - started < 0.1
+            await service._inflight
+            assert service.errors == 1 and service.failing and service.is_stale
+
+            # Во время паузы источник не опрашивается, нажатия получают прежние курсы сразу
+            for _ in range(5):
+                assert await service.rates_to("RUB", ("USD", "EUR")) == {"USD": 90.0, "EUR": 100.0}
+            assert calls == 2 and service._inflight is None
+
+            # Пауза вышла, источник снова отвечает с ошибкой — следующая пауза вдвое длиннее
+            service._retry_at = 0
+            await service.get_rates()
+            await service._inflight
+            assert calls == 3 and service._backoff == 60
+
+            # Источник восстановился
+            status = 200
+            service._retry_at = 0
+            await service.get_rates()
+            await service._inflight
+            assert not service.failing and not service.is_stale
+        finally:
+            await http_client.close()
+            await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_unreachable_source_without_cache_returns_none():
+    async def scenario():
+        service = ExchangeRateService("http://127.0.0.1:9/rates")
+        try:
+            assert await service.get_rates() is None
+            assert service.errors == 1 and service.failing
+
+            # До конца паузы повторных запросов нет
+            assert await service.cross_rate("USD", "RUB") is None
+            assert service.errors == 1 and service._inflight is None
+        finally:
+            await http_client.close()
+
+    asyncio.run(scenario())
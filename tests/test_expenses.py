@@ -0,0 +1,132 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from services.async_db import AsyncDatabase
+from services.expenses_repo import ExpenseRepository, month_key
+from services.users_repo import SCHEMA, UserRepository
+
+
+def make_legacy_db(path: str) -> None:
+    """База до журнала расходов: траты лежат в полях category1..3/expenses1..3"""
+    conn = sqlite3.connect(path)
+    conn.execute(SCHEMA)
+    conn.executemany(
+        "INSERT INTO users (telegram_id, name, category1, expenses1, category2, expenses2, category3, expenses3) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (1, "a", "Еда", 100.0, "Транспорт", 50.0, None, None),
+            (2, "b", "Еда", 30.0, None, 10.0, "Кино", None),
+            (3, "c", None, None, None, None, None, None),
+        ]
+    )
+    conn.commit()
+    conn.close()
+
+
+def open_finance_db(path: str):
+    db = AsyncDatabase(path)
+    UserRepository(db)
+    return db, ExpenseRepository(db)
+
+
+def test_migration_moves_legacy_columns_into_the_ledger(tmp_path):
+    path = str(tmp_path / "user.db")
+    make_legacy_db(path)
+
+    async def scenario():
+        db, expenses = open_finance_db(path)
+        await db.start()
+        try:
+            assert await db.fetchone("PRAGMA user_version") == (1,)
+            rows = await db.fetchall("SELECT user_id, category, amount FROM expenses ORDER BY user_id, category")
+            assert rows == [(1, "Еда", 100.0), (1, "Транспорт", 50.0), (2, "Еда", 30.0)]
+
+            month = month_key(time.time())
+            assert await expenses.month_by_category(1, month) == [("Еда", 100.0, 1), ("Транспорт", 50.0, 1)]
+        finally:
+            await db.close()
+
+        # Повторный старт миграцию не применяет
+        db, _ = open_finance_db(path)
+        await db.start()
+        try:
+            assert await db.fetchone("SELECT COUNT(*) FROM expenses") == (3,)
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_triggers_keep_monthly_totals(tmp_path):
+    async def scenario():
+        db, expenses = open_finance_db(str(tmp_path / "user.db"))
+        await db.start()
+        try:
+            march, april = 1709856000, 1712534400  # 2024-03-08 и 2024-04-08 UTC
+            assert await expenses.add(7, [("Еда", 100.0), ("Кино", 20.0)], ts=march) == 2
+            await expenses.add(7, [("Еда", 50.0)], ts=march + 60)
+            await expenses.add(7, [("Еда", 10.0)], ts=april)
+
+            assert await expenses.month_by_category(7, 202403) == [("Еда", 150.0, 2), ("Кино", 20.0, 1)]
+            assert await expenses.monthly_totals(7) == [(202404, 10.0), (202403, 170.0)]
+            assert await expenses.period_total(7, march, april) == 170.0
+
+            # Удаление строки журнала уменьшает итог, последняя строка категории убирает её из сводки
+            await db.execute("DELETE FROM expenses WHERE user_id = 7 AND category = 'Кино'")
+            await db.execute("DELETE FROM expenses WHERE user_id = 7 AND amount = 50.0")
+            assert await expenses.month_by_category(7, 202403) == [("Еда", 100.0, 1)]
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_execute_many_is_atomic_within_a_group_commit(tmp_path):
+    async def scenario():
+        db = AsyncDatabase(str(tmp_path / "finance.db"))
+        db.add_schema("CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY, value TEXT)")
+        await db.start()
+        try:
+            assert await db.execute_many("INSERT INTO items (id, value) VALUES (?, ?)",
+                                         [(i, str(i)) for i in range(10)]) == 10
+
+            # Конфликт в середине пакета откатывает весь пакет, соседние записи пачки остаются
+            results = await asyncio.gather(
+                db.execute_many("INSERT INTO items (id, value) VALUES (?, ?)", [(20, "x"), (5, "dup"), (21, "y")]),
+                db.execute("INSERT INTO items (id, value) VALUES (30, 'z')"),
+                return_exceptions=True
+            )
+            assert isinstance(results[0], sqlite3.IntegrityError) and results[1] == 1
+            assert await db.fetchall("SELECT id FROM items WHERE id >= 10 ORDER BY id") == [(30,)]
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_failed_migration_is_rolled_back(tmp_path):
+    path = str(tmp_path / "user.db")
+    db = AsyncDatabase(path)
+    db.add_migration(1, "CREATE TABLE first (id INTEGER);\nINSERT INTO missing VALUES (1);")
+
+    with pytest.raises(sqlite3.OperationalError):
+        asyncio.run(db.start())
+
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("PRAGMA user_version").fetchone() == (0,)
+        assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'first'").fetchone() is None
+    finally:
+        conn.close()
+
+    # Соединение не осталось в открытой транзакции
+    conn = db._open()
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            db._migrate(conn)
+        assert not conn.in_transaction
+    finally:
+        conn.close()
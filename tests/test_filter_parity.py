@@ -0,0 +1,172 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.bond_analyzer import BondAnalyzer
+from services.moex_service import MoexService
+
+
+NAMES = [
+    "ОФЗ 26238", "Сбербанк БО-01", "ВТБ Б-1-3", "Газпром капитал 3", "Роснефть 002Р-05",
+    "Лукойл БО-07", "РЖД 001Р-26", "Росатом 001P-02", "ВЭБ ПБО-002Р", "Сургутнефтегаз 1",
+    "Федеральный заём", "Транснефть БО-3", "Самолёт БО-П13", "Оферта Рога и копыта",
+    "Досрочн. погашение", "Call 2027", "Амортизац. выпуск", "Погашение частями", None,
+]
+
+
+def make_bonds(seed: int, size: int = 400) -> pd.DataFrame:
+    """Случайная таблица ISS: пропуски дат, повторяющиеся купоны (ничьи), пограничные значения"""
+    rng = np.random.default_rng(seed)
+    today = pd.Timestamp(datetime.now().date())
+
+    names = rng.choice(np.array(NAMES, dtype=object), size)
+    matdate = today + pd.to_timedelta(rng.integers(-100, 3000, size), unit="D")
+    matdate = matdate.where(rng.random(size) > 0.1)
+
+    return pd.DataFrame({
+        "SECID": [f"RU{i:06d}" for i in range(size)],
+        "SHORTNAME": [("ОФЗ " if n and n.startswith("ОФЗ") else "") + f"Бумага {i}"
+                      for i, n in enumerate(names)],
+        "SECNAME": names,
+        "LISTLEVEL": rng.choice([1, 1, 2, 3], size),
+        "CURRENCY": rng.choice(["RUB", "RUB", "RUB", "USD"], size),
+        "COUPONPERCENT": rng.choice([np.nan, 0.0, 7.5, 9.0, 12.25, 15.0], size),
+        "COUPONVALUE": rng.choice([25.0, 40.0, 60.0], size),
+        "COUPONPERIOD": rng.choice([np.nan, 91.0, 182.0, 364.0], size),
+        "MATDATE": matdate,
+        "ISSUESIZE": rng.choice([5e7, 1e8, 9.99e8, 1e9, 3e10], size),
+        "FACEVALUE": 1000.0,
+    })
+
+
+def baseline_moex(df: pd.DataFrame, limit: int = 10) -> pd.DataFrame:
+    """Построчная реализация MoexService.filter_reliable_bonds до векторизации"""
+    if df.empty:
+        return df
+
+    filtered = df.copy()
+    if 'LISTLEVEL' in filtered.columns:
+        filtered = filtered[filtered['LISTLEVEL'] == 1]
+    if 'CURRENCY' in filtered.columns:
+        filtered = filtered[filtered['CURRENCY'] == 'RUB']
+    if 'COUPONPERCENT' in filtered.columns:
+        filtered = filtered[filtered['COUPONPERCENT'].notna() & (filtered['COUPONPERCENT'] > 0)]
+    if 'MATDATE' in filtered.columns:
+        today = datetime.now().date()
+        filtered = filtered[
+            pd.to_datetime(filtered['MATDATE'], errors='coerce').dt.date > today + timedelta(days=30)
+        ]
+    if 'ISSUESIZE' in filtered.columns:
+        filtered = filtered[filtered['ISSUESIZE'] >= 100_000_000]
+
+    def has_offer(name):
+        keywords = ['оферта', 'досрочн', 'погашен', 'call', 'put']
+        return any(kw in str(name).lower() for kw in keywords)
+
+    def has_amort(name):
+        return 'аморт' in str(name).lower()
+
+    if 'SECNAME' in filtered.columns:
+        filtered = filtered[~filtered['SECNAME'].apply(has_offer)]
+        filtered = filtered[~filtered['SECNAME'].apply(has_amort)]
+
+    if 'CURRENCY' not in filtered.columns:
+        filtered['CURRENCY'] = 'RUB'
+    if 'FACEVALUE' not in filtered.columns:
+        filtered['FACEVALUE'] = 1000.0
+
+    def calculate_rating(row):
+        if 'SHORTNAME' not in row.index or 'SECNAME' not in row.index:
+            return "📊 BBB (Иные)"
+        shortname = str(row['SHORTNAME']).lower() if pd.notna(row['SHORTNAME']) else ''
+        secname = str(row['SECNAME']).lower() if pd.notna(row['SECNAME']) else ''
+        if 'офз' in shortname:
+            return "🇷🇺 AAA (ОФЗ)"
+        elif any(x in secname for x in ['сбербанк', 'втб']):
+            return "🏦 AA (Банк)"
+        elif any(x in secname for x in ['газпром', 'роснефть', 'лукойл']):
+            return "🏭 A (Корпорация)"
+        return "📊 BBB (Иные)"
+
+    filtered['RATING'] = filtered.apply(calculate_rating, axis=1)
+    if 'COUPONPERIOD' in filtered.columns:
+        filtered['COUPON_FREQ'] = (365 / filtered['COUPONPERIOD']).round().fillna(0).astype(int)
+    else:
+        filtered['COUPON_FREQ'] = 2
+    if 'MATDATE' in filtered.columns:
+        filtered['YEARS'] = ((pd.to_datetime(filtered['MATDATE']) - pd.Timestamp.now()).dt.days / 365).round(1)
+    else:
+        filtered['YEARS'] = 1.0
+
+    rating_order = {'🇷🇺 AAA (ОФЗ)': 1, '🏦 AA (Банк)': 2, '🏭 A (Корпорация)': 3, '📊 BBB (Иные)': 4}
+    filtered['R_ORDER'] = filtered['RATING'].map(lambda x: rating_order.get(x, 5))
+    filtered = filtered.sort_values(['R_ORDER', 'COUPONPERCENT'], ascending=[True, False], kind='stable')
+    return filtered.head(limit).reset_index(drop=True).drop(columns=['R_ORDER'])
+
+
+def baseline_analyzer(df: pd.DataFrame, limit: int = 10) -> pd.DataFrame:
+    """Построчная реализация BondAnalyzer.filter_reliable_bonds (порядок — по её sort_key)"""
+    filtered = df[df['LISTLEVEL'] == 1]
+    filtered = filtered[filtered['CURRENCY'] == 'RUB']
+    filtered = filtered[filtered['COUPONPERCENT'].notna() & (filtered['COUPONPERCENT'] > 0)]
+    filtered = filtered[filtered['MATDATE'].dt.date > datetime.now().date() + timedelta(days=30)]
+    filtered = filtered[~filtered['SECNAME'].apply(BondAnalyzer.has_offer)]
+    filtered = filtered[~filtered['SECNAME'].apply(BondAnalyzer.has_amortization)]
+    filtered = filtered[filtered['ISSUESIZE'] >= 1_000_000_000].copy()
+
+    filtered['RATING'] = filtered.apply(BondAnalyzer.calculate_rating, axis=1)
+    filtered['COUPON_FREQ'] = filtered['COUPONPERIOD'].apply(BondAnalyzer.calculate_coupon_frequency)
+    filtered['YEARS_TO_MATURITY'] = ((filtered['MATDATE'] - pd.Timestamp.now()).dt.days / 365.25).round(1)
+
+    order = list(BondAnalyzer.RATING_LABELS)
+    rows = sorted(range(len(filtered)), key=lambda i: (
+        order.index(filtered['RATING'].iloc[i]), -filtered['COUPONPERCENT'].iloc[i]
+    ))
+    return filtered.iloc[rows[:limit]].reset_index(drop=True)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("limit", [10, 1000])
+def test_moex_filter_matches_rowwise(seed, limit):
+    df = make_bonds(seed)
+    pd.testing.assert_frame_equal(MoexService().filter_reliable_bonds(df, limit), baseline_moex(df, limit))
+
+
+@pytest.mark.parametrize("missing", [
+    ["LISTLEVEL"], ["CURRENCY"], ["MATDATE"], ["ISSUESIZE"], ["SECNAME"],
+    ["SHORTNAME"], ["COUPONPERIOD", "FACEVALUE"],
+])
+def test_moex_filter_matches_rowwise_without_columns(missing):
+    df = make_bonds(7).drop(columns=missing)
+    pd.testing.assert_frame_equal(MoexService().filter_reliable_bonds(df, 50), baseline_moex(df, 50))
+
+
+def test_moex_filter_keeps_input_order_on_ties():
+    df = make_bonds(11)
+    df['COUPONPERCENT'] = 10.0
+    df['SECNAME'] = "Прочий эмитент"
+    df['SHORTNAME'] = "Прочий"
+    result = MoexService().filter_reliable_bonds(df, 1000)
+
+    pd.testing.assert_frame_equal(result, baseline_moex(df, 1000))
+    assert result['SECID'].is_monotonic_increasing
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("limit", [10, 1000])
+def test_analyzer_filter_matches_rowwise(seed, limit):
+    df = make_bonds(seed)
+    pd.testing.assert_frame_equal(BondAnalyzer().filter_reliable_bonds(df, limit), baseline_analyzer(df, limit))
+
+
+def test_vectorized_helpers_match_rowwise():
+    df = make_bonds(3)
+    analyzer = BondAnalyzer()
+
+    labels = analyzer.RATING_LABELS[analyzer.rating_codes(df) - 1]
+    assert list(labels) == list(df.apply(BondAnalyzer.calculate_rating, axis=1))
+
+    period = pd.concat([df['COUPONPERIOD'], pd.Series([0.0, -1.0, 30.0, 7.0])], ignore_index=True)
+    assert list(analyzer.coupon_frequencies(period)) == list(period.apply(BondAnalyzer.calculate_coupon_frequency))
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+from aiogram.filters import CommandObject
+
+from handlers import main_handlers
+from handlers.main_handlers import _edit, cmd_portfolio
+from services.snapshot_diff import RenderedMessages
+
+
+class FakeUser:
+    def __init__(self, user_id: int):
+        self.id = user_id
+
+
+class FakeChat:
+    def __init__(self, chat_id: int):
+        self.id = chat_id
+
+
+class FakeMessage:
+    """Сообщение пользователя: ответы и правки бота складываются в списки"""
+
+    def __init__(self, user_id: int = 1, message_id: int = 1):
+        self.from_user = FakeUser(user_id)
+        self.chat = FakeChat(user_id)
+        self.message_id = message_id
+        self.answers = []
+        self.edits = []
+
+    async def answer(self, text: str, **kwargs):
+        self.answers.append(text)
+
+    async def edit_text(self, text: str, **kwargs):
+        self.edits.append(text)
+
+
+class FakeCallback:
+    def __init__(self, message: FakeMessage):
+        self.message = message
+
+
+@pytest.mark.parametrize("quantity", ["nan", "inf", "-inf", "-5", "1e999"])
+def test_portfolio_rejects_non_finite_and_negative_quantities(monkeypatch, quantity):
+    changes = []
+    monkeypatch.setattr(main_handlers.portfolio_store, "set", lambda *args: changes.append(args))
+
+    message = FakeMessage()
+    command = CommandObject(prefix="/", command="portfolio", args=f"SU26238RMFS4 {quantity}")
+    asyncio.run(cmd_portfolio(message, command))
+
+    assert changes == []
+    assert message.answers == ["❌ Количество должно быть неотрицательным числом"]
+
+
+def test_identical_render_skips_edit(monkeypatch):
+    monkeypatch.setattr(main_handlers, "rendered_messages", RenderedMessages())
+    callback = FakeCallback(FakeMessage())
+
+    async def scenario():
+        return [await _edit(callback, text) for text in ("страница 1", "страница 1", "страница 2")]
+
+    assert asyncio.run(scenario()) == [True, False, True]
+    assert callback.message.edits == ["страница 1", "страница 2"]
+    assert main_handlers.rendered_messages.skipped == 1
@@ -0,0 +1,65 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from services.history import DAY, HistoryStore
+from services.local_db import local_database
+
+
+def frame(yields) -> pd.DataFrame:
+    return pd.DataFrame({
+        "SECID": ["A", "B"],
+        "YIELDCLOSE": yields,
+        "LAST": [99.0, np.nan],
+        "COUPONPERCENT": [10.0, 12.0],
+    })
+
+
+def test_stores_on_one_file_share_a_connection(tmp_path):
+    path = str(tmp_path / "bonds.db")
+    first, second = HistoryStore(path), HistoryStore(path)
+
+    assert first.db is second.db is local_database(path)
+    assert local_database(str(tmp_path / "other.db")) is not first.db
+
+
+def test_append_series_and_compact(tmp_path):
+    store = HistoryStore(str(tmp_path / "bonds.db"))
+    now = 100 * DAY
+
+    assert store.append(frame([10.0, 11.0]), now - 40 * DAY) == 2
+    store.append(frame([12.0, np.nan]), now - 40 * DAY + 60)
+    store.append(frame([13.0, 14.0]), now - DAY)
+    store.compact(now)
+
+    series = store.series("A", days=90, now=now)
+    assert [round(y, 1) for _, y, _ in series] == [12.0, 13.0]
+    with store.db.read() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM quotes").fetchone()[0] == 2
+
+
+def test_concurrent_writers_do_not_collide(tmp_path):
+    store = HistoryStore(str(tmp_path / "bonds.db"))
+    threads = [
+        threading.Thread(target=store.append, args=(frame([float(i), float(i)]), 1000 + i))
+        for i in range(20)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with store.db.read() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM quotes").fetchone()[0] == 40
+
+
+def test_records_trade_yield_with_close_fallback(tmp_path):
+    store = HistoryStore(str(tmp_path / "bonds.db"))
+    df = frame([10.0, 11.0]).assign(YIELD=[10.5, np.nan])
+
+    store.append(df, 1000)
+
+    with store.db.read() as conn:
+        rows = conn.execute("SELECT secid, yield FROM quotes ORDER BY secid").fetchall()
+    assert rows == [("A", 10.5), ("B", 11.0)]
@@ -0,0 +1,69 @@
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from config import Config
+from services.http_client import HttpClient, http_client
+from services.moex_api import MoexAPI
+from services.moex_service import MoexService
+
+
+async def _serve(handler):
+    """Локальная замена ISS: считает соединения по порту клиента"""
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handler)
+    server = TestServer(app)
+    await server.start_server()
+    return server
+
+
+def test_services_share_one_pooled_session():
+    async def scenario():
+        ports = set()
+
+        async def handler(request):
+            ports.add(request.transport.get_extra_info("peername")[1])
+            await asyncio.sleep(0.01)
+            return web.json_response({"securities": {"columns": [], "data": []}})
+
+        server = await _serve(handler)
+        base_url = str(server.make_url("")).rstrip("/")
+        service, api = MoexService(), MoexAPI()
+        service.base_url = api.base_url = base_url
+
+        try:
+            await http_client.start()
+            session = await http_client.get_session()
+
+            # Последовательные запросы идут по одному keep-alive соединению
+            for _ in range(5):
+                await service._fetch_json("/a.json")
+                await api._fetch_json("/b.json")
+            assert len(ports) == 1
+
+            # Параллельная нагрузка не выходит за лимит пула на хост
+            await asyncio.gather(*(
+                (service if i % 2 else api)._fetch_json(f"/c{i}.json") for i in range(100)
+            ))
+            assert len(ports) <= Config.HTTP_POOL_LIMIT_PER_HOST
+            assert await http_client.get_session() is session
+        finally:
+            await http_client.close()
+            await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_session_is_recreated_after_close():
+    async def scenario():
+        client = HttpClient()
+        first = await client.get_session()
+        await client.close()
+        assert first.closed
+
+        second = await client.get_session()
+        assert second is not first and not second.closed
+        await client.close()
+
+    asyncio.run(scenario())
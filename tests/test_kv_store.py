@@ -0,0 +1,120 @@
+import asyncio
+from typing import Dict, Sequence
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+
+from services.fsm_storage import KVStorage
+from services.kv_store import CachedKV, Entry, KeyValueBackend, SQLiteBackend
+
+
+class SharedBackend(KeyValueBackend):
+    """Общее хранилище в памяти — как Redis для нескольких реплик"""
+
+    def __init__(self):
+        self.data: Dict[str, str] = {}
+        self.reads = 0
+        self.closed = False
+
+    async def get_many(self, keys: Sequence[str]) -> Dict[str, str]:
+        self.reads += 1
+        return {key: self.data[key] for key in keys if key in self.data}
+
+    async def set_many(self, items: Dict[str, Entry]) -> None:
+        for key, (value, _expires_at) in items.items():
+            self.data[key] = value
+
+    async def delete_many(self, keys: Sequence[str]) -> None:
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+def test_cached_reads_expire_so_other_replicas_writes_are_seen():
+    async def scenario():
+        backend = SharedBackend()
+        first = CachedKV(backend, read_ttl=0.05)
+        second = CachedKV(backend, read_ttl=0.05)
+
+        first.set("fsm:1", "a")
+        await first.flush()
+        assert await second.get("fsm:1") == "a"
+
+        first.set("fsm:1", "b")
+        await first.flush()
+        # В пределах read_ttl вторая реплика отдаёт значение из кэша без запроса
+        reads = backend.reads
+        assert await second.get("fsm:1") == "a" and backend.reads == reads
+
+        await asyncio.sleep(0.06)
+        assert await second.get("fsm:1") == "b"
+
+        await first.close()
+        await second.close()
+
+    asyncio.run(scenario())
+
+
+def test_local_writes_win_until_flushed():
+    async def scenario():
+        backend = SharedBackend()
+        kv = CachedKV(backend, read_ttl=0.0, flush_interval=60)
+
+        kv.set("session:1", "local")
+        assert await kv.get("session:1") == "local"
+        assert backend.data == {}
+
+        kv.delete("session:1")
+        assert await kv.get("session:1") is None
+        await kv.close()
+
+    asyncio.run(scenario())
+
+
+def test_close_flushes_dirty_writes_and_closes_backend(tmp_path):
+    async def scenario():
+        path = str(tmp_path / "storage.db")
+        kv = CachedKV(SQLiteBackend(path), flush_interval=60)
+        kv.set("fsm:1", "state")
+        kv.set("fsm:2", "temporary", ttl=60)
+        await kv.close()
+        assert not kv.backend._started
+
+        reopened = CachedKV(SQLiteBackend(path))
+        assert await reopened.get("fsm:1") == "state"
+        assert await reopened.get("fsm:2") == "temporary"
+        assert await reopened.get("fsm:3") is None
+        await reopened.close()
+
+    asyncio.run(scenario())
+
+
+def test_backend_must_implement_the_interface():
+    class Partial(KeyValueBackend):
+        async def get_many(self, keys):
+            return {}
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_fsm_storage_close_leaves_the_shared_store_open():
+    async def scenario():
+        backend = SharedBackend()
+        kv = CachedKV(backend, flush_interval=60)
+        storage = KVStorage(kv)
+        key = StorageKey(bot_id=1, chat_id=2, user_id=2)
+
+        await storage.set_state(key, "form:step")
+        # Диспетчер закрывает FSM раньше хуков остановки — сессии ещё пишутся в то же хранилище
+        await storage.close()
+        kv.set("session:2", "[1, []]")
+        assert not backend.closed
+
+        await kv.close()
+        assert backend.closed
+        assert set(backend.data) == {"session:2", storage._key(key)}
+
+    asyncio.run(scenario())
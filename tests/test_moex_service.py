@@ -0,0 +1,123 @@
+import asyncio
+
+from config import Config
+from services.moex_service import MoexService
+
+
+COLUMNS = ["SECID", "BOARDID", "SHORTNAME", "SECNAME", "ISSUESIZE", "COUPONPERCENT",
+           "COUPONPERIOD", "MATDATE", "LISTLEVEL", "FACEVALUE", "FACEUNIT"]
+
+
+def _row(secid: str, board: str) -> list:
+    return [secid, board, secid, secid, 10 ** 9, 8.0, 182, "2030-01-01", 1, 1000, "SUR"]
+
+
+class PagedISS(MoexService):
+    """MoexService, у которого _fetch_json отдаёт страницы из памяти"""
+
+    def __init__(self, rows_per_board: dict, page_size: int = Config.ISS_PAGE_SIZE, delay: float = 0):
+        super().__init__()
+        self.rows = rows_per_board
+        self.page_size = page_size
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _fetch_json(self, endpoint: str, params: dict = None) -> dict:
+        board = endpoint.split("/boards/")[1].split("/")[0]
+        block = params.get("iss.only", "securities")
+        start = params.get("start", 0)
+        self.calls.append((board, block, start))
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+
+        if block != "securities":
+            return {}
+        rows = self.rows.get(board, [])
+        return {"securities": {"columns": COLUMNS, "data": rows[start:start + self.page_size]}}
+
+
+def test_pages_until_short_page():
+    rows = [_row(f"B{i:04d}", "TQCB") for i in range(2 * Config.ISS_PAGE_SIZE + 7)]
+    service = PagedISS({"TQCB": rows})
+
+    df = asyncio.run(service.get_all_bonds("TQCB"))
+
+    assert len(df) == len(rows)
+    assert list(df["SECID"]) == [r[0] for r in rows]
+    assert [start for _, block, start in service.calls if block == "securities"] == [
+        0, Config.ISS_PAGE_SIZE, 2 * Config.ISS_PAGE_SIZE
+    ]
+
+
+def test_exact_multiple_of_page_ends_on_empty_page():
+    rows = [_row(f"B{i:04d}", "TQCB") for i in range(Config.ISS_PAGE_SIZE)]
+    service = PagedISS({"TQCB": rows})
+
+    df = asyncio.run(service.get_all_bonds("TQCB"))
+
+    assert len(df) == Config.ISS_PAGE_SIZE
+    assert [start for _, block, start in service.calls if block == "securities"] == [0, Config.ISS_PAGE_SIZE]
+
+
+def test_repeated_first_page_stops_paging():
+    class IgnoresStart(PagedISS):
+        async def _fetch_json(self, endpoint, params=None):
+            return await super()._fetch_json(endpoint, {**params, "start": 0})
+
+    rows = [_row(f"B{i:04d}", "TQCB") for i in range(Config.ISS_PAGE_SIZE)]
+    service = IgnoresStart({"TQCB": rows})
+
+    df = asyncio.run(service.get_all_bonds("TQCB"))
+
+    assert len(df) == Config.ISS_PAGE_SIZE
+
+
+def test_cursor_ends_paging():
+    class WithCursor(PagedISS):
+        async def _fetch_json(self, endpoint, params=None):
+            data = await super()._fetch_json(endpoint, params)
+            if data:
+                data["securities.cursor"] = {
+                    "columns": ["INDEX", "TOTAL", "PAGESIZE"],
+                    "data": [[params["start"], 150, 50]]
+                }
+            return data
+
+    rows = [_row(f"B{i:04d}", "TQCB") for i in range(150)]
+    service = WithCursor({"TQCB": rows}, page_size=50)
+
+    df = asyncio.run(service.get_all_bonds("TQCB"))
+
+    assert len(df) == 150
+    assert [start for _, block, start in service.calls if block == "securities"] == [0, 50, 100]
+
+
+def test_boards_load_concurrently_and_combine():
+    boards = ("TQOB", "TQCB", "TQIR")
+    rows = {board: [_row(f"{board}{i}", board) for i in range(3)] for board in boards}
+    # Одна бумага торгуется в двух режимах — строки различаются по BOARDID
+    rows["TQIR"].append(_row("TQCB0", "TQIR"))
+    service = PagedISS(rows, delay=0.05)
+
+    df = asyncio.run(service.get_bonds_universe(boards))
+
+    assert service.max_in_flight >= len(boards)
+    assert len(df) == 10
+    assert set(df["BOARDID"]) == set(boards)
+    assert (df["CURRENCY"] == "RUB").all()
+    assert not df.duplicated(subset=["SECID", "BOARDID"]).any()
+
+
+def test_empty_board_is_skipped():
+    service = PagedISS({"TQOB": [_row("SU1", "TQOB")]})
+
+    df = asyncio.run(service.get_bonds_universe(("TQOB", "TQCB")))
+
+    assert list(df["SECID"]) == ["SU1"]
@@ -0,0 +1,108 @@
+import threading
+from datetime import date
+
+import pandas as pd
+
+from services.portfolio import PortfolioStore
+from utils.formatters import format_portfolio
+
+
+class Schedules:
+    """Вместо CouponStore: графики и поколение задаются тестом"""
+
+    def __init__(self, schedules: dict):
+        self.schedules = schedules
+        self.generation = 1
+
+    def loaded(self) -> dict:
+        return self.schedules
+
+    def peek(self, secid: str):
+        return self.schedules.get(secid)
+
+
+def schedule(months, value=25.0) -> pd.DataFrame:
+    today = pd.Timestamp(date.today())
+    return pd.DataFrame({
+        "coupondate": [today + pd.DateOffset(months=m) for m in months],
+        "value": [value] * (len(months) - 1) + [None],
+        "facevalue": 1000.0,
+    })
+
+
+def test_projection_follows_holdings(tmp_path):
+    coupons = Schedules({"A": schedule([1, 7]), "B": schedule([2, 30], value=10.0)})
+    store = PortfolioStore(str(tmp_path / "bonds.db"), coupons=coupons)
+
+    store.set(1, "A", 2)
+    store.set(1, "C", 1)
+    projection = store.project(1)
+    # Последний купон не объявлен — по предыдущему, номинал вместе с ним
+    assert projection.total == 2 * (25.0 + 25.0 + 1000.0)
+    assert projection.missing == ("C",)
+    assert store.project(1) is projection and store.hits == 1
+
+    store.set(1, "B", 10)
+    assert store.project(1).total == 2 * 1050.0 + 10 * 10.0
+    store.set(1, "A", 0)
+    assert store.holdings(1) == {"B": 10.0, "C": 1.0}
+
+
+def test_concurrent_updates_keep_cache_consistent_with_database(tmp_path):
+    store = PortfolioStore(str(tmp_path / "bonds.db"), coupons=Schedules({}), cache_size=3)
+    stop = threading.Event()
+    errors = []
+
+    def reader():
+        while not stop.is_set():
+            try:
+                for user_id in range(6):
+                    store.holdings(user_id)
+                    store.project(user_id)
+            except Exception as e:
+                errors.append(e)
+
+    def writer(user_id: int):
+        for i in range(60):
+            store.set(user_id, f"S{i % 7}", i % 4)
+
+    readers = [threading.Thread(target=reader) for _ in range(2)]
+    writers = [threading.Thread(target=writer, args=(u,)) for u in range(6)]
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    stop.set()
+    for thread in readers:
+        thread.join()
+
+    assert not errors
+    with store.db.read() as conn:
+        for user_id in range(6):
+            rows = dict(conn.execute(
+                "SELECT secid, quantity FROM holdings WHERE user_id = ?", (user_id,)
+            ).fetchall())
+            assert store.holdings(user_id) == rows
+            assert store.project(user_id).holdings == rows
+
+
+def test_projection_without_loaded_schedules(tmp_path):
+    store = PortfolioStore(str(tmp_path / "bonds.db"), coupons=Schedules({}))
+    assert store.project(1).total == 0.0
+
+    store.set(1, "A", 5)
+    projection = store.project(1)
+    assert projection.total == 0.0 and projection.missing == ("A",)
+
+
+def test_portfolio_text_escapes_secids(tmp_path):
+    coupons = Schedules({"<A&>": schedule([1, 7])})
+    store = PortfolioStore(str(tmp_path / "bonds.db"), coupons=coupons)
+
+    store.set(1, "<A&>", 1)
+    store.set(1, "<C>", 1)
+    text = format_portfolio(store.project(1))
+
+    assert "<b>&lt;A&amp;&gt;</b>" in text
+    assert "Нет графика выплат: &lt;C&gt;" in text
+    assert "<A&>" not in text and "<C>" not in text
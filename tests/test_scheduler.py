@@ -0,0 +1,56 @@
+import asyncio
+from datetime import date, datetime
+
+import pandas as pd
+
+from services.scheduler import MSK, RefreshScheduler, load_holidays
+from services.snapshot import BondSnapshot
+
+
+class SlowCache:
+    """Кэш, обновление которого не заканчивается само"""
+
+    serve_stale = False
+
+    def __init__(self):
+        self.cancelled = False
+
+    async def get_universe(self, force: bool = False) -> BondSnapshot:
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return BondSnapshot("ALL", 0, pd.DataFrame())
+
+
+def test_stop_waits_for_cancelled_tasks():
+    async def scenario():
+        cache = SlowCache()
+        scheduler = RefreshScheduler(cache, holidays=set())
+        scheduler.start()
+        await asyncio.sleep(0.01)
+
+        loop_task, refresh_task = scheduler._loop_task, scheduler._refresh_task
+        await scheduler.stop()
+
+        assert loop_task.done() and refresh_task.done()
+        assert cache.cancelled and not cache.serve_stale
+
+    asyncio.run(scenario())
+
+
+def test_outdated_holidays_calendar_is_reported(tmp_path, caplog):
+    path = tmp_path / "holidays.txt"
+    path.write_text("# комментарий\n2001-01-01  # Новый год\n", encoding="utf-8")
+
+    assert load_holidays(str(path)) == {date(2001, 1, 1)}
+    assert "нет дат" in caplog.text
+
+
+def test_holidays_are_not_trading_days():
+    holidays = load_holidays()
+    scheduler = RefreshScheduler(SlowCache(), holidays)
+
+    for day in holidays:
+        assert not scheduler.is_trading_day(datetime(day.year, day.month, day.day, 12, tzinfo=MSK))
@@ -0,0 +1,80 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from services.moex_service import MoexService
+from services.screening import ProfileStore, ScreenProfile, Screener, parse_profile
+from services.snapshot import BondSnapshot
+from tests.test_filter_parity import make_bonds
+from utils.formatters import format_screen_profile
+
+
+def test_default_profile_matches_filter_reliable_bonds():
+    df = make_bonds(5)
+    result = Screener().screen(BondSnapshot("ALL", 1, df), ScreenProfile(), limit=50)
+    pd.testing.assert_frame_equal(result, MoexService().filter_reliable_bonds(df, 50))
+
+
+def test_parse_profile():
+    profile = parse_profile("years 1-5 coupon 8- rating 2,1 board tqcb", ScreenProfile())
+    assert (profile.min_days, profile.max_days) == (365, 5 * 365)
+    assert (profile.coupon_min, profile.coupon_max) == (8.0, None)
+    assert profile.ratings == (1, 2) and profile.boards == ("TQCB",)
+
+    with pytest.raises(ValueError):
+        parse_profile("rating 9", ScreenProfile())
+    with pytest.raises(ValueError):
+        parse_profile("years", ScreenProfile())
+
+
+def test_profile_text_escapes_boards():
+    profile = parse_profile("board <b>,tq&ob", ScreenProfile())
+    text = format_screen_profile(profile)
+    assert "Режимы: &lt;B&gt;, TQ&amp;OB" in text and "<B>" not in text
+
+
+def test_profiles_persist_and_reset(tmp_path):
+    path = str(tmp_path / "bonds.db")
+    store = ProfileStore(path)
+    profile = parse_profile("issue 1e9", ScreenProfile())
+
+    store.set(7, profile)
+    assert ProfileStore(path).get(7).key == profile.key
+
+    store.reset(7)
+    assert store.get(7).key == ScreenProfile().key
+    assert ProfileStore(path).get(7).key == ScreenProfile().key
+
+
+def test_concurrent_access_keeps_cache_consistent_with_database(tmp_path):
+    path = str(tmp_path / "bonds.db")
+    store = ProfileStore(path)
+    custom = parse_profile("coupon 10-", ScreenProfile())
+    errors = []
+
+    def worker(seed: int):
+        try:
+            for i in range(100):
+                user_id = (seed + i) % 5
+                action = (seed * 7 + i) % 3
+                if action == 0:
+                    store.set(user_id, custom)
+                elif action == 1:
+                    store.reset(user_id)
+                else:
+                    store.get(user_id)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    # Кэш не возвращает сброшенные профили: совпадает с тем, что видит новый экземпляр
+    fresh = ProfileStore(path)
+    for user_id in range(5):
+        assert store.get(user_id).key == fresh.get(user_id).key
@@ -0,0 +1,86 @@
+import asyncio
+from datetime import date
+
+import pandas as pd
+
+from services.coupons import coupon_store
+from services.search import SearchService
+from services.snapshot import BondSnapshot
+from services.view_cache import ViewCache
+from utils.formatters import format_bonds_table, format_search_results
+
+
+def make_snapshot(version: int = 1) -> BondSnapshot:
+    today = pd.Timestamp(date.today())
+    df = pd.DataFrame({
+        "SECID": ["RU000A0ZZZZ1", "SU26238RMFS4"],
+        "SHORTNAME": ["<b>Рога & копыта</b>", "ОФЗ 26238"],
+        "SECNAME": ["ООО Рога и копыта", "ОФЗ-ПД 26238"],
+        "LISTLEVEL": [1, 1],
+        "CURRENCY": ["RUB", "RUB"],
+        "COUPONPERCENT": [12.0, 7.1],
+        "COUPONPERIOD": [182.0, 182.0],
+        "FACEVALUE": [1000.0, 1000.0],
+        "ISSUESIZE": [1e9, 1e10],
+        "MATDATE": [today + pd.Timedelta(days=700), today + pd.Timedelta(days=5000)],
+        "YTM": [13.0, 14.0],
+        "DURATION": [1.8, 9.0],
+        "MOD_DURATION": [1.6, 7.9],
+        "CONVEXITY": [4.0, 100.0],
+    })
+    return BondSnapshot("ALL", version, df)
+
+
+def test_search_results_escape_query_and_names():
+    df = make_snapshot().df
+    text = format_search_results("<i>рога & </i>", df)
+
+    assert "&lt;i&gt;рога &amp; &lt;/i&gt;" in text
+    assert "&lt;b&gt;Рога &amp; копыта&lt;/b&gt;" in text
+    assert "<i>" not in text and "<b>Рога" not in text
+    assert "&lt;script&gt;" in format_search_results("<script>", df.iloc[:0])
+
+
+def test_cached_answers_are_keyed_by_coupon_generation():
+    service = SearchService()
+    snapshot = make_snapshot()
+
+    assert service.cached(snapshot, "ОФЗ", generation=1) is None
+    service.remember("ОФЗ", ["card without coupons"], generation=1)
+    assert service.cached(snapshot, " офз ", generation=1) == ["card without coupons"]
+    assert service.cached(snapshot, "ОФЗ", generation=2) is None
+
+
+def test_bond_cards_are_rebuilt_after_coupons_load(monkeypatch):
+    secid = "SU26238RMFS4"
+    schedule = pd.DataFrame({
+        "coupondate": [pd.Timestamp(date.today()) + pd.Timedelta(days=30)],
+        "value": [41.23],
+        "facevalue": [1000.0],
+    })
+
+    async def fetcher(_secid):
+        return schedule
+
+    monkeypatch.setattr(coupon_store, "_fetcher", fetcher)
+    monkeypatch.setattr(coupon_store, "_schedules", {})
+    monkeypatch.setattr(coupon_store, "_fetched_on", {})
+
+    views = ViewCache()
+    snapshot = make_snapshot()
+    before = views.details(snapshot, secid)
+    assert before is not None and "41.23" not in before
+
+    asyncio.run(coupon_store.get(secid))
+    after = views.details(snapshot, secid)
+    assert "41.23" in after
+
+
+def test_bond_table_and_card_escape_names():
+    snapshot = make_snapshot()
+    card = ViewCache().details(snapshot, "RU000A0ZZZZ1")
+    assert "&lt;b&gt;Рога &amp; копыта&lt;/b&gt;" in card and "<b>Рога" not in card
+
+    df = snapshot.df.assign(RATING="⭐⭐⭐ Высокий", YEARS=1.9)
+    table = format_bonds_table(df)
+    assert "&lt;b&gt;Рога &amp; копыта&lt;/b&gt;" in table and "<b>Рога" not in table
@@ -0,0 +1,140 @@
+import asyncio
+import time
+from collections import deque
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from config import Config
+from services.send_queue import BROADCAST, INTERACTIVE, NOTIFY, SendQueue, TokenBucket, _Item
+
+
+def recorder(log: list, name):
+    async def call():
+        log.append(name)
+        return name
+    return call
+
+
+def test_higher_priority_goes_first():
+    async def scenario():
+        queue = SendQueue(global_rate=1000, concurrency=1)
+        queue.start(None)
+        log = []
+
+        # Всё поставлено до первого прохода очереди — порядок задают только приоритеты
+        queue.call(3, recorder(log, "broadcast"), BROADCAST)
+        queue.call(2, recorder(log, "notify"), NOTIFY)
+        done = queue.call(1, recorder(log, "interactive"), INTERACTIVE, wait=True)
+
+        assert await done == "interactive"
+        await queue.stop(timeout=1)
+        return log
+
+    assert asyncio.run(scenario()) == ["interactive", "notify", "broadcast"]
+
+
+def test_retry_after_pauses_queue_and_retries():
+    async def scenario():
+        queue = SendQueue(global_rate=1000)
+        queue.start(None)
+        log = []
+        attempts = 0
+
+        async def flooded():
+            nonlocal attempts
+            attempts += 1
+            if attempts == 1:
+                raise TelegramRetryAfter(SendMessage(chat_id=1, text="x"), "Flood control", retry_after=1)
+            log.append(("flooded", time.monotonic()))
+            return "ok"
+
+        started = time.monotonic()
+        result = queue.call(1, flooded, NOTIFY, wait=True)
+        await asyncio.sleep(0.05)
+        # Пауза общая: сообщение в другой чат тоже ждёт её окончания
+        other = queue.call(2, recorder(log, "other"), NOTIFY, wait=True)
+
+        assert await result == "ok" and await other == "other"
+        await queue.stop(timeout=1)
+        return started, log, attempts, queue
+
+    started, log, attempts, queue = asyncio.run(scenario())
+
+    assert attempts == 2 and queue.retried == 1 and queue.failed == 0
+    assert log[0][1] - started >= 1
+    assert "other" in log
+
+
+def test_retry_after_gives_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr(Config, "SEND_MAX_RETRIES", 0)
+
+    async def scenario():
+        queue = SendQueue(global_rate=1000)
+        queue.start(None)
+
+        async def flooded():
+            raise TelegramRetryAfter(SendMessage(chat_id=1, text="x"), "Flood control", retry_after=1)
+
+        future = queue.call(1, flooded, NOTIFY, wait=True)
+        try:
+            await future
+        except TelegramRetryAfter:
+            pass
+        else:
+            raise AssertionError("ожидался отказ после исчерпания повторов")
+        await queue.stop(timeout=1)
+        return queue
+
+    queue = asyncio.run(scenario())
+    assert queue.failed == 1 and queue.retried == 0
+
+
+def test_idle_buckets_are_collected():
+    queue = SendQueue()
+    queue._buckets = {
+        1: TokenBucket(1.0, 3, now=0.0),
+        2: TokenBucket(1.0, 3, now=0.0),
+        3: TokenBucket(1.0, 3, now=0.0),
+    }
+    # Чат 2 только что потратил токены, у чата 3 есть сообщения в очереди
+    for _ in range(3):
+        queue._buckets[2].consume()
+    queue._buckets[2].updated = 99.0
+    queue._lanes[NOTIFY][3] = deque([_Item(3, recorder([], "x"), NOTIFY, None)])
+
+    queue._collect_buckets(now=100.0)
+    assert sorted(queue._buckets) == [2, 3]
+
+    # Сборка не чаще раза в минуту
+    del queue._lanes[NOTIFY][3]
+    queue._collect_buckets(now=130.0)
+    assert sorted(queue._buckets) == [2, 3]
+    queue._collect_buckets(now=200.0)
+    assert queue._buckets == {}
+
+
+def test_interactive_replies_skip_chat_rate_but_keep_order():
+    async def scenario():
+        queue = SendQueue(global_rate=1000, chat_rate=1.0, chat_burst=3)
+        queue.start(None)
+        log = []
+
+        started = time.monotonic()
+        futures = [queue.call(1, recorder(log, n), INTERACTIVE, wait=True) for n in range(6)]
+        await asyncio.gather(*futures)
+        interactive_time = time.monotonic() - started
+
+        # Ответы израсходовали токены чата — уведомление ждёт лимита
+        started = time.monotonic()
+        await queue.call(1, recorder(log, "notify"), NOTIFY, wait=True)
+        notify_time = time.monotonic() - started
+
+        await queue.stop(timeout=1)
+        return log, interactive_time, notify_time
+
+    log, interactive_time, notify_time = asyncio.run(scenario())
+
+    assert log == [0, 1, 2, 3, 4, 5, "notify"]
+    assert interactive_time < 0.5
+    assert notify_time >= 0.5
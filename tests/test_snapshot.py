@@ -0,0 +1,112 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+
+from services.moex_service import MoexService
+from services.snapshot import SnapshotCache
+
+
+def make_reference(secids) -> pd.DataFrame:
+    return pd.DataFrame({
+        "SECID": list(secids),
+        "BOARDID": "TQCB",
+        "SHORTNAME": [f"Бумага {s}" for s in secids],
+        "COUPONPERCENT": 10.0,
+    })
+
+
+def make_marketdata(values: dict) -> pd.DataFrame:
+    df = pd.DataFrame(
+        [(secid, price, ytm, ytm) for secid, (price, ytm) in values.items()],
+        columns=["SECID", "LAST", "YIELD", "YIELDCLOSE"]
+    )
+    return df.set_index("SECID")
+
+
+class FakeService(MoexService):
+    """Справочник и рыночные данные из памяти со счётчиками запросов"""
+
+    def __init__(self):
+        super().__init__()
+        self.reference = make_reference(["A", "B", "C"])
+        self.marketdata = make_marketdata({"A": (100.0, 10.0), "B": (99.0, 11.0), "C": (98.0, 12.0)})
+        self.reference_calls = 0
+        self.marketdata_calls = 0
+        self.fail_marketdata = False
+
+    async def get_reference(self, board: str = "TQCB") -> pd.DataFrame:
+        self.reference_calls += 1
+        return self.reference.copy()
+
+    async def get_marketdata(self, board: str = "TQCB") -> pd.DataFrame:
+        self.marketdata_calls += 1
+        if self.fail_marketdata:
+            raise RuntimeError("ISS недоступна")
+        return self.marketdata.copy()
+
+
+def test_merge_marketdata_joins_by_secid():
+    service = MoexService()
+    # Рыночные данные в другом порядке, без одной бумаги и с лишней
+    reference = make_reference(["A", "B", "C"]).assign(LAST=1.0)
+    marketdata = make_marketdata({"C": (98.0, 12.0), "X": (1.0, 1.0), "A": (100.0, 10.0)})
+
+    df = service.merge_marketdata(reference, marketdata)
+
+    assert list(df["SECID"]) == ["A", "B", "C"]
+    assert df["LAST"].tolist()[0] == 100.0 and np.isnan(df["LAST"].tolist()[1])
+    assert df["YIELD"].tolist()[2] == 12.0
+
+
+def test_merge_without_marketdata_drops_stale_market_columns():
+    service = MoexService()
+    reference = make_reference(["A"]).assign(LAST=1.0, YIELD=2.0)
+
+    df = service.merge_marketdata(reference, pd.DataFrame())
+
+    assert "LAST" not in df.columns and "YIELD" not in df.columns
+    assert service.merge_marketdata(pd.DataFrame(), make_marketdata({"A": (1.0, 1.0)})).empty
+
+
+def test_reference_is_reused_until_its_ttl():
+    async def scenario():
+        service = FakeService()
+        cache = SnapshotCache(ttl=0, service=service, reference_ttl=3600)
+
+        first = await cache.get("TQCB")
+        assert (service.reference_calls, service.marketdata_calls) == (1, 1)
+
+        # Обычные циклы тянут только рыночные данные
+        service.marketdata = make_marketdata({"A": (101.0, 9.5)})
+        second = await cache.get("TQCB")
+        assert (service.reference_calls, service.marketdata_calls) == (1, 2)
+        assert second.version > first.version
+        assert second.df.loc[second.df["SECID"] == "A", "LAST"].item() == 101.0
+        assert np.isnan(second.df.loc[second.df["SECID"] == "B", "LAST"].item())
+
+        # Справочник истёк — оба уровня загружаются заново
+        cache.reference_ttl = 0
+        service.reference = make_reference(["A", "B", "C", "D"])
+        third = await cache.get("TQCB")
+        assert (service.reference_calls, service.marketdata_calls) == (2, 3)
+        assert list(third.df["SECID"]) == ["A", "B", "C", "D"]
+
+    asyncio.run(scenario())
+
+
+def test_failed_marketdata_keeps_previous_snapshot():
+    async def scenario():
+        service = FakeService()
+        cache = SnapshotCache(ttl=0, service=service)
+        assert cache.stats()["boards"] == {}
+
+        first = await cache.get("TQCB")
+        service.fail_marketdata = True
+
+        assert await cache.get("TQCB") is first
+        assert cache.errors == 1
+        assert cache.stats()["boards"]["TQCB"]["reference_age"] is not None
+
+    asyncio.run(scenario())
+
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+from services.snapshot import BondSnapshot
+from services.snapshot_diff import RenderedMessages, SnapshotDiffer, content_hash, diff_frames
+from utils.formatters import format_whats_new
+
+
+def frame(rows: dict) -> pd.DataFrame:
+    return pd.DataFrame(
+        [(secid, f"Бумага {secid}", last, ytm) for secid, (last, ytm) in rows.items()],
+        columns=["SECID", "SHORTNAME", "LAST", "YIELD"]
+    )
+
+
+def test_diff_finds_added_removed_and_changed():
+    old = frame({"A": (100.0, 10.0), "B": (99.0, 11.0), "C": (98.0, np.nan)})
+    new = frame({"C": (98.0, np.nan), "A": (101.0, 10.0), "D": (97.0, 13.0)})
+
+    added, removed, changed = diff_frames(old, new)
+
+    assert list(added['SECID']) == ["D"]
+    assert list(removed['SECID']) == ["B"]
+    # У C пусто в обеих версиях — это не изменение
+    assert list(changed['SECID']) == ["A"]
+    row = changed.iloc[0]
+    assert (row['LAST_OLD'], row['LAST'], row['SHORTNAME']) == (100.0, 101.0, "Бумага A")
+
+
+def test_diff_ignores_duplicate_secids_and_missing_columns():
+    old = pd.concat([frame({"A": (100.0, 10.0)})] * 2, ignore_index=True)
+    new = frame({"A": (100.0, 12.0)}).drop(columns=['LAST'])
+
+    added, removed, changed = diff_frames(old, new)
+
+    assert added.empty and removed.empty
+    assert list(changed.columns) == ["SECID", "SHORTNAME", "YIELD_OLD", "YIELD"]
+    assert changed['YIELD'].tolist() == [12.0]
+
+
+def test_differ_caches_pairs_of_versions():
+    differ = SnapshotDiffer(cache_size=2)
+    snapshots = [BondSnapshot("ALL", v, frame({"A": (100.0 + v, 10.0)})) for v in range(4)]
+
+    first = differ.diff(snapshots[0], snapshots[1])
+    assert differ.diff(snapshots[0], snapshots[1]) is first
+    assert not first.empty and len(first.changed) == 1
+
+    differ.diff(snapshots[1], snapshots[2])
+    differ.diff(snapshots[2], snapshots[3])
+    assert differ.diff(snapshots[0], snapshots[1]) is not first
+
+
+def test_whats_new_escapes_names():
+    old = frame({"A": (100.0, 10.0)})
+    new = pd.concat([old.assign(YIELD=12.5), frame({"<X>": (99.0, 11.0)})], ignore_index=True)
+    new.loc[1, 'SHORTNAME'] = "<b>Рога & копыта</b>"
+
+    differ = SnapshotDiffer()
+    text = format_whats_new(differ.diff(BondSnapshot("ALL", 1, old), BondSnapshot("ALL", 2, new)), "за час")
+
+    assert "<b>&lt;X&gt;</b> &lt;b&gt;Рога &amp; копыта&lt;/b&gt;" in text
+    assert "<b>A</b>: 10.00% → 12.50%" in text
+
+
+def test_rendered_messages_skip_identical_content():
+    rendered = RenderedMessages(max_size=2)
+    digest = content_hash("текст")
+
+    assert rendered.changed(1, 10, digest)
+    assert not rendered.changed(1, 10, digest) and rendered.skipped == 1
+    assert rendered.changed(1, 10, content_hash("другой текст"))
+
+    # Вытесненное сообщение снова считается новым
+    rendered.remember(1, 11, digest)
+    rendered.remember(1, 12, digest)
+    assert rendered.changed(1, 10, content_hash("другой текст"))
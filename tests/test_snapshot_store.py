@@ -0,0 +1,53 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+
+from services.snapshot import BondSnapshot, SnapshotCache
+from services.snapshot_store import SnapshotStore
+
+
+def make_snapshot() -> BondSnapshot:
+    df = pd.DataFrame({
+        "SECID": ["SU26238RMFS4", "RU000A0JX0J2", None],
+        "SHORTNAME": ["ОФЗ 26238", "Сбербанк", "Без имени"],
+        "COUPONPERCENT": [7.1, 9.5, np.nan],
+        "ISSUESIZE": [1_000_000_000, 2_000_000_000, 3_000_000_000],
+        "MATDATE": pd.to_datetime(["2041-05-15", "2030-01-01", None]),
+        "LAST": [60.5, 99.1, np.nan],
+    })
+    return BondSnapshot("TQOB", 5, df)
+
+
+def test_roundtrip_keeps_values(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    snapshot = make_snapshot()
+    store.save(snapshot)
+
+    df, saved_at = store.load("TQOB")
+    pd.testing.assert_frame_equal(df, snapshot.df)
+    assert saved_at > 0
+
+
+def test_numeric_columns_stay_memory_mapped(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    store.save(make_snapshot())
+    df, _ = store.load("TQOB")
+
+    for column in ("COUPONPERCENT", "ISSUESIZE", "MATDATE", "LAST"):
+        values = df[column].to_numpy()
+        base = values
+        while base.base is not None and not isinstance(base, np.memmap):
+            base = base.base
+        assert isinstance(base, np.memmap) and np.shares_memory(values, base)
+
+
+def test_prune_keeps_last_versions_and_restore_seeds_cache(tmp_path):
+    store = SnapshotStore(str(tmp_path), keep=2)
+    for _ in range(4):
+        store.save(make_snapshot())
+    assert len([d for d in (tmp_path / "TQOB").iterdir() if d.is_dir()]) == 2
+
+    cache = SnapshotCache()
+    assert asyncio.run(store.restore(cache, boards=("TQOB", "TQCB"))) == 1
+    assert cache.peek("TQOB") is not None and cache.peek("TQCB") is None
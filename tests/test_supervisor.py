@@ -0,0 +1,139 @@
+import asyncio
+import queue
+import time
+
+import pandas as pd
+from aiogram.types import Update
+
+from services.moex_service import MoexService
+from services.snapshot import SnapshotCache
+from services.supervisor import UserSequencer, drain_queue, user_key
+
+
+def make_update(update_id: int, **event) -> Update:
+    return Update.model_validate({"update_id": update_id, **event})
+
+
+def message(user_id=None, chat_id=1, chat_type="private") -> dict:
+    payload = {"message_id": 1, "date": 0, "chat": {"id": chat_id, "type": chat_type}, "text": "/start"}
+    if user_id is not None:
+        payload["from"] = {"id": user_id, "is_bot": False, "first_name": "u"}
+    return payload
+
+
+def test_sequencer_keeps_order_per_user_and_runs_users_in_parallel():
+    async def scenario():
+        sequencer = UserSequencer()
+        log = []
+        running = 0
+        overlap = 0
+
+        async def job(user_id: int, n: int, delay: float):
+            nonlocal running, overlap
+            running += 1
+            overlap = max(overlap, running)
+            await asyncio.sleep(delay)
+            log.append((user_id, n))
+            running -= 1
+
+        # Первое обновление пользователя самое долгое — следующие всё равно ждут его
+        for n, delay in enumerate([0.05, 0.0, 0.01]):
+            sequencer.submit(1, job(1, n, delay))
+            sequencer.submit(2, job(2, n, delay))
+        assert len(sequencer) == 2
+
+        await sequencer.drain()
+        return sequencer, log, overlap
+
+    sequencer, log, overlap = asyncio.run(scenario())
+
+    assert [n for user_id, n in log if user_id == 1] == [0, 1, 2]
+    assert [n for user_id, n in log if user_id == 2] == [0, 1, 2]
+    assert overlap == 2
+    # Очереди отработавших пользователей не копятся
+    assert len(sequencer) == 0
+
+
+def test_sequencer_continues_after_failed_update():
+    async def scenario():
+        sequencer = UserSequencer()
+        done = []
+
+        async def fail():
+            raise RuntimeError("ошибка обработчика")
+
+        async def ok():
+            done.append(True)
+
+        failed = sequencer.submit(1, fail())
+        sequencer.submit(1, ok())
+        await sequencer.drain()
+        return failed, done
+
+    failed, done = asyncio.run(scenario())
+
+    assert isinstance(failed.exception(), RuntimeError)
+    assert done == [True]
+
+
+def test_drain_queue_takes_batch_up_to_limit_and_stop_marker():
+    source = queue.Queue()
+    for item in range(5):
+        source.put(item)
+
+    assert drain_queue(source, limit=3) == [0, 1, 2]
+    assert drain_queue(source) == [3, 4]
+
+    # Маркер остановки завершает пачку, следующие элементы остаются в очереди
+    for item in (5, None, 6):
+        source.put(item)
+    assert drain_queue(source) == [5, None]
+    assert drain_queue(source) == [6]
+
+
+def test_user_key_prefers_user_then_chat():
+    assert user_key(make_update(1, message=message(user_id=42, chat_id=-100, chat_type="group"))) == 42
+
+    callback = {"id": "1", "chat_instance": "c", "data": "x",
+                "from": {"id": 7, "is_bot": False, "first_name": "u"}}
+    assert user_key(make_update(2, callback_query=callback)) == 7
+
+    # Пост канала без автора шардируется по чату
+    assert user_key(make_update(3, channel_post=message(chat_id=-200, chat_type="channel"))) == -200
+
+    # Событие без пользователя и чата — в нулевой шард
+    poll = {"id": "p", "question": "?", "options": [], "total_voter_count": 0, "is_closed": False,
+            "is_anonymous": True, "type": "regular", "allows_multiple_answers": False}
+    assert user_key(make_update(4, poll=poll)) == 0
+
+
+class UnreachableService(MoexService):
+    """Биржа, к которой воркер обращаться не должен"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    async def get_reference(self, board: str = "TQCB") -> pd.DataFrame:
+        self.calls += 1
+        raise RuntimeError("воркер запросил биржу")
+
+    async def get_marketdata(self, board: str = "TQCB") -> pd.DataFrame:
+        self.calls += 1
+        raise RuntimeError("воркер запросил биржу")
+
+
+def test_offline_cache_serves_only_seeded_snapshots():
+    service = UnreachableService()
+    cache = SnapshotCache(ttl=1, service=service)
+    cache.offline = True
+
+    # Без снимка супервизора — пусто, но без запроса к бирже
+    assert asyncio.run(cache.get("TQCB")).empty
+    assert asyncio.run(cache.get_universe(("TQCB", "TQOB"))).empty
+
+    # Снимок с диска отдаётся и после истечения TTL
+    cache.seed("TQCB", pd.DataFrame({"SECID": ["A"], "BOARDID": ["TQCB"]}), saved_at=time.time() - 3600)
+    assert asyncio.run(cache.get("TQCB")).df["SECID"].tolist() == ["A"]
+    assert asyncio.run(cache.get_universe(("TQCB", "TQOB"))).df["SECID"].tolist() == ["A"]
+    assert service.calls == 0
@@ -0,0 +1,133 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from services.snapshot import BondSnapshot
+from services.view_cache import SORT_MODES, ViewCache
+
+
+def make_universe(size: int = 30) -> pd.DataFrame:
+    """Надёжные рублёвые выпуски первого уровня с разными купонами"""
+    today = pd.Timestamp(datetime.now().date())
+    return pd.DataFrame({
+        "SECID": [f"RU{i:04d}" for i in range(size)],
+        "BOARDID": "TQCB",
+        "SHORTNAME": [f"Бумага {i}" for i in range(size)],
+        "SECNAME": [f"Эмитент {i} БО-01" for i in range(size)],
+        "LISTLEVEL": 1,
+        "CURRENCY": "RUB",
+        "COUPONPERCENT": [8.0 + (i % 7) for i in range(size)],
+        "COUPONPERIOD": 182.0,
+        "MATDATE": [today + pd.Timedelta(days=200 + 40 * i) for i in range(size)],
+        "ISSUESIZE": [1e9 + 1e8 * i for i in range(size)],
+        "FACEVALUE": 1000.0,
+    })
+
+
+def test_view_is_memoized_per_version():
+    cache = ViewCache()
+    snapshot = BondSnapshot("ALL", 1, make_universe())
+
+    view = cache.get(snapshot)
+    assert cache.get(snapshot) is view
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert len(view.df) == 10 and view.keyboard is not None
+
+    # Карточка собирается один раз и отдаётся тем же объектом
+    secid = view.df['SECID'].iloc[0]
+    assert view.details(secid) is view.details(secid)
+    assert view.details("NOPE") is None
+
+
+def test_new_version_rebuilds_views():
+    cache = ViewCache()
+    df = make_universe()
+    first = cache.get(BondSnapshot("ALL", 1, df))
+
+    # Та же версия с другим объектом снимка — всё ещё попадание
+    assert cache.get(BondSnapshot("ALL", 1, df)) is first
+
+    df = df.assign(COUPONPERCENT=df['COUPONPERCENT'] + 5)
+    second = cache.get(BondSnapshot("ALL", 2, df))
+    assert second is not first and second.version == 2
+    assert second.table != first.table
+    assert cache.stats()["views"] == 1
+
+
+def test_views_are_keyed_by_limit():
+    cache = ViewCache()
+    snapshot = BondSnapshot("ALL", 1, make_universe())
+
+    assert len(cache.get(snapshot, limit=5).df) == 5
+    assert len(cache.get(snapshot, limit=10).df) == 10
+    assert cache.get(snapshot, limit=5) is not cache.get(snapshot, limit=10)
+    assert cache.misses == 2
+
+
+def test_empty_snapshot_has_no_keyboard():
+    cache = ViewCache()
+    view = cache.get(BondSnapshot("ALL", 1, pd.DataFrame()))
+
+    assert view.empty and view.keyboard is None
+    assert view.table == "❌ Нет данных"
+
+
+def test_page_orders_are_permutations_of_reliable_bonds():
+    cache = ViewCache()
+    df = make_universe()
+    snapshot = BondSnapshot("ALL", 1, df)
+
+    reliable = set(cache._moex.filter_reliable_bonds(df, limit=len(df))['SECID'])
+    orders = {mode: df['SECID'].to_numpy()[cache.order(snapshot, mode)] for mode in SORT_MODES}
+    for secids in orders.values():
+        assert len(secids) == len(reliable) and set(secids) == reliable
+
+    # Без цен доходность — купон; порядок у равных сохраняет исходный
+    by_coupon = df[df['SECID'].isin(reliable)].sort_values('COUPONPERCENT', ascending=False, kind="stable")
+    assert list(orders["yield"]) == list(by_coupon['SECID'])
+    by_maturity = df[df['SECID'].isin(reliable)].sort_values('MATDATE', kind="stable")
+    assert list(orders["maturity"]) == list(by_maturity['SECID'])
+    by_size = df[df['SECID'].isin(reliable)].sort_values('ISSUESIZE', ascending=False, kind="stable")
+    assert list(orders["size"]) == list(by_size['SECID'])
+
+    # Первая страница по рейтингу совпадает с топом /bonds
+    top = cache._moex.filter_reliable_bonds(df, limit=7)
+    assert list(cache.page(snapshot, "rating", 0, size=7).df['SECID']) == list(top['SECID'])
+
+    # Перестановка считается раз на версию
+    assert cache.order(snapshot, "yield") is cache.order(snapshot, "yield")
+
+
+def test_pages_slice_the_order_and_clamp():
+    cache = ViewCache()
+    snapshot = BondSnapshot("ALL", 1, make_universe())
+    order = snapshot.df['SECID'].to_numpy()[cache.order(snapshot, "maturity")]
+    pages = -(-len(order) // 7)
+
+    seen = []
+    for page in range(pages):
+        view = cache.page(snapshot, "maturity", page, size=7)
+        # Нумерация строк продолжается со страницы на страницу
+        assert view.df.index[0] == page * 7
+        seen.extend(view.df['SECID'])
+    assert seen == list(order)
+
+    last = cache.page(snapshot, "maturity", pages - 1, size=7)
+    assert cache.page(snapshot, "maturity", 999, size=7) is last
+    assert cache.page(snapshot, "maturity", -3, size=7) is cache.page(snapshot, "maturity", 0, size=7)
+
+
+def test_new_version_recomputes_orders():
+    cache = ViewCache()
+    df = make_universe()
+    first = cache.order(BondSnapshot("ALL", 1, df), "size")
+
+    # Объём выпусков развернулся — новая версия сортируется заново
+    df = df.assign(ISSUESIZE=df['ISSUESIZE'].to_numpy()[::-1])
+    second = cache.order(BondSnapshot("ALL", 2, df), "size")
+    assert list(second) != list(first)
+    assert df['ISSUESIZE'].to_numpy()[second].tolist() == sorted(df['ISSUESIZE'].to_numpy()[second], reverse=True)
+
+    with pytest.raises(ValueError):
+        cache.order(BondSnapshot("ALL", 2, df), "name")
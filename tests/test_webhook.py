@@ -0,0 +1,106 @@
+import asyncio
+
+from aiogram import Bot
+from aiohttp import ClientSession
+from aiohttp.test_utils import TestServer
+
+from services.webhook import SECRET_HEADER, WebhookServer
+
+
+UPDATE = {
+    "update_id": 1,
+    "message": {
+        "message_id": 1, "date": 0, "text": "/start",
+        "chat": {"id": 1, "type": "private"},
+        "from": {"id": 1, "is_bot": False, "first_name": "Test"},
+    },
+}
+
+
+class SlowDispatcher:
+    """Вместо Dispatcher: обработка обновления занимает заданное время"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.updates = []
+
+    async def feed_update(self, bot, update):
+        await asyncio.sleep(self.delay)
+        self.updates.append(update.update_id)
+
+
+async def _start(server: WebhookServer) -> TestServer:
+    test_server = TestServer(server.app())
+    await test_server.start_server()
+    return test_server
+
+
+def _run(scenario):
+    async def wrapper():
+        bot = Bot("123456:TEST")
+        try:
+            await scenario(bot)
+        finally:
+            await bot.session.close()
+
+    asyncio.run(wrapper())
+
+
+def test_bad_secret_is_rejected():
+    async def scenario(bot):
+        dp = SlowDispatcher()
+        server = WebhookServer(dp, bot, path="/hook", secret="s3cret")
+        test_server = await _start(server)
+        url = test_server.make_url("/hook")
+
+        async with ClientSession() as session:
+            for headers in ({}, {SECRET_HEADER: "wrong"}):
+                async with session.post(url, json=UPDATE, headers=headers) as response:
+                    assert response.status in (401, 403)
+            async with session.post(url, json=UPDATE, headers={SECRET_HEADER: "s3cret"}) as response:
+                assert response.status == 200
+
+        await server.drain()
+        await test_server.close()
+        assert server.rejected == 2 and dp.updates == [1]
+
+    _run(scenario)
+
+
+def test_draining_server_returns_503_and_finishes_started_updates():
+    async def scenario(bot):
+        dp = SlowDispatcher(delay=0.2)
+        server = WebhookServer(dp, bot, path="/hook", secret="")
+        test_server = await _start(server)
+        url = test_server.make_url("/hook")
+
+        async with ClientSession() as session:
+            async with session.post(url, json=UPDATE) as response:
+                # Ответ приходит до окончания обработки
+                assert response.status == 200 and dp.updates == []
+
+            drain = asyncio.create_task(server.drain())
+            await asyncio.sleep(0)
+            async with session.post(url, json=dict(UPDATE, update_id=2)) as response:
+                assert response.status == 503
+            await drain
+
+        await test_server.close()
+        assert dp.updates == [1] and server.handled == 1
+
+    _run(scenario)
+
+
+def test_malformed_update_gets_400():
+    async def scenario(bot):
+        server = WebhookServer(SlowDispatcher(), bot, path="/hook", secret="")
+        test_server = await _start(server)
+
+        async with ClientSession() as session:
+            async with session.post(test_server.make_url("/hook"), data=b"not json") as response:
+                assert response.status == 400
+
+        await test_server.close()
+        assert server.rejected == 1
+
+    _run(scenario)
@@ -1,26 +1,32 @@
+import html
+
 import pandas as pd
 
 
-def format_bonds_table(df: pd.DataFrame) -> str:
+def format_bonds_table(df: pd.DataFrame, title: str = "Топ-10 надёжных облигаций") -> str:
     """Форматирование таблицы облигаций"""
     if df.empty:
         return "❌ Нет данных"
 
-    message = "🔝 <b>Топ-10 надёжных облигаций</b>\n<i>✅ Без оферты | ✅ Без амортизации</i>\n\n"
+    header = f"🔝 <b>{title}</b>\n<i>✅ Без оферты | ✅ Без амортизации</i>\n\n"
+
+    lines = []
+    ytms = df['YTM'] if 'YTM' in df.columns else pd.Series(float('nan'), index=df.index)
+    rows = zip(df.index, df['SECID'], df['SHORTNAME'], df['RATING'], df['COUPONPERCENT'], ytms, df['YEARS'])
 
-    for idx, row in df.iterrows():
-        ticker = row['SECID']
-        name = row['SHORTNAME'][:25] + "..." if len(str(row['SHORTNAME'])) > 25 else row['SHORTNAME']
-        rating = row['RATING'].split()[0]
-        coupon = row['COUPONPERCENT']
-        years = row['YEARS']
+    for idx, ticker, shortname, rating, coupon, ytm, years in rows:
+        name = shortname[:25] + "..." if len(str(shortname)) > 25 else shortname
+        rating = rating.split()[0]
+        ytm = f" | YTM {ytm:.2f}%" if pd.notna(ytm) else ""
 
-        message += f"{idx + 1}. <b>{ticker}</b>\n   {name}\n   {rating} | {coupon:.2f}% | {years}г\n\n"
+        # Названия приходят с биржи — экранируем уже обрезанную строку
+        ticker, name = html.escape(str(ticker)), html.escape(str(name))
+        lines.append(f"{idx + 1}. <b>{ticker}</b>\n   {name}\n   {rating} | {coupon:.2f}%{ytm} | {years}г\n\n")
 
-    return message + "👉 Выберите облигацию:"
+    return header + "".join(lines) + "👉 Выберите облигацию:"
 
 
-def format_bond_details(row: pd.Series) -> str:
+def format_bond_details(row: pd.Series, coupons: list = None) -> str:
     """Форматирование деталей облигации"""
     # Расчёт размера купона
     face_value = row.get('FACEVALUE', 0)
@@ -33,15 +39,193 @@ def format_bond_details(row: pd.Series) -> str:
     else:
         coupon_value = 0.0
 
-    message = f"📜 <b>{row['SECID']}</b>\n\n"
-    message += f"📌 {row['SHORTNAME']}\n"
-    message += f"🏢 {row['SECNAME'][:50]}{'...' if len(row['SECNAME']) > 50 else ''}\n\n"
+    secname = str(row['SECNAME'])
+    message = f"📜 <b>{html.escape(str(row['SECID']))}</b>\n\n"
+    message += f"📌 {html.escape(str(row['SHORTNAME']))}\n"
+    message += f"🏢 {html.escape(secname[:50])}{'...' if len(secname) > 50 else ''}\n\n"
     message += f"⭐ {row['RATING']}\n"
     message += f"💵 Купон: {row['COUPONPERCENT']:.2f}% годовых\n"
     message += f"💰 Размер: {coupon_value:.2f} ₽\n"
     message += f"📅 Выплат: {int(row['COUPON_FREQ'])} раз/год\n"
     message += f"⏳ Погашение: {row['MATDATE'].strftime('%d.%m.%Y')} ({row['YEARS']:.1f} лет)\n"
-    message += f"💼 Объём: {row['ISSUESIZE']:,.0f} ₽\n\n"
+    message += f"💼 Объём: {row['ISSUESIZE']:,.0f} ₽\n"
+
+    if pd.notna(row.get('YTM')):
+        message += f"📈 Доходность к погашению: {row['YTM']:.2f}%\n"
+        message += f"📐 Дюрация: {row['DURATION']:.2f} лет (модиф. {row['MOD_DURATION']:.2f})\n"
+        message += f"〰️ Выпуклость: {row['CONVEXITY']:.1f}\n"
+    message += "\n"
+
+    if coupons:
+        message += "📆 <b>Ближайшие купоны:</b>\n"
+        for coupon in coupons:
+            value = f"{coupon['value']:.2f} ₽" if pd.notna(coupon['value']) else "не объявлен"
+            message += f"   {coupon['coupondate'].strftime('%d.%m.%Y')} — {value}\n"
+        message += "\n"
+
     message += "<i>ℹ️ Данные: Мосбиржа</i>"
 
-    return message
\ No newline at end of file
+    return message
+
+
+def format_history(secid: str, series: list, days: int) -> str:
+    """Форматирование истории доходности облигации"""
+    yields = [y for _, y, _ in series if y is not None]
+
+    if not yields:
+        return f"❌ Нет истории по {secid}"
+
+    bars = "▁▂▃▄▅▆▇█"
+    low, high = min(yields), max(yields)
+    spread = (high - low) or 1
+    sparkline = "".join(bars[int((y - low) / spread * (len(bars) - 1))] for y in yields)
+
+    first_ts, last_ts = series[0][0], series[-1][0]
+    last_price = series[-1][2]
+
+    message = f"📈 <b>{secid}</b> — доходность за {days} дн.\n\n"
+    message += f"<code>{sparkline}</code>\n\n"
+    message += f"📉 Мин: {low:.2f}% | 📈 Макс: {high:.2f}%\n"
+    message += f"🔚 Сейчас: {yields[-1]:.2f}%"
+    message += f" | Цена: {last_price:.2f}\n" if last_price is not None else "\n"
+    message += f"🗓 {pd.Timestamp(first_ts, unit='s'):%d.%m.%Y} — {pd.Timestamp(last_ts, unit='s'):%d.%m.%Y}"
+
+    return message
+
+
+FIELD_NAMES = {"yield": "доходность", "price": "цена"}
+
+
+def _format_level(field: str, value: float) -> str:
+    return f"{value:.2f}%" if field == "yield" else f"{value:.2f}"
+
+
+def format_alerts(alerts: list) -> str:
+    """Форматирование списка подписок пользователя"""
+    if not alerts:
+        return "🔕 Подписок нет.\nПример: /alert SU26238RMFS4 yield > 14"
+
+    message = "🔔 <b>Ваши подписки</b>\n\n"
+    for alert_id, secid, field, sign, threshold in alerts:
+        message += (f"#{alert_id} <b>{secid}</b>: {FIELD_NAMES[field]} "
+                    f"{'>' if sign > 0 else '<'} {_format_level(field, threshold)}\n")
+
+    return message + "\nУдалить: /unalert номер"
+
+
+def format_alert_notification(items: list) -> str:
+    """Форматирование сработавших подписок"""
+    message = "🔔 <b>Сработали подписки</b>\n\n"
+    for item in items:
+        field = item['field']
+        message += (f"<b>{item['secid']}</b>: {FIELD_NAMES[field]} {_format_level(field, item['value'])} "
+                    f"{'>' if item['sign'] > 0 else '<'} {_format_level(field, item['threshold'])}\n")
+    return message
+
+
+def format_bond_brief(shortname, coupon, matdate) -> str:
+    """Краткая строка об облигации: название, купон, погашение"""
+    parts = [str(shortname)]
+    if pd.notna(coupon):
+        parts.append(f"купон {coupon:.2f}%")
+    if pd.notna(matdate):
+        parts.append(f"до {matdate:%d.%m.%Y}")
+    return " | ".join(parts)
+
+
+def format_search_results(query: str, df: pd.DataFrame) -> str:
+    """Форматирование результатов /find"""
+    # Запрос и названия приходят извне — в HTML-разметке их нужно экранировать
+    query = html.escape(query)
+    if df.empty:
+        return f"🔍 По запросу «{query}» ничего не найдено"
+
+    message = f"🔍 <b>Найдено по запросу «{query}»</b>\n\n"
+    rows = zip(df['SECID'], df['SHORTNAME'], df['COUPONPERCENT'], df['MATDATE'])
+
+    for pos, (secid, shortname, coupon, matdate) in enumerate(rows, start=1):
+        brief = format_bond_brief(html.escape(str(shortname)), coupon, matdate)
+        message += f"{pos}. <b>{html.escape(str(secid))}</b>\n   {brief}\n"
+
+    return message + "\n👉 Выберите облигацию:"
+
+
+def format_portfolio(projection) -> str:
+    """Форматирование портфеля и календаря выплат"""
+    if not projection.holdings:
+        return "💼 Портфель пуст.\nДобавить: /portfolio SECID количество"
+
+    message = "💼 <b>Портфель</b>\n\n"
+    for secid, quantity in projection.holdings.items():
+        message += f"<b>{html.escape(secid)}</b> × {quantity:g}\n"
+
+    if projection.monthly.empty:
+        message += "\n📆 Выплат в ближайшие месяцы нет\n"
+    else:
+        message += "\n📆 <b>Выплаты по месяцам:</b>\n"
+        for month, amount, estimated in projection.monthly[['month', 'amount', 'estimated']].itertuples(index=False):
+            message += f"   {month.strftime('%m.%Y')} — {'≈' if estimated else ''}{amount:,.2f} ₽\n"
+        message += f"💰 Итого: {projection.total:,.2f} ₽\n"
+
+        message += "\n⏭ <b>Ближайшие:</b>\n"
+        for coupondate, secid, amount, estimated in projection.upcoming.itertuples(index=False):
+            message += f"   {coupondate.strftime('%d.%m.%Y')} {html.escape(secid)} — {'≈' if estimated else ''}{amount:,.2f} ₽\n"
+
+    if projection.missing:
+        message += f"\n⚠️ Нет графика выплат: {html.escape(', '.join(projection.missing))}\n"
+
+    return message + "\n<i>≈ — купон ещё не объявлен, взят последний известный</i>"
+
+
+def format_screen_profile(profile) -> str:
+    """Форматирование параметров отбора"""
+    def bounds(low, high, unit):
+        if low is None and high is None:
+            return "любой"
+        if high is None:
+            return f"от {low:g}{unit}"
+        if low is None:
+            return f"до {high:g}{unit}"
+        return f"{low:g}–{high:g}{unit}"
+
+    years = bounds(profile.min_days / 365, profile.max_days / 365 if profile.max_days else None, " г")
+    ratings = ", ".join(str(code) for code in profile.ratings) or "все"
+    # Режимы торгов пользователь вводит сам
+    boards = html.escape(", ".join(profile.boards)) or "все"
+
+    return (
+        "🎛 <b>Профиль отбора</b>\n"
+        f"⏳ Срок: {years} | 💼 Объём от {profile.min_issue:,.0f} ₽\n"
+        f"💵 Купон: {bounds(profile.coupon_min, profile.coupon_max, '%')} | "
+        f"⭐ Рейтинг: {ratings} | 🏛 Режимы: {boards}\n"
+        "<i>/screen years 1-5 coupon 8-15 rating 1,2 board TQOB issue 1e9 | /screen reset</i>"
+    )
+
+
+def format_whats_new(diff, since_text: str, count: int = 5) -> str:
+    """Форматирование изменений рынка с прошлого просмотра"""
+    message = f"🆕 <b>Что нового</b> {since_text}\n\n"
+
+    if diff.empty:
+        return message + "Без изменений"
+
+    def names(df: pd.DataFrame) -> str:
+        rows = zip(df['SECID'].head(count), df.get('SHORTNAME', df['SECID']).head(count))
+        return "".join(f"   <b>{html.escape(str(secid))}</b> {html.escape(str(shortname))}\n"
+                       for secid, shortname in rows)
+
+    if not diff.added.empty:
+        message += f"➕ Новые выпуски: {len(diff.added)}\n" + names(diff.added)
+    if not diff.removed.empty:
+        message += f"➖ Исчезли: {len(diff.removed)}\n" + names(diff.removed)
+
+    if not diff.changed.empty:
+        message += f"🔁 Изменились: {len(diff.changed)}\n"
+        if 'YIELD' in diff.changed.columns:
+            # Крупнейшие изменения доходности
+            delta = (diff.changed['YIELD'] - diff.changed['YIELD_OLD']).abs()
+            movers = diff.changed.loc[delta.dropna().nlargest(count).index]
+            for secid, before, after in zip(movers['SECID'], movers['YIELD_OLD'], movers['YIELD']):
+                message += f"   <b>{html.escape(str(secid))}</b>: {before:.2f}% → {after:.2f}%\n"
+
+    return message